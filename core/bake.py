@@ -0,0 +1,264 @@
+"""
+Static pre-render ("bake") of the public site.
+
+``bake_site`` writes the HTML of every live public page and its filter
+combinations, the schedule weeks, the sitemap and robots.txt under
+``BAKE_DIR/<RELEASE_ID>``. ``BakedPageMiddleware`` serves those files through
+WhiteNoise before the request reaches URL resolution or any view.
+
+Each tag keeps the files rendered from it in the shared cache, so
+``invalidate`` looks up exactly the files a publish affects without walking
+the bake directory; they are re-baked in the background. Files older than
+``BAKE_MAX_AGE`` fall through to Django and are re-baked too, in case the
+shared cache lost their tags.
+
+Compressed siblings (``.gz``, ``.br``) are written with each file, and
+WhiteNoise picks one by ``Accept-Encoding``.
+"""
+import os
+import posixpath
+import shutil
+import stat
+import time
+import uuid
+from functools import partial
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from wagtail.models import Site
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import MissingFileError
+
+from core.cache import (
+    IGNORED_QUERY_PREFIXES,
+    REVALIDATE_LOCK_TIMEOUT,
+    encode_content,
+    is_cacheable_request,
+    is_cacheable_response,
+    run_in_background,
+)
+from core.warmup import collect_urls, render, warm
+
+BAKED_KEY_PREFIX = "baked"
+BAKE_LOCK_KEY_PREFIX = "bake-lock"
+# Set on the WSGI environ of bake renders so they never read a baked file.
+BAKE_ENVIRON_KEY = "mcl.bake"
+# WhiteNoise's file suffix for each encoding.
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def bake_root() -> str:
+    return os.path.join(settings.BAKE_DIR, settings.RELEASE_ID or "current")
+
+
+def baked_tag_key(tag: str) -> str:
+    return f"{BAKED_KEY_PREFIX}:{tag}"
+
+
+def baked_path(path: str, query: str = ""):
+    """
+    File for ``path`` and ``query``, relative to ``bake_root()``.
+
+    Directory URLs map to ``index.html``, or ``index.<query>.html`` for a
+    filtered view. Returns ``None`` when the URL cannot have a baked file.
+    """
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(query, keep_blank_values=True)
+        if not name.startswith(IGNORED_QUERY_PREFIXES)
+    )
+    query = urlencode(params)
+    relpath = path.lstrip("/")
+    if path.endswith("/"):
+        return relpath + (f"index.{quote(query, safe='')}.html" if query else "index.html")
+    return None if query else relpath
+
+
+def baked_url(relpath: str, base_url: str) -> str:
+    directory, name = posixpath.split(relpath)
+    if not name.startswith("index.") or not name.endswith(".html"):
+        return f"{base_url}/{relpath}"
+    path = f"/{directory}/" if directory else "/"
+    query = unquote(name[len("index.") : -len(".html")])
+    return f"{base_url}{path}" + (f"?{query}" if query else "")
+
+
+def default_base_url() -> str:
+    site = Site.objects.filter(is_default_site=True).first()
+    return site.root_url if site else settings.WAGTAILADMIN_BASE_URL.rstrip("/")
+
+
+def bake_url(url, registry):
+    """Render ``url`` into its baked file; returns the status, or ``None`` if not bakeable."""
+    parts = urlsplit(url)
+    relpath = baked_path(parts.path, parts.query)
+    if relpath is None:
+        return None
+
+    response = render(url, **{BAKE_ENVIRON_KEY: True})
+    path = os.path.join(bake_root(), relpath)
+    if not is_cacheable_response(response):
+        discard([relpath])
+        return response.status_code if response.status_code != 200 else None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    encodings = encode_content(response)
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        if encoding in encodings:
+            _write(path + suffix, encodings[encoding])
+        else:
+            _remove(path + suffix)
+    # Written last: WhiteNoise looks for the variants next to it.
+    _write(path, response.content)
+    registry[relpath] = getattr(response.wsgi_request, "_cache_dependencies", set())
+    return response.status_code
+
+
+def _write(path, content):
+    # Written aside and renamed, so WhiteNoise never serves a partial file.
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def bake(urls, concurrency=4, budget=300.0):
+    """Bake ``urls`` and register each file under the tags it was rendered from."""
+    registry = {}
+    result = warm(
+        urls, concurrency=concurrency, budget=budget, func=partial(bake_url, registry=registry)
+    )
+    index = {}
+    for relpath, tags in registry.items():
+        for tag in tags:
+            index.setdefault(baked_tag_key(tag), set()).add(relpath)
+    if index:
+        # Merged into the files other bakes registered. Two bakes racing on
+        # a tag can lose a path; BAKE_MAX_AGE re-bakes such a file.
+        registered = cache.get_many(list(index))
+        cache.set_many(
+            {key: registered.get(key, set()) | relpaths for key, relpaths in index.items()}, None
+        )
+    return result
+
+
+def invalidated_files(tags):
+    """
+    Baked files rendered from any of ``tags``.
+
+    The tags forget their files, which register again when re-baked.
+    """
+    keys = [baked_tag_key(tag) for tag in tags]
+    registered = cache.get_many(keys)
+    if not registered:
+        return []
+    cache.delete_many(keys)
+    root = bake_root()
+    relpaths = set().union(*registered.values())
+    return sorted(relpath for relpath in relpaths if os.path.exists(os.path.join(root, relpath)))
+
+
+def bake_site(base_url=None, concurrency=4, budget=300.0):
+    """Bake the whole public site and drop files left over from other releases."""
+    base_url = (base_url or default_base_url()).rstrip("/")
+    urls = collect_urls(base_url)
+    urls += [
+        base_url + reverse("django.contrib.sitemaps.views.sitemap"),
+        base_url + reverse("robots_txt"),
+    ]
+
+    result = bake(urls, concurrency=concurrency, budget=budget)
+
+    current = os.path.basename(bake_root())
+    os.makedirs(settings.BAKE_DIR, exist_ok=True)
+    for entry in os.scandir(settings.BAKE_DIR):
+        if entry.is_dir() and entry.name != current:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return result
+
+
+def discard(relpaths):
+    """Delete baked files, so requests fall through to Django until re-baked."""
+    root = bake_root()
+    for relpath in relpaths:
+        path = os.path.join(root, relpath)
+        _remove(path)
+        for suffix in ENCODING_SUFFIXES.values():
+            _remove(path + suffix)
+
+
+def rebake_in_background(relpaths):
+    def target():
+        base_url = default_base_url()
+        bake([baked_url(relpath, base_url) for relpath in relpaths], concurrency=2)
+
+    run_in_background(target)
+
+
+def _rebake_expired(relpath):
+    lock_key = f"{BAKE_LOCK_KEY_PREFIX}:{relpath}"
+    if not cache.add(lock_key, True, REVALIDATE_LOCK_TIMEOUT):
+        return
+
+    def target():
+        try:
+            bake([baked_url(relpath, default_base_url())], concurrency=1)
+        finally:
+            cache.delete(lock_key)
+
+    run_in_background(target)
+
+
+class BakedPageMiddleware(WhiteNoise):
+    """
+    Serve baked pages to anonymous GET/HEAD requests.
+
+    Enabled by ``BAKE_DIR``; belongs right after ``WhiteNoiseMiddleware``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.BAKE_DIR:
+            raise MiddlewareNotUsed
+        super().__init__(
+            application=None, max_age=settings.BAKE_BROWSER_MAX_AGE, allow_all_origins=False
+        )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        static_file = self.find_baked_file(request)
+        if static_file is None:
+            return self.get_response(request)
+        return WhiteNoiseMiddleware.serve(static_file, request)
+
+    def find_baked_file(self, request):
+        if request.META.get(BAKE_ENVIRON_KEY) or not is_cacheable_request(request):
+            return None
+        relpath = baked_path(request.path_info, request.META.get("QUERY_STRING", ""))
+        if relpath is None or not self.url_is_canonical(f"/{relpath}"):
+            return None
+
+        path = os.path.join(bake_root(), relpath)
+        try:
+            file_stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if not stat.S_ISREG(file_stat.st_mode):
+            return None
+        if time.time() - file_stat.st_mtime > settings.BAKE_MAX_AGE:
+            _rebake_expired(relpath)
+            return None
+        try:
+            return self.get_static_file(path, request.path_info)
+        except MissingFileError:
+            return None
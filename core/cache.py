@@ -0,0 +1,444 @@
+"""
+Response caching with dependency-tracked invalidation.
+
+Cached responses are tagged with the pages, snippets and settings they were
+rendered from, and each entry stores the version of every tag at render time.
+Publishing a page or saving a snippet bumps the versions of its tags, so only
+entries carrying one of them stop matching and are re-rendered on their next
+request, instead of the whole cache being cleared. Nothing is written per
+tag when a response is stored, so concurrent renders cannot lose each
+other's registrations.
+
+Responses are stored pre-compressed (gzip, and brotli when installed) and
+the encoding is picked per request from ``Accept-Encoding``, so a cache hit
+costs no compression work.
+"""
+import copy
+import gzip
+import hashlib
+import re
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.dispatch import Signal
+from django.utils.cache import patch_cache_control, patch_response_headers, patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+RESPONSE_KEY_PREFIX = "response"
+VERSION_KEY_PREFIX = "cacheversion"
+REVALIDATE_KEY_PREFIX = "revalidate"
+RENDER_LOCK_KEY_PREFIX = "render-lock"
+METRICS_KEY_PREFIX = "cachemetrics"
+LOOKUP_VALUES_KEY_PREFIX = "lookupvalues"
+# Upper bound on a single render; a crashed worker frees the lock after it.
+REVALIDATE_LOCK_TIMEOUT = 60
+RENDER_LOCK_TIMEOUT = 30
+# How long concurrent requests wait for another worker's render on a miss.
+RENDER_WAIT_TIMEOUT = 5
+RENDER_WAIT_INTERVAL = 0.05
+# Keys carry the model tag's version; the timeout only bounds leftovers.
+LOOKUP_VALUES_TIMEOUT = 60 * 60 * 24
+
+# Query parameters added by analytics and social sites; they never change
+# the rendered page.
+IGNORED_QUERY_PREFIXES = ("utm_", "fbclid", "gclid")
+
+RESPONSE_CACHE_METRICS = ("renders", "coalesced", "wait_timeouts", "revalidations")
+
+# Same threshold as GZipMiddleware: smaller bodies do not get any shorter.
+MIN_COMPRESS_LENGTH = 200
+# Preferred first.
+ACCEPT_ENCODING_RES = {
+    "br": re.compile(r"\bbr\b"),
+    "gzip": re.compile(r"\bgzip\b"),
+}
+
+# Sent by ``invalidate`` with the invalidated ``tags``, for copies of
+# responses that live outside the cache (e.g. baked files, see core.bake).
+cache_invalidated = Signal()
+
+
+def page_tag(page) -> str:
+    """Tag for responses rendered from a page (or listing its children)."""
+    page_id = getattr(page, "pk", page)
+    return f"page:{page_id}"
+
+
+def model_tag(model) -> str:
+    """Tag for responses rendered from any row of a snippet or setting model.
+
+    Accepts a model class, an instance or an ``"app_label.ModelName"`` label.
+    """
+    if isinstance(model, str):
+        return f"model:{model.lower()}"
+    return f"model:{model._meta.label_lower}"
+
+
+# Every page renders the sidebar and the SEO head from base.html.
+CHROME_DEPENDENCIES = (
+    model_tag("core.SidebarSection"),
+    model_tag("core.SiteSettings"),
+)
+
+
+def add_cache_dependencies(request, *tags):
+    """Record extra tags for the response currently being rendered."""
+    if not hasattr(request, "_cache_dependencies"):
+        request._cache_dependencies = set()
+    new_tags = set(tags) - request._cache_dependencies
+    request._cache_dependencies.update(new_tags)
+    # While a response is being rendered for the cache, each tag's version is
+    # read as it is registered, before the view reads the data it stands for.
+    versions = getattr(request, "_cache_versions", None)
+    if versions is not None and new_tags:
+        versions.update(get_versions(new_tags))
+
+
+def _version_key(tag: str) -> str:
+    return f"{VERSION_KEY_PREFIX}:{tag}"
+
+
+def get_versions(tags) -> dict:
+    """
+    Return the version of each tag: the time it was last invalidated.
+
+    Tags that were never invalidated (or whose version was evicted) start at
+    the current time, which only ever makes validators look newer.
+    """
+    keys = {tag: _version_key(tag) for tag in tags}
+    versions = cache.get_many(list(keys.values()))
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return {tag: versions.get(key, 0) for tag, key in keys.items()}
+
+
+def invalidate(*tags):
+    """Make every cached response that depends on any of ``tags`` stale."""
+    now = time.time()
+    cache.set_many({_version_key(tag): now for tag in tags}, None)
+    cache_invalidated.send(sender=None, tags=set(tags))
+
+
+def record_metric(name: str):
+    """Count a response cache event in the shared cache."""
+    key = f"{METRICS_KEY_PREFIX}:{name}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); losing one count is fine.
+        pass
+
+
+def get_metrics() -> dict:
+    keys = {name: f"{METRICS_KEY_PREFIX}:{name}" for name in RESPONSE_CACHE_METRICS}
+    values = cache.get_many(list(keys.values()))
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def reset_metrics():
+    cache.delete_many([f"{METRICS_KEY_PREFIX}:{name}" for name in RESPONSE_CACHE_METRICS])
+
+
+def is_cacheable_request(request) -> bool:
+    # Editors carry a session cookie and see the Wagtail userbar, so their
+    # responses must never be shared with anonymous visitors.
+    return (
+        request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def is_cacheable_response(response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and "private" not in response.get("Cache-Control", "")
+    )
+
+
+def choice_param(choices, default=""):
+    """Query parameter normaliser mapping unknown values to ``default``."""
+
+    def normalize(value):
+        return value if value in choices else default
+
+    return normalize
+
+
+def exact_choice_param(choices):
+    """Query parameter normaliser bypassing the cache for unknown values."""
+
+    def normalize(value):
+        if not value:
+            return ""
+        return value if value in choices else None
+
+    return normalize
+
+
+def lookup_param(model, lookup):
+    """
+    Query parameter normaliser accepting only values that exist in ``model``.
+
+    Unknown values render an empty listing that is not worth caching, so the
+    request bypasses the cache instead of adding an entry per bogus value.
+    The values that exist are cached under the version of the model's tag,
+    so cache hits cost no query.
+    """
+
+    def valid_values():
+        queryset_model = apps.get_model(model) if isinstance(model, str) else model
+        tag = model_tag(queryset_model)
+        key = f"{LOOKUP_VALUES_KEY_PREFIX}:{tag}:{lookup}:{get_versions([tag])[tag]}"
+        values = cache.get(key)
+        if values is None:
+            rows = queryset_model._default_manager.values_list(lookup, flat=True).distinct()
+            values = {str(row) for row in rows if row is not None}
+            cache.set(key, values, LOOKUP_VALUES_TIMEOUT)
+        return values
+
+    def normalize(value):
+        value = (value or "").strip()
+        if not value:
+            return ""
+        return value if value in valid_values() else None
+
+    return normalize
+
+
+def canonical_query(request, query_params=None):
+    """
+    Build the canonical query string for ``request``.
+
+    ``query_params`` maps each GET parameter the view recognises to a
+    normaliser returning its canonical value, ``""`` when unset, or ``None``
+    when the request must bypass the cache. Returns ``None`` as well when
+    the request carries any other parameter, apart from tracking ones.
+    """
+    query_params = query_params or {}
+    for name in request.GET:
+        if name not in query_params and not name.startswith(IGNORED_QUERY_PREFIXES):
+            return None
+
+    canonical = {}
+    for name, normalize in query_params.items():
+        value = normalize(request.GET.get(name))
+        if value is None:
+            return None
+        if value:
+            canonical[name] = value
+    return urlencode(sorted(canonical.items()))
+
+
+def encode_content(response) -> dict:
+    """Body of ``response`` in each encoding worth storing, keyed by encoding."""
+    content = response.content
+    if len(content) < MIN_COMPRESS_LENGTH or response.has_header("Content-Encoding"):
+        return {"identity": content}
+    encodings = {"gzip": compress_string(content)}
+    if brotli is not None:
+        encodings["br"] = brotli.compress(content)
+    return encodings
+
+
+def preferred_encoding(request) -> str:
+    """Encoding ``apply_encoding`` serves ``request`` for a compressible body."""
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    for encoding, accepts in ACCEPT_ENCODING_RES.items():
+        if (encoding != "br" or brotli is not None) and accepts.search(accept_encoding):
+            return encoding
+    return "identity"
+
+
+def apply_encoding(request, response, encodings):
+    """Give ``response`` the stored body best matching the request's ``Accept-Encoding``."""
+    accept_encoding = request.headers.get("Accept-Encoding", "")
+    for encoding, accepts in ACCEPT_ENCODING_RES.items():
+        if encoding in encodings and accepts.search(accept_encoding):
+            response.content = encodings[encoding]
+            response["Content-Encoding"] = encoding
+            return response
+    if "identity" in encodings:
+        response.content = encodings["identity"]
+    else:
+        # Only the compressed bytes are kept; rare clients pay for this.
+        response.content = gzip.decompress(encodings["gzip"])
+    return response
+
+
+def current_entry(key):
+    """The cached entry at ``key``, unless one of its tags was invalidated since."""
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    versions = entry[3]
+    return entry if get_versions(versions) == versions else None
+
+
+def response_cache_key(request, query: str = "") -> str:
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    digest = hashlib.md5(url.encode(), usedforsecurity=False)
+    return f"{RESPONSE_KEY_PREFIX}:{digest.hexdigest()}"
+
+
+def run_in_background(func):
+    """Run ``func`` in a daemon thread that closes its own DB connections."""
+
+    def target():
+        try:
+            func()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def _clone_request(request):
+    # The original request keeps flowing through the middleware stack while
+    # the clone is re-rendered in the background.
+    clone = copy.copy(request)
+    clone.META = request.META.copy()
+    clone._cache_dependencies = set()
+    clone.__dict__.pop("_cache_versions", None)
+    return clone
+
+
+def cache_response(
+    timeout: int,
+    dependencies=(),
+    stale_while_revalidate: int = 0,
+    query_params=None,
+):
+    """
+    Drop-in replacement for ``cache_page`` that tags the stored response.
+
+    ``dependencies`` are static tags; views may add more at render time with
+    ``add_cache_dependencies``. ``CHROME_DEPENDENCIES`` are always included.
+
+    With ``stale_while_revalidate`` a response older than ``timeout`` keeps
+    being served for that many more seconds while a single background thread
+    re-renders it. Past ``timeout + stale_while_revalidate`` (the hard
+    max-age) the entry is gone and the next request renders synchronously.
+    An invalidated entry is never served, even as stale, so edits show at once.
+
+    On a miss only one request per key, across all workers, renders; the
+    others wait up to ``RENDER_WAIT_TIMEOUT`` for its result. See
+    ``get_metrics`` for how many renders were coalesced.
+
+    The cache key only includes the canonical values of ``query_params``
+    (see ``canonical_query``), so ``?week=bad`` and ``?week=1`` share one
+    entry and unrecognised parameters never create entries at all.
+    """
+    max_age = timeout + stale_while_revalidate
+
+    def decorator(view_func):
+        def render_and_store(request, key, *args, **kwargs):
+            # Versions are taken before rendering: a change committed during
+            # the render must leave the entry outdated, not stamp it current.
+            tags = set(CHROME_DEPENDENCIES) | set(dependencies)
+            tags |= getattr(request, "_cache_dependencies", set())
+            request._cache_versions = get_versions(tags)
+            response = view_func(request, *args, **kwargs)
+            if not is_cacheable_response(response):
+                return response
+
+            # Render now rather than after the middleware stack so the entry
+            # exists by the time the render lock is released.
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+            patch_response_headers(response, timeout)
+            if stale_while_revalidate:
+                patch_cache_control(response, stale_while_revalidate=stale_while_revalidate)
+
+            encodings = encode_content(response)
+            if "identity" not in encodings:
+                patch_vary_headers(response, ("Accept-Encoding",))
+            response.content = b""
+
+            versions = request._cache_versions
+            missing = getattr(request, "_cache_dependencies", set()) - versions.keys()
+            if missing:
+                versions.update(get_versions(missing))
+            cache.set(key, (time.time() + timeout, response, encodings, versions), max_age)
+            return apply_encoding(request, response, encodings)
+
+        def render_once(request, key, *args, **kwargs):
+            """Render on a miss unless another worker is already rendering ``key``."""
+            lock_key = f"{RENDER_LOCK_KEY_PREFIX}:{key}"
+            if cache.add(lock_key, True, RENDER_LOCK_TIMEOUT):
+                record_metric("renders")
+                try:
+                    return render_and_store(request, key, *args, **kwargs)
+                finally:
+                    cache.delete(lock_key)
+
+            deadline = time.monotonic() + RENDER_WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(RENDER_WAIT_INTERVAL)
+                entry = current_entry(key)
+                if entry is not None:
+                    record_metric("coalesced")
+                    _, response, encodings, _ = entry
+                    return apply_encoding(request, response, encodings)
+                if not cache.has_key(lock_key):
+                    # The other render failed or was not cacheable.
+                    break
+            else:
+                record_metric("wait_timeouts")
+            record_metric("renders")
+            return render_and_store(request, key, *args, **kwargs)
+
+        def revalidate(request, key, lock_key, *args, **kwargs):
+            try:
+                record_metric("revalidations")
+                render_and_store(request, key, *args, **kwargs)
+            finally:
+                cache.delete(lock_key)
+
+        @wraps(view_func)
+        def wrapped_view(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            # Also recorded on cache hits, for callers that store the
+            # response elsewhere (see core.bake).
+            add_cache_dependencies(request, *CHROME_DEPENDENCIES, *dependencies)
+
+            query = canonical_query(request, query_params)
+            if query is None:
+                return view_func(request, *args, **kwargs)
+
+            key = response_cache_key(request, query)
+            entry = current_entry(key)
+            if entry is None:
+                return render_once(request, key, *args, **kwargs)
+
+            fresh_until, response, encodings, _ = entry
+            lock_key = f"{REVALIDATE_KEY_PREFIX}:{key}"
+            if fresh_until <= time.time() and cache.add(lock_key, True, REVALIDATE_LOCK_TIMEOUT):
+                clone = _clone_request(request)
+                run_in_background(
+                    lambda: revalidate(clone, key, lock_key, *args, **kwargs)
+                )
+            return apply_encoding(request, response, encodings)
+
+        return wrapped_view
+
+    return decorator
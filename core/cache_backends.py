@@ -0,0 +1,187 @@
+"""
+Two-tier cache backend: a bounded in-process LRU (L1) in front of a cache
+shared by every worker (L2), e.g. ``DatabaseCache`` or ``FileBasedCache``.
+
+Workers keep their L1 coherent through a version stamp stored in L2. Any
+delete or clear replaces the stamp; each worker compares it at most once per
+``STAMP_CHECK_INTERVAL`` seconds and drops its L1 when it has changed.
+Overwrites leave the stamp alone: a response entry carries the tag versions
+it was rendered against and is checked against them on every read, so a
+stale copy in another worker's L1 is never served as current.
+
+Only keys starting with one of ``L1_KEY_PREFIXES`` are kept in L1. Everything
+else (dependency sets, locks, counters) goes straight to L2 so that
+read-modify-write users always see the shared value.
+"""
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAMP_KEY = "tiered:stamp"
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._l2_alias = options.get("L2", "shared")
+        self._max_entries = options.get("L1_MAX_ENTRIES", 300)
+        self._stamp_interval = options.get("STAMP_CHECK_INTERVAL", 1.0)
+        self._l1_prefixes = tuple(options.get("L1_KEY_PREFIXES", ("response:",)))
+        self._l1_timeout = options.get("L1_TIMEOUT", 60)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._stamp_checked_at = 0.0
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # L1 helpers --------------------------------------------------------
+
+    def _uses_l1(self, key) -> bool:
+        return key.startswith(self._l1_prefixes)
+
+    def _l1_key(self, key, version):
+        return (key, self.version if version is None else version)
+
+    def _sync_stamp(self):
+        now = time.monotonic()
+        if now - self._stamp_checked_at < self._stamp_interval:
+            return
+        stamp = self.l2.get(STAMP_KEY)
+        with self._lock:
+            self._stamp_checked_at = now
+            if stamp != self._stamp:
+                self._l1.clear()
+                self._stamp = stamp
+
+    def _bump_stamp(self):
+        # The local stamp is left untouched, so the next check also drops
+        # entries from this worker's L1 that another worker invalidated.
+        self.l2.set(STAMP_KEY, uuid.uuid4().hex, None)
+        self._stamp_checked_at = 0.0
+
+    def _l1_get(self, key, version):
+        l1_key = self._l1_key(key, version)
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._l1[l1_key]
+                return None
+            self._l1.move_to_end(l1_key)
+        # Values are pickled so callers mutating a cached response (e.g.
+        # compression middleware) never touch the stored copy.
+        return pickle.loads(payload)
+
+    def _l1_set(self, key, value, timeout, version):
+        if not self._uses_l1(key):
+            return
+        expires_at = self.get_backend_timeout(timeout)
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            l1_key = self._l1_key(key, version)
+            self._l1[l1_key] = (expires_at, payload)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key, version) -> bool:
+        with self._lock:
+            return self._l1.pop(self._l1_key(key, version), None) is not None
+
+    # Cache API ---------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        if not self._uses_l1(key):
+            return self.l2.get(key, default, version=version)
+        self._sync_stamp()
+        value = self._l1_get(key, version)
+        if value is not None:
+            return value
+        sentinel = object()
+        value = self.l2.get(key, sentinel, version=version)
+        if value is sentinel:
+            return default
+        # L2 does not expose the remaining lifetime, so keep the copy for at
+        # most L1_TIMEOUT; deletes still reach L1 through the stamp.
+        self._l1_set(key, value, self._l1_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        if any(self._uses_l1(key) for key in keys):
+            self._sync_stamp()
+        for key in keys:
+            value = self._l1_get(key, version) if self._uses_l1(key) else None
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            for key, value in self.l2.get_many(missing, version=version).items():
+                self._l1_set(key, value, self._l1_timeout, version)
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self._l1_set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(key, version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(key, version)
+        deleted = self.l2.delete(key, version=version)
+        if self._uses_l1(key):
+            self._bump_stamp()
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(key, version)
+        self.l2.delete_many(keys, version=version)
+        if any(self._uses_l1(key) for key in keys):
+            self._bump_stamp()
+
+    def has_key(self, key, version=None):
+        if self._uses_l1(key):
+            self._sync_stamp()
+            if self._l1_get(key, version) is not None:
+                return True
+        return self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+        self._bump_stamp()
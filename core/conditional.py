@@ -0,0 +1,28 @@
+"""
+Validators for conditional GET on Wagtail pages.
+
+A page's ETag and Last-Modified combine its live revision with the versions
+of everything else it renders: its children (listings), the sidebar and site
+settings, and any tags listed in the page class's ``cache_dependencies``.
+"""
+import hashlib
+
+from django.conf import settings
+
+from core.cache import CHROME_DEPENDENCIES, get_versions, page_tag
+
+
+def page_dependencies(page):
+    return {page_tag(page), *CHROME_DEPENDENCIES, *getattr(page, "cache_dependencies", ())}
+
+
+def page_validators(page):
+    """Return ``(etag, last_modified)`` for the live page; the latter as a timestamp."""
+    versions = get_versions(page_dependencies(page))
+    published_at = page.last_published_at.timestamp() if page.last_published_at else 0
+    last_modified = max([published_at, *versions.values()])
+
+    parts = [settings.RELEASE_ID, str(page.pk), str(page.live_revision_id), repr(published_at)]
+    parts.extend(f"{tag}={versions[tag]!r}" for tag in sorted(versions))
+    digest = hashlib.sha1("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"', int(last_modified)
@@ -0,0 +1,41 @@
+"""
+Django management command to pre-render the public site into static files.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bake import bake_root, bake_site
+
+
+class Command(BaseCommand):
+    help = "Renders live pages, schedule weeks, sitemap and robots.txt into BAKE_DIR"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel renders")
+        parser.add_argument("--budget", type=float, default=300.0, help="Time budget in seconds")
+        parser.add_argument(
+            "--base-url",
+            default=None,
+            help="Site URL to render (defaults to the default Wagtail site)",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.BAKE_DIR:
+            raise CommandError("Set BAKE_DIR to enable baking.")
+
+        self.stdout.write(f"Baking into {bake_root()}...")
+        result = bake_site(
+            options["base_url"], concurrency=options["concurrency"], budget=options["budget"]
+        )
+
+        for url, error in result.failed:
+            self.stderr.write(f"✗ {url}: {error}")
+        if result.skipped:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {len(result.skipped)} URLs (not bakeable or time budget exceeded)"
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Baked {len(result.rendered)} URLs in {result.elapsed:.1f}s")
+        )
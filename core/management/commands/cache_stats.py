@@ -0,0 +1,27 @@
+"""
+Django management command to show response cache render counters.
+"""
+from django.core.management.base import BaseCommand
+
+from core.cache import get_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = "Shows how many page renders the response cache performed and coalesced"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing")
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        for name, value in metrics.items():
+            self.stdout.write(f"{name}: {value}")
+
+        requested = metrics["renders"] + metrics["coalesced"]
+        if requested:
+            ratio = metrics["coalesced"] / requested
+            self.stdout.write(f"coalesced ratio: {ratio:.1%}")
+
+        if options["reset"]:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,33 @@
+"""
+Django management command to pre-render public pages into the response cache.
+"""
+from django.core.management.base import BaseCommand
+
+from core.warmup import collect_urls, warm
+
+
+class Command(BaseCommand):
+    help = "Renders live pages, their filters and the schedule weeks into the cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel renders")
+        parser.add_argument("--budget", type=float, default=120.0, help="Time budget in seconds")
+        parser.add_argument(
+            "--base-url",
+            default=None,
+            help="Site URL for non-page views (defaults to WAGTAILADMIN_BASE_URL)",
+        )
+
+    def handle(self, *args, **options):
+        urls = collect_urls(options["base_url"])
+        self.stdout.write(f"Warming {len(urls)} URLs...")
+
+        result = warm(urls, concurrency=options["concurrency"], budget=options["budget"])
+
+        for url, error in result.failed:
+            self.stderr.write(f"✗ {url}: {error}")
+        if result.skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {len(result.skipped)} URLs (redirects or time budget exceeded)"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Rendered {len(result.rendered)} URLs in {result.elapsed:.1f}s")
+        )
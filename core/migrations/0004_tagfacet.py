@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_sitesettings'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('wagtailcore', '0097_baselogentry_uuid_action_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('index_page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_facets', to='wagtailcore.page')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taggit.tag')),
+            ],
+            options={
+                'verbose_name': 'Лічильник тегу',
+                'verbose_name_plural': 'Лічильники тегів',
+                'constraints': [models.UniqueConstraint(fields=('index_page', 'tag'), name='unique_tag_facet')],
+            },
+        ),
+    ]
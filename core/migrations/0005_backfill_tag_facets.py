@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count
+
+# (index page, child page, tag through-model) of every page with tag facets.
+FACETED_PAGES = (
+    ("news.NewsIndexPage", "news.NewsPage", "news.NewsPageTag"),
+    ("gallery.GalleryIndexPage", "gallery.GalleryAlbumPage", "gallery.GalleryAlbumTag"),
+)
+
+
+def backfill_tag_facets(apps, schema_editor):
+    TagFacet = apps.get_model("core", "TagFacet")
+    for index_label, child_label, through_label in FACETED_PAGES:
+        child_model = apps.get_model(child_label)
+        through = apps.get_model(through_label)
+        for index_page in apps.get_model(index_label).objects.all():
+            # View restrictions are not checked here; the next publish or
+            # unpublish under the index recounts with them.
+            children = child_model.objects.filter(
+                path__startswith=index_page.path, depth=index_page.depth + 1, live=True
+            ).values("pk")
+            counts = (
+                through.objects.filter(content_object__in=children)
+                .values_list("tag_id")
+                .annotate(count=Count("pk"))
+                .order_by()
+            )
+            TagFacet.objects.bulk_create(
+                TagFacet(index_page_id=index_page.pk, tag_id=tag_id, count=count)
+                for tag_id, count in counts
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_tagfacet"),
+        ("gallery", "0004_alter_galleryalbumpage_options"),
+        ("news", "0007_page_first_published_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tag_facets, migrations.RunPython.noop),
+    ]
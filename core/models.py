@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.functional import cached_property
 from wagtail.admin.panels import FieldPanel, InlinePanel
 from wagtail.models import Orderable
 from wagtail.snippets.models import register_snippet
@@ -36,7 +37,7 @@ class SidebarSection(ClusterableModel):
         InlinePanel('links', label="Посилання"),
     ]
 
-    @property
+    @cached_property
     def valid_links(self):
         """Returns only valid, live links for this section"""
         return [link for link in self.links.all() if link.is_valid]
@@ -166,6 +167,28 @@ class SiteSettings(BaseSiteSetting):
         return self.site_name or self.site.hostname
 
 
+class TagFacet(models.Model):
+    """Number of live children of an index page carrying a tag (see ``core.facets``)."""
+
+    index_page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name="tag_facets")
+    tag = models.ForeignKey("taggit.Tag", on_delete=models.CASCADE, related_name="+")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["index_page", "tag"], name="unique_tag_facet"),
+        ]
+        verbose_name = "Лічильник тегу"
+        verbose_name_plural = "Лічильники тегів"
+
+    @property
+    def name(self) -> str:
+        return self.tag.name
+
+    def __str__(self) -> str:
+        return f"{self.tag.name} ({self.count})"
+
+
 class CTABlock(blocks.StructBlock):
     text = blocks.CharBlock(label="Текст", max_length=100)
     page = blocks.PageChooserBlock(required=False, label="Сторінка")
@@ -0,0 +1,184 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.contrib.settings.models import BaseGenericSetting, BaseSiteSetting
+from wagtail.models import Page, PageViewRestriction
+from wagtail.signals import page_published, page_unpublished, post_page_move
+from wagtail.snippets.models import get_snippet_models
+
+from core.bake import discard, invalidated_files, rebake_in_background
+from core.cache import cache_invalidated, invalidate, model_tag, page_tag, run_in_background
+from core.facets import facet_through, faceted_page_classes, refresh_tag_facets_on_commit
+from core.models import SidebarLink, SidebarSection
+from core.warmup import page_urls, warm
+
+
+_bulk_changes = threading.local()
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Skip per-object invalidation for saves, deletes and publishes inside the block.
+
+    For bulk writes that invalidate once themselves when they are done.
+    """
+    _bulk_changes.active = True
+    try:
+        yield
+    finally:
+        _bulk_changes.active = False
+
+
+def in_bulk_changes() -> bool:
+    return getattr(_bulk_changes, "active", False)
+
+
+def is_tracked_model(model) -> bool:
+    """Snippets and settings are rendered into cached responses."""
+    return model in get_snippet_models() or issubclass(
+        model, (BaseSiteSetting, BaseGenericSetting)
+    )
+
+
+def invalidate_on_commit(*tags):
+    # Wait for the transaction so inline children (e.g. sidebar links) are
+    # saved before a concurrent request can re-cache the old state.
+    transaction.on_commit(lambda: invalidate(*tags))
+
+
+def page_dependency_tags(page, *parents):
+    """Tags affected by a change to ``page``: itself, its listings and the sidebar."""
+    tags = {page_tag(page), model_tag(page.specific_class)}
+    tags.update(page_tag(parent) for parent in parents if parent is not None)
+    if SidebarLink.objects.filter(page_id=page.pk).exists():
+        tags.add(model_tag(SidebarSection))
+    return tags
+
+
+def parent_page(page):
+    return Page.objects.filter(path=page.path[: -Page.steplen]).first()
+
+
+def refresh_parent_tag_facets(*parents):
+    """
+    Recount the tag facets of ``parents`` on commit.
+
+    Call before invalidating the parents: on_commit callbacks run in order,
+    and a request between an invalidation and the recount would cache the
+    old counts.
+    """
+    if in_bulk_changes():
+        return
+    for parent in parents:
+        if parent is not None and facet_through(parent.specific_class):
+            refresh_tag_facets_on_commit(parent.pk)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def invalidate_page_cache(sender, instance, **kwargs):
+    if in_bulk_changes():
+        return
+    parent = instance.get_parent()
+    refresh_parent_tag_facets(parent)
+    invalidate_on_commit(*page_dependency_tags(instance, parent))
+
+
+@receiver(page_published)
+def warm_published_page(sender, instance, **kwargs):
+    if in_bulk_changes() or not settings.WARM_CACHE_ON_PUBLISH:
+        return
+    pages = [instance.specific, instance.get_parent().specific]
+    transaction.on_commit(
+        lambda: run_in_background(
+            lambda: warm([url for page in pages for url in page_urls(page)], budget=60)
+        )
+    )
+
+
+@receiver(post_page_move)
+def invalidate_moved_page_cache(sender, instance, parent_page_before, parent_page_after, **kwargs):
+    refresh_parent_tag_facets(parent_page_before, parent_page_after)
+    invalidate_on_commit(
+        *page_dependency_tags(instance, parent_page_before, parent_page_after)
+    )
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def invalidate_restricted_page_cache(sender, instance, **kwargs):
+    # Baked files are served before Wagtail checks view restrictions, and
+    # listings only show public children, so both go for the whole subtree.
+    page = Page.objects.filter(pk=instance.page_id).first()
+    if page is None:
+        return
+    pages = list(Page.objects.descendant_of(page, inclusive=True).select_related("content_type"))
+    parent = parent_page(page)
+    tags = {page_tag(parent)} if parent is not None else set()
+    for subtree_page in pages:
+        tags.add(page_tag(subtree_page))
+        if subtree_page.specific_class is not None:
+            tags.add(model_tag(subtree_page.specific_class))
+    refresh_parent_tag_facets(parent, *pages)
+    invalidate_on_commit(*tags)
+
+
+@receiver(post_delete, sender=Page)
+def invalidate_deleted_page_cache(sender, instance, **kwargs):
+    tags = {page_tag(instance), model_tag(SidebarSection)}
+    if instance.specific_class is not None:
+        tags.add(model_tag(instance.specific_class))
+    parent = parent_page(instance)
+    if parent is not None:
+        tags.add(page_tag(parent))
+    refresh_parent_tag_facets(parent)
+    invalidate_on_commit(*tags)
+
+
+def refresh_tagged_page_facets(sender, instance, **kwargs):
+    """Tags of a live page changed without a publish, e.g. by a script saving the page."""
+    if in_bulk_changes():
+        return
+    page = Page.objects.filter(pk=instance.content_object_id, live=True).only("path").first()
+    parent = parent_page(page) if page is not None else None
+    if parent is not None:
+        refresh_tag_facets_on_commit(parent.pk)
+        # The through model's tag versions the ``lookup_param`` values.
+        invalidate_on_commit(page_tag(page), page_tag(parent), model_tag(sender))
+
+
+for page_class in faceted_page_classes():
+    through = facet_through(page_class)
+    post_save.connect(
+        refresh_tagged_page_facets, sender=through, dispatch_uid=f"tag-facets-{through._meta.label}"
+    )
+    post_delete.connect(
+        refresh_tagged_page_facets, sender=through, dispatch_uid=f"tag-facets-{through._meta.label}"
+    )
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_snippet_cache(sender, instance, **kwargs):
+    # Unpublished snippet rows (e.g. lessons of a schedule draft) are not rendered anywhere.
+    if in_bulk_changes() or not getattr(instance, "is_published", True):
+        return
+    if sender is SidebarLink:
+        sender = SidebarSection
+    if is_tracked_model(sender):
+        invalidate_on_commit(model_tag(sender))
+
+
+@receiver(cache_invalidated)
+def rebake_invalidated_files(sender, tags, **kwargs):
+    if not settings.BAKE_DIR:
+        return
+    relpaths = invalidated_files(tags)
+    if relpaths:
+        discard(relpaths)
+        rebake_in_background(relpaths)
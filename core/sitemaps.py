@@ -9,5 +9,9 @@ class WagtailPageSitemap(Sitemap):
     def items(self):
         return Page.objects.live().public().specific().order_by("-first_published_at")
 
+    def location(self, obj):
+        # Pages have no get_absolute_url(); the sitemap adds the domain itself.
+        return obj.get_url()
+
     def lastmod(self, obj):
         return obj.latest_revision_created_at or obj.last_published_at or obj.first_published_at
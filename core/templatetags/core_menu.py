@@ -1,4 +1,5 @@
 from django import template
+from core.cache import get_versions, model_tag
 from core.models import SidebarSection
 
 register = template.Library()
@@ -29,6 +30,18 @@ PAGE_ICON_MAP = {
 }
 
 
+@register.simple_tag
+def navigation_version():
+    """
+    Version of the sidebar navigation, used as the fragment cache key.
+
+    It changes whenever a sidebar section or link is saved or a linked page
+    is published, unpublished, moved or deleted.
+    """
+    tag = model_tag(SidebarSection)
+    return get_versions([tag])[tag]
+
+
 @register.simple_tag
 def get_sidebar_sections():
     """Get all sidebar sections with their valid live links"""
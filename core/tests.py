@@ -1,6 +1,40 @@
-from django.test import TestCase
+import gzip
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from taggit.models import Tag
+from wagtail.models import Page, PageViewRestriction, Site
 from wagtail.rich_text import expand_db_html
 
+from core.bake import BakedPageMiddleware, bake, baked_path, baked_url, invalidated_files
+from core.cache import (
+    add_cache_dependencies,
+    cache_response,
+    canonical_query,
+    choice_param,
+    current_entry,
+    get_metrics,
+    invalidate,
+    lookup_param,
+    model_tag,
+    page_tag,
+    response_cache_key,
+)
+from core.cache_backends import TieredCache
+from core.facets import tag_facets
+from core.models import SidebarLink, SidebarSection
+from core.wagtail_hooks import serve_not_modified
+from core.warmup import page_urls, schedule_urls, warm
+from news.models import NewsIndexPage, NewsPage
+from schedule.views import normalize_week_filter
+
 
 class ExternalLinkHandlerTest(TestCase):
     def test_external_http_link_opens_in_new_tab(self):
@@ -27,3 +61,509 @@ class ExternalLinkHandlerTest(TestCase):
         output_html = expand_db_html(input_html)
         self.assertNotIn('target="_blank"', output_html)
         self.assertIn('href="#heading"', output_html)
+
+
+class ResponseCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.root_page = Page.objects.get(pk=1)
+        self.index = NewsIndexPage(title="Новини", slug="news-cache-test")
+        self.root_page.add_child(instance=self.index)
+
+    def _cached_view(self, body, *tags):
+        @cache_response(60, dependencies=tags)
+        def view(request):
+            return HttpResponse(body)
+
+        return view
+
+    def test_invalidate_evicts_only_tagged_responses(self):
+        news_view = self._cached_view("news", page_tag(self.index))
+        schedule_view = self._cached_view("schedule", model_tag("schedule.Lesson"))
+        news_view(self.factory.get("/news/"))
+        schedule_view(self.factory.get("/schedule/"))
+
+        invalidate(page_tag(self.index))
+
+        self.assertIsNone(current_entry(response_cache_key(self.factory.get("/news/"))))
+        self.assertIsNotNone(current_entry(response_cache_key(self.factory.get("/schedule/"))))
+
+    def test_invalidated_response_is_rerendered(self):
+        renders = []
+
+        @cache_response(60, stale_while_revalidate=60)
+        def view(request):
+            renders.append(request)
+            return HttpResponse(f"render {len(renders)}")
+
+        view(self.factory.get("/about/"))
+        self.assertEqual(view(self.factory.get("/about/")).content, b"render 1")
+        invalidate(model_tag("core.SidebarSection"))
+        self.assertEqual(view(self.factory.get("/about/")).content, b"render 2")
+
+    def test_change_committed_during_render_leaves_entry_outdated(self):
+        @cache_response(60)
+        def view(request):
+            add_cache_dependencies(request, page_tag(self.index))
+            # An editor publishes while the view is still reading data.
+            invalidate(page_tag(self.index))
+            return HttpResponse("news")
+
+        request = self.factory.get("/news/")
+        view(request)
+        self.assertIsNotNone(cache.get(response_cache_key(request)))
+        self.assertIsNone(current_entry(response_cache_key(request)))
+
+    def test_session_requests_bypass_cache(self):
+        view = self._cached_view("news")
+        request = self.factory.get("/news/")
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = "editor"
+        view(request)
+        self.assertIsNone(cache.get(response_cache_key(request)))
+
+    def test_publishing_child_evicts_index_listing(self):
+        view = self._cached_view("news", page_tag(self.index))
+        request = self.factory.get("/news/")
+        view(request)
+
+        article = NewsPage(title="Стаття", intro="Вступ")
+        self.index.add_child(instance=article)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+
+        self.assertIsNone(current_entry(response_cache_key(request)))
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+
+        @cache_response(60, stale_while_revalidate=120)
+        def view(request):
+            self.renders += 1
+            return HttpResponse(f"render {self.renders}")
+
+        self.view = view
+
+    def _expire(self, request):
+        key = response_cache_key(request)
+        fresh_until, *entry = cache.get(key)
+        cache.set(key, (time.time() - 1, *entry), 120)
+
+    def test_stale_response_is_served_while_rerendering_once(self):
+        request = self.factory.get("/schedule/")
+        self.view(request)
+        self._expire(request)
+
+        with mock.patch("core.cache.run_in_background") as run_in_background:
+            first = self.view(self.factory.get("/schedule/"))
+            second = self.view(self.factory.get("/schedule/"))
+
+        self.assertEqual(first.content, b"render 1")
+        self.assertEqual(second.content, b"render 1")
+        self.assertEqual(run_in_background.call_count, 1)
+
+        run_in_background.call_args.args[0]()
+        self.assertEqual(self.view(request).content, b"render 2")
+
+    def test_fresh_response_does_not_rerender(self):
+        request = self.factory.get("/schedule/")
+        self.view(request)
+        with mock.patch("core.cache.run_in_background") as run_in_background:
+            self.view(request)
+        run_in_background.assert_not_called()
+        self.assertIn("stale-while-revalidate=120", self.view(request)["Cache-Control"])
+
+
+class PrecompressedResponseTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.body = "<p>Розклад</p>" * 100
+
+        @cache_response(60)
+        def view(request):
+            return HttpResponse(self.body)
+
+        self.view = view
+
+    def test_cache_hit_serves_stored_gzip(self):
+        self.view(self.factory.get("/schedule/"))
+        with mock.patch("core.cache.compress_string") as compress_string:
+            response = self.view(self.factory.get("/schedule/", headers={"accept-encoding": "gzip"}))
+
+        compress_string.assert_not_called()
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content).decode(), self.body)
+
+    def test_client_without_gzip_gets_identity(self):
+        self.view(self.factory.get("/schedule/", headers={"accept-encoding": "gzip"}))
+        response = self.view(self.factory.get("/schedule/"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content.decode(), self.body)
+
+    def test_entry_holds_only_compressed_body(self):
+        request = self.factory.get("/schedule/")
+        self.view(request)
+        _, response, encodings, _ = cache.get(response_cache_key(request))
+        self.assertEqual(response.content, b"")
+        self.assertNotIn("identity", encodings)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+
+        @cache_response(60)
+        def view(request):
+            self.renders += 1
+            return HttpResponse("rendered")
+
+        self.view = view
+
+    def test_waiting_request_receives_other_workers_render(self):
+        request = self.factory.get("/gallery/")
+        key = response_cache_key(request)
+        cache.add(f"render-lock:{key}", True)
+
+        def other_worker_finishes(seconds):
+            entry = (time.time() + 60, HttpResponse(), {"identity": b"from other worker"}, {})
+            cache.set(key, entry)
+
+        with mock.patch("core.cache.time.sleep", side_effect=other_worker_finishes):
+            response = self.view(request)
+
+        self.assertEqual(response.content, b"from other worker")
+        self.assertEqual(self.renders, 0)
+        self.assertEqual(get_metrics()["coalesced"], 1)
+
+    def test_renders_itself_when_lock_is_released_without_entry(self):
+        request = self.factory.get("/gallery/")
+        lock_key = f"render-lock:{response_cache_key(request)}"
+        cache.add(lock_key, True)
+
+        with mock.patch("core.cache.time.sleep", side_effect=lambda seconds: cache.delete(lock_key)):
+            response = self.view(request)
+
+        self.assertEqual(response.content, b"rendered")
+        self.assertEqual(get_metrics()["renders"], 1)
+
+
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.index = NewsIndexPage(title="Новини", slug="news-etag-test")
+        Page.objects.get(pk=1).add_child(instance=self.index)
+        self.index.save_revision().publish()
+        self.renders = 0
+
+        def next_serve_page(page, request, args, kwargs):
+            self.renders += 1
+            return HttpResponse("page")
+
+        self.serve = serve_not_modified(next_serve_page)
+
+    def _get(self, **headers):
+        return self.serve(self.index, self.factory.get("/news/", headers=headers), (), {})
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        etag = self._get()["ETag"]
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.renders, 1)
+
+    def test_child_publish_changes_index_etag(self):
+        etag = self._get()["ETag"]
+        article = NewsPage(title="Стаття", intro="Вступ")
+        self.index.add_child(instance=article)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+
+        response = self._get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_sidebar_change_changes_etag(self):
+        etag = self._get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            SidebarSection.objects.create(title="Розділ")
+        self.assertEqual(self._get(if_none_match=etag).status_code, 200)
+
+
+class SidebarFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.section = SidebarSection.objects.create(title="Розклад")
+        SidebarLink.objects.create(section=self.section, label="Розклад", external_url="https://example.com/")
+
+    def _render(self):
+        return render_to_string("includes/sidebar.html")
+
+    def test_second_render_skips_sidebar_queries(self):
+        self.assertIn("Розклад", self._render())
+        with self.assertNumQueries(0):
+            self._render()
+
+    def test_saving_section_refreshes_fragment(self):
+        self._render()
+        self.section.title = "Новий розклад"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.section.save()
+        self.assertIn("Новий розклад", self._render())
+
+
+class CanonicalQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.query_params = {
+            "week": normalize_week_filter,
+            "view": choice_param({"albums", "photos"}, default="albums"),
+            "tag": lookup_param("news.NewsPageTag", "tag__name"),
+        }
+
+    def _query(self, path):
+        return canonical_query(self.factory.get(path), self.query_params)
+
+    def test_invalid_values_share_the_default_key(self):
+        self.assertEqual(self._query("/schedule/?week=bad"), self._query("/schedule/"))
+        self.assertEqual(self._query("/gallery/?view=grid"), self._query("/gallery/?view=albums"))
+
+    def test_parameter_order_does_not_matter(self):
+        self.assertEqual(
+            self._query("/gallery/?view=photos&week=2"),
+            self._query("/gallery/?week=2&view=photos"),
+        )
+
+    def test_unknown_parameters_and_tags_bypass_the_cache(self):
+        self.assertIsNone(self._query("/schedule/?page=2"))
+        self.assertIsNone(self._query("/news/?tag=missing"))
+
+    def test_tracking_parameters_are_ignored(self):
+        self.assertEqual(self._query("/schedule/?utm_source=fb&fbclid=x"), self._query("/schedule/"))
+
+    def test_lookup_values_are_cached_until_the_model_changes(self):
+        index = NewsIndexPage(title="Новини", slug="news-lookup-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=index)
+        article = NewsPage(title="Стаття", intro="Вступ")
+        index.add_child(instance=article)
+        article.tags.add("Спорт")
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+
+        sport = "tag=%D0%A1%D0%BF%D0%BE%D1%80%D1%82"
+        self.assertIn(sport, self._query(f"/news/?{sport}"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._query("/news/?tag=missing"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NewsPage.tags.through.objects.create(content_object=article, tag=Tag.objects.create(name="missing"))
+        self.assertIn("tag=missing", self._query("/news/?tag=missing"))
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        params = {"OPTIONS": {"L2": "default", "STAMP_CHECK_INTERVAL": 0}}
+        # Two instances over the same L2 stand in for two gunicorn workers.
+        self.worker_a = TieredCache(None, params)
+        self.worker_b = TieredCache(None, params)
+
+    def test_l1_serves_response_keys_without_l2(self):
+        self.worker_a.set("response:home", "cached")
+        cache.delete("response:home")
+        self.assertEqual(self.worker_a.get("response:home"), "cached")
+
+    def test_other_prefixes_bypass_l1(self):
+        self.worker_a.set("cachedeps:page:1", {"response:home"})
+        cache.delete("cachedeps:page:1")
+        self.assertIsNone(self.worker_a.get("cachedeps:page:1"))
+
+    def test_delete_on_one_worker_evicts_l1_on_the_other(self):
+        self.worker_a.set("response:home", "cached")
+        self.assertEqual(self.worker_b.get("response:home"), "cached")
+
+        self.worker_a.delete("response:home")
+
+        self.assertIsNone(self.worker_b.get("response:home"))
+
+    def test_overwrite_keeps_other_workers_l1(self):
+        self.worker_a.set("response:home", "cached")
+        self.worker_a.set("response:news", "old")
+        self.assertEqual(self.worker_b.get("response:home"), "cached")
+        cache.delete("response:home")
+
+        self.worker_a.set("response:news", "new")
+
+        self.assertEqual(self.worker_b.get("response:home"), "cached")
+        self.assertEqual(self.worker_a.get("response:news"), "new")
+
+    def test_l1_is_bounded(self):
+        worker = TieredCache(None, {"OPTIONS": {"L2": "default", "L1_MAX_ENTRIES": 2}})
+        for name in ("a", "b", "c"):
+            worker.set(f"response:{name}", name)
+        self.assertEqual(len(worker._l1), 2)
+
+
+class WarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_warm_fills_schedule_weeks(self):
+        urls = schedule_urls("http://testserver")
+        result = warm(urls, concurrency=1)
+
+        self.assertEqual(result.rendered, urls)
+        for week in ("1", "4"):
+            request = self.factory.get("/schedule/", {"week": week})
+            self.assertIsNotNone(cache.get(response_cache_key(request, f"week={week}")))
+
+    def test_page_urls_include_filter_queries(self):
+        index = NewsIndexPage(title="Новини", slug="news-warm-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=index)
+        article = NewsPage(title="Стаття", intro="Вступ")
+        index.add_child(instance=article)
+        article.tags.add("Спорт")
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+
+        urls = page_urls(NewsIndexPage.objects.get(pk=index.pk))
+
+        self.assertEqual(len(urls), 2)
+        self.assertTrue(urls[1].endswith("?tag=%D0%A1%D0%BF%D0%BE%D1%80%D1%82"))
+
+    def test_budget_skips_remaining_urls(self):
+        result = warm(["http://testserver/a/", "http://testserver/b/"], concurrency=1, budget=-1)
+        self.assertEqual(len(result.skipped), 2)
+
+
+class BakeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        bake_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, bake_dir, ignore_errors=True)
+        settings_override = override_settings(BAKE_DIR=bake_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.middleware = BakedPageMiddleware(lambda request: HttpResponse("django"))
+
+    def test_baked_path_round_trips_query(self):
+        relpath = baked_path("/gallery/", "view=photos&tag=%D0%A1&utm_source=x")
+        self.assertEqual(baked_path("/gallery/", "tag=%D0%A1&view=photos"), relpath)
+        self.assertEqual(
+            baked_url(relpath, "http://testserver"),
+            "http://testserver/gallery/?tag=%D0%A1&view=photos",
+        )
+
+    def test_baked_schedule_is_served_and_evicted_with_its_tags(self):
+        bake(["http://testserver/schedule/?week=2"], concurrency=1)
+
+        response = self.middleware(self.factory.get("/schedule/", {"week": "2"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"<html", b"".join(response))
+
+        with mock.patch("core.signals.rebake_in_background") as rebake:
+            invalidate(model_tag("schedule.Lesson"))
+
+        rebake.assert_called_once_with(["schedule/index.week%3D2.html"])
+        response = self.middleware(self.factory.get("/schedule/", {"week": "2"}))
+        self.assertEqual(response.content, b"django")
+
+    def test_separate_bakes_share_the_tag_index(self):
+        bake(["http://testserver/schedule/?week=1"], concurrency=1)
+        bake(["http://testserver/schedule/?week=2"], concurrency=1)
+
+        with mock.patch("core.signals.rebake_in_background") as rebake, mock.patch("os.walk") as walk:
+            invalidate(model_tag("schedule.Lesson"))
+
+        walk.assert_not_called()
+        rebake.assert_called_once_with(["schedule/index.week%3D1.html", "schedule/index.week%3D2.html"])
+        self.assertEqual(invalidated_files([model_tag("schedule.Lesson")]), [])
+
+    def test_restricting_a_page_discards_its_baked_subtree(self):
+        index = NewsIndexPage(title="Новини", slug="news-bake-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=index)
+        article = NewsPage(title="Стаття", intro="Вступ")
+        index.add_child(instance=article)
+        article.save_revision().publish()
+        bake([f"http://testserver{index.url}", f"http://testserver{article.url}"], concurrency=1)
+        self.assertEqual(self.middleware(self.factory.get(article.url)).status_code, 200)
+
+        with mock.patch("core.signals.rebake_in_background") as rebake:
+            with self.captureOnCommitCallbacks(execute=True):
+                PageViewRestriction.objects.create(page=index, restriction_type=PageViewRestriction.LOGIN)
+
+        baked_files = [f"{page.url.lstrip('/')}index.html" for page in (index, article)]
+        self.assertEqual(sorted(rebake.call_args.args[0]), sorted(baked_files))
+        for url in (index.url, article.url):
+            self.assertEqual(self.middleware(self.factory.get(url)).content, b"django")
+
+    def test_editors_bypass_baked_files(self):
+        bake(["http://testserver/schedule/?week=1"], concurrency=1)
+        request = self.factory.get("/schedule/", {"week": "1"})
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = "editor"
+        self.assertEqual(self.middleware(request).content, b"django")
+
+
+class TagFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = NewsIndexPage(title="Новини", slug="news-facets-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=self.index)
+
+    def _article(self, title, *tags):
+        article = NewsPage(title=title, intro="Вступ")
+        self.index.add_child(instance=article)
+        article.tags.add(*tags)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+        return article
+
+    def _counts(self):
+        return {facet.name: facet.count for facet in tag_facets(self.index)}
+
+    def test_counts_follow_publish_tag_changes_and_delete(self):
+        first = self._article("Перша", "Спорт", "Олімпіади")
+        second = self._article("Друга", "Спорт")
+        self.assertEqual(self._counts(), {"Олімпіади": 1, "Спорт": 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.tags.add("Олімпіади")
+            second.save()
+        self.assertEqual(self._counts(), {"Олімпіади": 2, "Спорт": 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.unpublish()
+        self.assertEqual(self._counts(), {"Олімпіади": 1, "Спорт": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self._counts(), {})
+
+    def test_cached_index_shows_counts_after_unpublish(self):
+        self._article("Перша", "Спорт")
+        second = self._article("Друга", "Спорт")
+        self.client.get(self.index.url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            second.unpublish()
+        # A visitor may request the index between any two callbacks.
+        for callback in callbacks:
+            callback()
+            self.client.get(self.index.url)
+        self.assertContains(self.client.get(self.index.url), 'Спорт <span class="opacity-75">(1)</span>')
+
+    def test_filter_bar_shows_counts(self):
+        self._article("Перша", "Спорт")
+        self._article("Друга", "Спорт")
+        response = self.client.get(self.index.url)
+        self.assertContains(response, "Спорт <span")
+        self.assertContains(response, "(2)")
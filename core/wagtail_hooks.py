@@ -1,7 +1,12 @@
+from django.utils.cache import get_conditional_response
 from django.utils.html import escape
+from django.utils.http import http_date
 from wagtail import hooks
 from wagtail.rich_text import LinkHandler
 
+from core.cache import add_cache_dependencies, is_cacheable_request
+from core.conditional import page_dependencies, page_validators
+
 
 class ExternalLinkHandler(LinkHandler):
     identifier = "external"
@@ -35,3 +40,30 @@ def register_underline_feature(features):
     if "underline" not in features.default_features:
         features.default_features.append("underline")
 
+
+@hooks.register("on_serve_page")
+def serve_not_modified(next_serve_page):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before the page renders,
+    and send ETag / Last-Modified on full responses to anonymous visitors.
+    """
+
+    def serve_page(page, request, args, kwargs):
+        if not is_cacheable_request(request):
+            return next_serve_page(page, request, args, kwargs)
+
+        add_cache_dependencies(request, *page_dependencies(page))
+        etag, last_modified = page_validators(page)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = next_serve_page(page, request, args, kwargs)
+        if response.status_code == 200 and not response.has_header("ETag"):
+            # Pre-compressed cached bodies differ byte-wise per encoding,
+            # so the validator is weak, as GZipMiddleware would make it.
+            response["ETag"] = f"W/{etag}" if response.has_header("Content-Encoding") else etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    return serve_page
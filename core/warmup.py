@@ -0,0 +1,139 @@
+"""
+Cache warm-up: render public URLs so the first visitors after a deploy or a
+publish hit the shared response cache instead of paying for cold renders.
+
+Index pages list their filter combinations through an optional
+``cache_warm_queries()`` method returning dicts of GET parameters.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from wagtail.models import Page
+
+from schedule.models import ClassGroup, Lesson, Week
+
+
+@dataclass
+class WarmupResult:
+    rendered: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def page_urls(page):
+    """Full URLs for ``page`` and each of its filter combinations."""
+    base_url = page.get_full_url()
+    if not base_url:
+        return []
+    urls = [base_url]
+    for query in getattr(page, "cache_warm_queries", lambda: [])():
+        urls.append(f"{base_url}?{urlencode(query)}")
+    return urls
+
+
+def schedule_urls(base_url=None):
+    """Every week of the full timetable and of each class and cabinet slice."""
+    base_url = (base_url or settings.WAGTAILADMIN_BASE_URL).rstrip("/")
+    paths = [reverse("schedule")]
+    paths += [
+        reverse("schedule_class", args=[pk]) for pk in ClassGroup.objects.values_list("pk", flat=True)
+    ]
+    cabinets = Lesson.objects.published().exclude(cabinet="").order_by().values_list("cabinet", flat=True)
+    paths += [reverse("schedule_cabinet", args=[cabinet]) for cabinet in cabinets.distinct()]
+    return [f"{base_url}{path}?week={number}" for path in paths for number, _ in Week.choices]
+
+
+def collect_urls(base_url=None):
+    """Every live public page with its filters, plus the schedule weeks."""
+    urls = []
+    for page in Page.objects.live().public().specific().order_by("depth", "path"):
+        urls.extend(page_urls(page))
+    urls.extend(schedule_urls(base_url))
+    return urls
+
+
+_clients = threading.local()
+
+
+def render(url, **extra):
+    """Render ``url`` in-process as an anonymous visitor; ``extra`` goes to the WSGI environ."""
+    if not hasattr(_clients, "client"):
+        _clients.client = Client()
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    # Behind the proxy request.scheme comes from X-Forwarded-Proto, and the
+    # scheme is part of the response cache key.
+    response = _clients.client.get(
+        path,
+        headers={"host": parts.netloc, "x-forwarded-proto": parts.scheme},
+        secure=parts.scheme == "https",
+        **extra,
+    )
+    return response
+
+
+def fetch(url):
+    return render(url).status_code
+
+
+def _in_thread(func, url):
+    try:
+        return func(url)
+    finally:
+        connections.close_all()
+
+
+def warm(urls, concurrency=4, budget=120.0, func=fetch):
+    """
+    Call ``func`` (a URL to status code callable) on ``urls`` with up to
+    ``concurrency`` threads.
+
+    URLs not started within ``budget`` seconds, redirects and URLs for which
+    ``func`` returns ``None`` are skipped.
+    """
+    result = WarmupResult()
+    started = time.monotonic()
+    urls = list(dict.fromkeys(urls))
+
+    if concurrency <= 1:
+        for url in urls:
+            if time.monotonic() - started > budget:
+                result.skipped.append(url)
+                continue
+            _record(result, url, func, url)
+    else:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = {executor.submit(_in_thread, func, url): url for url in urls}
+        wait(futures, timeout=budget)
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, url in futures.items():
+            if future.cancelled():
+                result.skipped.append(url)
+            else:
+                _record(result, url, future.result)
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _record(result, url, func, *args):
+    try:
+        status = func(*args)
+    except Exception as exc:
+        result.failed.append((url, repr(exc)))
+        return
+    if status == 200:
+        result.rendered.append(url)
+    elif status is None or status < 400:
+        # Redirects are not cached; nothing to warm.
+        result.skipped.append(url)
+    else:
+        result.failed.append((url, status))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_alter_publicdocumentpage_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='documentsindexpage',
+            options={'verbose_name': 'Документи', 'verbose_name_plural': 'Документи'},
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 
 from wagtail.admin.panels import FieldPanel
 from wagtail.fields import RichTextField
@@ -11,6 +12,14 @@ from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
 from taggit.models import TaggedItemBase
 
+from core.cache import (
+    add_cache_dependencies,
+    cache_response,
+    lookup_param,
+    model_tag,
+    page_tag,
+)
+
 
 def current_year() -> int:
     return timezone.now().year
@@ -70,8 +79,44 @@ class DocumentsIndexPage(Page):
         verbose_name = "Документи"
         verbose_name_plural = "Документи"
 
+    cache_dependencies = (model_tag("documents.DocumentType"),)
+
+    @method_decorator(
+        cache_response(
+            60 * 15,
+            dependencies=cache_dependencies,
+            stale_while_revalidate=60 * 45,
+            query_params={
+                "type": lookup_param("documents.DocumentType", "slug"),
+                "year": lookup_param("documents.PublicDocumentPage", "year"),
+                "tag": lookup_param(PublicDocumentPageTag, "tag__name"),
+            },
+        )
+    )
+    def serve(self, request, *args, **kwargs):
+        return super().serve(request, *args, **kwargs)
+
+    def cache_warm_queries(self):
+        """Single-filter views for ``warm_cache``; combined filters render on demand."""
+        documents = PublicDocumentPage.objects.child_of(self).live().public().order_by()
+        queries = [
+            {"type": slug}
+            for slug in documents.exclude(doc_type=None)
+            .values_list("doc_type__slug", flat=True)
+            .distinct()
+        ]
+        queries += [{"year": year} for year in documents.values_list("year", flat=True).distinct()]
+        queries += [
+            {"tag": name}
+            for name in PublicDocumentPageTag.objects.filter(content_object__in=documents)
+            .values_list("tag__name", flat=True)
+            .distinct()
+        ]
+        return queries
+
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
+        add_cache_dependencies(request, page_tag(self))
         documents = (
             PublicDocumentPage.objects.child_of(self)
             .live()
@@ -172,6 +217,8 @@ class PublicDocumentPage(Page):
     parent_page_types = ["documents.DocumentsIndexPage"]
     subpage_types = []
 
+    cache_dependencies = (model_tag("documents.DocumentType"),)
+
     class Meta:
         verbose_name = "Публічний документ"
         verbose_name_plural = "Публічні документи"
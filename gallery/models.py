@@ -3,16 +3,27 @@ from datetime import datetime, time
 from django.db import models
 from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
-from taggit.models import Tag, TaggedItemBase
+from taggit.models import TaggedItemBase
 from wagtail.admin.panels import FieldPanel, InlinePanel
 from wagtail.fields import RichTextField
 from wagtail.models import Orderable, Page
 from wagtail.search import index
 
+from core.cache import (
+    add_cache_dependencies,
+    cache_response,
+    choice_param,
+    lookup_param,
+    page_tag,
+)
+from core.facets import tag_facets
+
+VIEW_MODES = {"albums", "photos"}
+
+
 class GalleryIndexPage(Page):
     """Index page for the photo gallery"""
 
@@ -28,6 +39,8 @@ class GalleryIndexPage(Page):
     subpage_types = ["gallery.GalleryAlbumPage"]
     max_count = 1
 
+    tag_facet_through = "gallery.GalleryAlbumTag"
+
     # Fixed slug for the gallery page
     slug = "gallery"
 
@@ -84,27 +97,43 @@ class GalleryIndexPage(Page):
     class Meta:
         verbose_name = "Галерея (системна)"
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(
+        cache_response(
+            60 * 15,
+            stale_while_revalidate=60 * 45,
+            query_params={
+                "view": choice_param(VIEW_MODES, default="albums"),
+                "tag": lookup_param("gallery.GalleryAlbumTag", "tag__name"),
+            },
+        )
+    )
     def serve(self, request, *args, **kwargs):
         return super().serve(request, *args, **kwargs)
 
+    def cache_warm_queries(self):
+        """View modes and tag filters for ``warm_cache``."""
+        queries = [{"view": "photos"}]
+        for facet in tag_facets(self):
+            queries.append({"tag": facet.name})
+            queries.append({"tag": facet.name, "view": "photos"})
+        return queries
+
     def __str__(self) -> str:
         return self.title
 
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
+        add_cache_dependencies(request, page_tag(self))
 
         # Get view mode: 'albums' (default) or 'photos'
         view_mode = request.GET.get("view", "albums")
-        if view_mode not in {"albums", "photos"}:
+        if view_mode not in VIEW_MODES:
             view_mode = "albums"
         context["view_mode"] = view_mode
 
-        all_albums = self._base_album_queryset()
-
         # Filter by tag if requested
         tag_filter = request.GET.get("tag", "").strip()
-        albums = all_albums
+        albums = self._base_album_queryset()
         if tag_filter:
             albums = albums.filter(tags__name=tag_filter).distinct()
 
@@ -115,14 +144,8 @@ class GalleryIndexPage(Page):
         if view_mode == "photos":
             context["all_photos"] = self._build_photo_list(albums)
 
-        # Get all tags for filtering logic
-        context["tags"] = (
-            Tag.objects.filter(
-                galleryalbumpage__id__in=all_albums.values_list("id", flat=True)
-            )
-            .distinct()
-            .order_by("name")
-        )
+        # Tags of the filter bar, with album counts
+        context["tags"] = tag_facets(self)
         context["current_tag"] = tag_filter
 
         return context
@@ -6,6 +6,8 @@ from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel, InlinePanel, MultiFieldPanel
 from modelcluster.fields import ParentalKey
 
+from core.cache import model_tag
+
 
 class HomePage(Page):
     """Main landing page of the site"""
@@ -43,6 +45,12 @@ class HomePage(Page):
 
     max_count = 1
 
+    # Latest news and the gallery ticker are rendered on the home page.
+    cache_dependencies = (
+        model_tag("news.NewsPage"),
+        model_tag("gallery.GalleryAlbumPage"),
+    )
+
     def serve(self, request, *args, **kwargs):
         return super().serve(request, *args, **kwargs)
 
@@ -86,12 +94,6 @@ class HomePage(Page):
     class Meta:
         verbose_name = "Головна сторінка"
 
-    def save(self, *args, **kwargs):
-        # Clear page cache so announcement changes are visible immediately
-        from django.core.cache import cache
-        cache.clear()
-        return super().save(*args, **kwargs)
-
     def __str__(self) -> str:
         return self.title
 
@@ -385,6 +387,12 @@ class AboutPage(Page):
     parent_page_types = ['home.HomePage']
     subpage_types = ['home.ContentPage', 'staff.StaffIndexPage']
 
+    cache_dependencies = (
+        model_tag("admissions.ApplicationFormPage"),
+        model_tag("staff.PersonPage"),
+        model_tag("gallery.GalleryAlbumPage"),
+    )
+
     class Meta:
         verbose_name = "Про нас"
 
@@ -217,6 +217,25 @@ WAGTAILADMIN_RICH_TEXT_EDITORS = {
 }
 
 
+# Identifies the deployed build. Cached pages and ETags from another build may
+# reference hashed static files that no longer exist.
+RELEASE_ID = os.environ.get("RAILWAY_GIT_COMMIT_SHA") or os.environ.get("RELEASE_ID", "")
+
+# Re-render a page and its parent listing right after publishing instead of
+# waiting for the next visitor (see core.warmup).
+WARM_CACHE_ON_PUBLISH = os.environ.get("WARM_CACHE_ON_PUBLISH", "").lower() in ("1", "true", "yes")
+
+# Static pre-render of the public site (see core.bake); empty disables it.
+BAKE_DIR = os.environ.get("BAKE_DIR", "")
+# Baked files older than this are re-rendered even without an invalidation.
+BAKE_MAX_AGE = int(os.environ.get("BAKE_MAX_AGE", 60 * 60))
+BAKE_BROWSER_MAX_AGE = 60
+
+
+# A day in week I of the four-week timetable rotation (see schedule.timeslots).
+SCHEDULE_ROTATION_START = os.environ.get("SCHEDULE_ROTATION_START", "2025-09-01")
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -90,6 +90,7 @@ except ValueError:
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.bake.BakedPageMiddleware",
     *MIDDLEWARE,
 ]
 
@@ -165,9 +166,36 @@ LOGGING = {
 # CACHING
 # --------------------------------------------------
 
+# Each gunicorn worker keeps a small in-process LRU (L1) in front of a cache
+# shared by all workers (L2). The database cache table is created by
+# `createcachetable` in startup.sh; set CACHE_DIR to use a file cache instead.
+
+cache_dir = os.environ.get("CACHE_DIR")
+if cache_dir:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": cache_dir,
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "mcl_site_cache",
+    }
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "mcl-site-cache",
-    }
+        "BACKEND": "core.cache_backends.TieredCache",
+        "OPTIONS": {
+            "L2": "shared",
+            # Fragment keys embed a version, so their values never change.
+            "L1_KEY_PREFIXES": ("response:", "template.cache."),
+            "L1_MAX_ENTRIES": int(os.environ.get("CACHE_L1_MAX_ENTRIES", 300)),
+        },
+    },
+    "shared": {
+        **SHARED_CACHE,
+        "KEY_PREFIX": RELEASE_ID,
+        "TIMEOUT": 60 * 15,
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
 }
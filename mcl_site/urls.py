@@ -8,14 +8,24 @@ from django.views.generic import RedirectView
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
+from wagtail.models import get_page_models
 
+from core.cache import cache_response, model_tag
 from core.sitemaps import WagtailPageSitemap
+from news import feeds as news_feeds
 from search import views as search_views
+from schedule import api as schedule_api
+from schedule import ical as schedule_ical
+from schedule import live as schedule_live
 from schedule import views as schedule_views
 
 sitemaps = {
     "pages": WagtailPageSitemap,
 }
+# Publishing any page updates the sitemap.
+sitemap_view = cache_response(
+    60 * 60, dependencies=[model_tag(model) for model in get_page_models()]
+)(sitemap)
 
 urlpatterns = [
     path("django-admin/", admin.site.urls),
@@ -23,12 +33,32 @@ urlpatterns = [
     path("documents/", include(wagtaildocs_urls)),
     path("search/", search_views.search, name="search"),
     path("schedule/", schedule_views.schedule_view, name="schedule"),
+    path("schedule/now/", schedule_live.schedule_now_view, name="schedule_now"),
+    path(
+        "schedule/class/<int:class_group_id>/",
+        schedule_views.class_schedule_view,
+        name="schedule_class",
+    ),
+    path(
+        "schedule/class/<int:class_group_id>/calendar.ics",
+        schedule_ical.class_calendar_view,
+        name="schedule_class_ical",
+    ),
+    path(
+        "schedule/cabinet/<str:cabinet>/",
+        schedule_views.cabinet_schedule_view,
+        name="schedule_cabinet",
+    ),
+    path("api/v1/schedule/", schedule_api.schedule_api, name="schedule_api"),
+    path("api/v1/schedule/now/", schedule_api.schedule_now_api, name="schedule_now_api"),
+    path("news/<int:index_id>/rss.xml", news_feeds.news_rss_view, name="news_rss"),
+    path("news/<int:index_id>/atom.xml", news_feeds.news_atom_view, name="news_atom"),
     path("admissions/", RedirectView.as_view(url="/publichna-informatsiia/vstup-do-litseiu/", permanent=True)),
     path("about/", RedirectView.as_view(url="/pro-litsei/", permanent=True)),
     path("news/", RedirectView.as_view(url="/novyny/", permanent=True)),
     path("staff/", RedirectView.as_view(url="/pro-litsei/pedahohichnyi-kolektyv/", permanent=True)),
     path("documents/", RedirectView.as_view(url="/publichna-informatsiia/", permanent=True)),
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="django.contrib.sitemaps.views.sitemap"),
+    path("sitemap.xml", sitemap_view, {"sitemaps": sitemaps}, name="django.contrib.sitemaps.views.sitemap"),
     path(
         "robots.txt",
         lambda request: HttpResponse(
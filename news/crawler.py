@@ -0,0 +1,325 @@
+"""
+Incremental crawler behind ``import_news``.
+
+Listing pages are fetched by a bounded thread pool, one wave of pagination
+links at a time, with the ETag / Last-Modified of the previous run, so an
+unchanged listing costs a 304 and nothing else; an unchanged first page ends
+the crawl. Articles whose source URL was imported before are skipped before
+their page is fetched, the rest are fetched by the same pool and skipped if
+their content hash is already known. Both sets are loaded once up front.
+
+Images of the new articles are then downloaded into the image library by
+``news.images``. Only the worker threads touch the network and only the
+calling thread touches the database. New articles are published in batches inside
+``bulk_changes``, and the news index is invalidated once at the end.
+"""
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from core.cache import invalidate, model_tag, page_tag
+from core.facets import refresh_tag_facets
+from core.signals import bulk_changes
+
+from .images import ingest_images
+from .models import NewsPage, NewsSourceListing
+
+USER_AGENT = "mcl-site-import/1.0"
+REQUEST_TIMEOUT = 15
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PAGES = 50
+DEFAULT_BATCH_SIZE = 20
+INTRO_LENGTH = 250
+
+# Numbered pagination links of a WordPress-style listing.
+PAGINATION_SELECTORS = (
+    "a.page-numbers",
+    "a[rel=next]",
+    "link[rel=next]",
+    ".nav-links a",
+    ".pagination a",
+)
+
+
+@dataclass
+class Fetched:
+    url: str
+    status: int
+    content: bytes = b""
+    etag: str = ""
+    last_modified: str = ""
+
+
+@dataclass
+class Article:
+    source_url: str
+    title: str
+    body: str
+    date: date
+    content_hash: str = ""
+    image: object = None
+
+    @property
+    def intro(self) -> str:
+        text = BeautifulSoup(self.body, "html.parser").get_text(" ", strip=True)
+        return Truncator(text).chars(INTRO_LENGTH) or self.title[:INTRO_LENGTH]
+
+
+@dataclass
+class CrawlResult:
+    listings_fetched: int = 0
+    listings_unchanged: int = 0
+    imported: list = field(default_factory=list)
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+    # Failed image downloads; the article keeps the original ``src``.
+    image_errors: list = field(default_factory=list)
+
+
+def normalize_space(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def content_hash(title: str, body_html: str) -> str:
+    """Hash of an article's title and text, insensitive to markup and whitespace."""
+    text = BeautifulSoup(body_html or "", "html.parser").get_text(" ")
+    normalized = f"{normalize_space(title).casefold()}\n{normalize_space(text)}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def known_articles():
+    """``(source URLs, content hashes)`` of every imported or existing article."""
+    missing = list(NewsPage.objects.filter(content_hash="").only("title", "body"))
+    for page in missing:
+        page.content_hash = content_hash(page.title, page.body)
+    # Hashes of articles created by hand are filled in on first use.
+    NewsPage.objects.bulk_update(missing, ["content_hash"], batch_size=500)
+    rows = list(NewsPage.objects.values_list("source_url", "content_hash"))
+    urls = {url for url, _ in rows if url}
+    hashes = {digest for _, digest in rows}
+    return urls, hashes
+
+
+def same_site(url: str, start_url: str) -> bool:
+    return urlparse(url).netloc == urlparse(start_url).netloc
+
+
+def parse_date(article_element) -> date:
+    time_element = article_element.find("time", attrs={"datetime": True})
+    if time_element is not None:
+        try:
+            return date.fromisoformat(time_element["datetime"][:10])
+        except ValueError:
+            pass
+    return timezone.localdate()
+
+
+def content_element(element):
+    return element.find("div", class_="entry-content") or element.find("div", class_="post-content")
+
+
+class NewsCrawler:
+    def __init__(
+        self,
+        start_url,
+        *,
+        workers=DEFAULT_WORKERS,
+        max_pages=DEFAULT_MAX_PAGES,
+        session=None,
+    ):
+        self.start_url = start_url
+        self.workers = workers
+        self.max_pages = max_pages
+        self.session = session or requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+
+    def fetch(self, url, validators=None) -> Fetched:
+        headers = {}
+        if validators is not None:
+            if validators.etag:
+                headers["If-None-Match"] = validators.etag
+            if validators.last_modified:
+                headers["If-Modified-Since"] = validators.last_modified
+        response = self.session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return Fetched(
+            url=url,
+            status=response.status_code,
+            content=response.content,
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+        )
+
+    def fetch_all(self, pool, urls, validators=None):
+        """Fetch ``urls`` on ``pool``; yields ``(url, Fetched or exception)`` in order."""
+        validators = validators or {}
+        futures = [(url, pool.submit(self.fetch, url, validators.get(url))) for url in urls]
+        for url, future in futures:
+            try:
+                yield url, future.result()
+            except requests.RequestException as error:
+                yield url, error
+
+    def parse_listing(self, fetched):
+        """``(article stubs, pagination links)`` of a listing page."""
+        soup = BeautifulSoup(fetched.content, "html.parser")
+        stubs = []
+        for element in soup.find_all("article"):
+            heading = element.find("h2") or element.find("h1")
+            if heading is None:
+                continue
+            title = heading.get_text(strip=True)
+            link = heading.find("a", href=True) or element.find("a", href=True)
+            url = urldefrag(urljoin(fetched.url, link["href"]))[0] if link else ""
+            stubs.append((url, title, element))
+        links = set()
+        for selector in PAGINATION_SELECTORS:
+            for anchor in soup.select(selector):
+                href = anchor.get("href")
+                if href:
+                    url = urldefrag(urljoin(fetched.url, href))[0]
+                    if same_site(url, self.start_url):
+                        links.add(url)
+        return stubs, links
+
+    def parse_article(self, url, title, fetched):
+        soup = BeautifulSoup(fetched.content, "html.parser")
+        element = soup.find("article") or soup
+        heading = element.find("h1") or element.find("h2")
+        content = content_element(element)
+        return Article(
+            source_url=url,
+            title=heading.get_text(strip=True) if heading else title,
+            body=str(content) if content else "",
+            date=parse_date(element),
+        )
+
+    def crawl(self, known_urls, known_hashes, result):
+        """New articles found from ``start_url``, oldest first."""
+        validators = {listing.url: listing for listing in NewsSourceListing.objects.all()}
+        changed_validators = []
+        stubs = []
+        seen = {self.start_url}
+        wave = [self.start_url]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while wave:
+                next_wave = []
+                for url, fetched in self.fetch_all(pool, wave, validators):
+                    if isinstance(fetched, Exception):
+                        result.errors.append(f"{url}: {fetched}")
+                        continue
+                    if fetched.status == 304:
+                        result.listings_unchanged += 1
+                        continue
+                    result.listings_fetched += 1
+                    changed_validators.append(fetched)
+                    page_stubs, links = self.parse_listing(fetched)
+                    stubs.extend(page_stubs)
+                    for link in sorted(links - seen):
+                        if len(seen) >= self.max_pages:
+                            break
+                        seen.add(link)
+                        next_wave.append(link)
+                wave = next_wave
+
+            articles = []
+            to_fetch = []
+            for url, title, element in stubs:
+                if url and url in known_urls:
+                    result.skipped += 1
+                    continue
+                if url and same_site(url, self.start_url):
+                    to_fetch.append((url, title))
+                    known_urls.add(url)
+                else:
+                    content = content_element(element)
+                    articles.append(Article(url, title, str(content) if content else "", parse_date(element)))
+
+            fetched_articles = dict(self.fetch_all(pool, [url for url, _ in to_fetch]))
+            for url, title in to_fetch:
+                fetched = fetched_articles[url]
+                if isinstance(fetched, Exception):
+                    result.errors.append(f"{url}: {fetched}")
+                    known_urls.discard(url)
+                    continue
+                articles.append(self.parse_article(url, title, fetched))
+
+        new_articles = []
+        for article in articles:
+            article.content_hash = content_hash(article.title, article.body)
+            if article.content_hash in known_hashes:
+                result.skipped += 1
+                continue
+            known_hashes.add(article.content_hash)
+            new_articles.append(article)
+        new_articles.sort(key=lambda article: article.date)
+        return new_articles, changed_validators
+
+
+def save_validators(fetched_listings):
+    for fetched in fetched_listings:
+        NewsSourceListing.objects.update_or_create(
+            url=fetched.url,
+            defaults={"etag": fetched.etag, "last_modified": fetched.last_modified},
+        )
+
+
+def publish_articles(index, articles, batch_size=DEFAULT_BATCH_SIZE):
+    """Publish ``articles`` under ``index`` in batches; invalidates the index once."""
+    pages = []
+    with bulk_changes():
+        for start in range(0, len(articles), batch_size):
+            with transaction.atomic():
+                for article in articles[start : start + batch_size]:
+                    page = NewsPage(
+                        title=article.title,
+                        intro=article.intro,
+                        body=article.body,
+                        date=article.date,
+                        image=article.image,
+                        source_url=article.source_url,
+                        content_hash=article.content_hash,
+                    )
+                    index.add_child(instance=page)
+                    page.save_revision().publish()
+                    pages.append(page)
+    if pages:
+        refresh_tag_facets(index)
+        invalidate(page_tag(index), model_tag(NewsPage))
+    return pages
+
+
+def import_news(
+    index,
+    start_url,
+    *,
+    workers=DEFAULT_WORKERS,
+    max_pages=DEFAULT_MAX_PAGES,
+    batch_size=DEFAULT_BATCH_SIZE,
+    images=True,
+    session=None,
+):
+    """Crawl ``start_url`` and publish what is new under ``index``."""
+    result = CrawlResult()
+    known_urls, known_hashes = known_articles()
+    crawler = NewsCrawler(start_url, workers=workers, max_pages=max_pages, session=session)
+    articles, fetched_listings = crawler.crawl(known_urls, known_hashes, result)
+    if images:
+        ingest_images(articles, crawler.session, workers=workers, errors=result.image_errors)
+    result.imported = publish_articles(index, articles, batch_size=batch_size)
+    # Validators are stored last and only after a clean run, so listings
+    # whose articles failed (or failed to publish) are fetched again next time.
+    if not result.errors:
+        save_validators(fetched_listings)
+    return result
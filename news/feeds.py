@@ -0,0 +1,135 @@
+"""
+RSS 2.0 and Atom feeds of a news index, optionally narrowed by ``?tag=``.
+
+A feed lists the ``FEED_ITEMS`` newest articles with their title, intro,
+date and a JPEG rendition of the image as an enclosure. Feeds are cached
+per news version (the versions of the index and of ``NewsPage``), and
+responses carry a strong ETag and Last-Modified derived from it, so
+aggregators polling an unchanged feed get a 304 after a single cache read.
+"""
+import hashlib
+from datetime import datetime, time, timezone
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils import timezone as django_timezone
+from django.utils.feedgenerator import Atom1Feed, Enclosure, Rss201rev2Feed
+from django.views.decorators.http import condition, require_safe
+from wagtail.images import get_image_model
+
+from core.cache import (
+    add_cache_dependencies,
+    cache_response,
+    canonical_query,
+    get_versions,
+    lookup_param,
+    model_tag,
+    page_tag,
+    preferred_encoding,
+)
+
+from .models import NewsIndexPage, NewsPage, NewsPageTag
+from .pagination import paginate
+
+FEED_ITEMS = 20
+FEED_RENDITION = "width-800|format-jpeg"
+QUERY_PARAMS = {"tag": lookup_param(NewsPageTag, "tag__name")}
+
+
+def news_versions(index_id) -> dict:
+    return get_versions([page_tag(index_id), model_tag(NewsPage)])
+
+
+def feed_etag(request, index_id):
+    query = canonical_query(request, QUERY_PARAMS)
+    if query is None:
+        return None
+    versions = news_versions(index_id)
+    parts = [settings.RELEASE_ID, request.path, query, request.get_host(), preferred_encoding(request)]
+    parts += [f"{tag}={versions[tag]!r}" for tag in sorted(versions)]
+    digest = hashlib.sha1("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def feed_last_modified(request, index_id):
+    return datetime.fromtimestamp(max(news_versions(index_id).values()), timezone.utc)
+
+
+class NewsRssFeed(Feed):
+    """A new instance serves each request (see ``feed_view``), so it may keep the request."""
+
+    feed_type = Rss201rev2Feed
+
+    def get_object(self, request, index_id):
+        index = get_object_or_404(NewsIndexPage.objects.live().public(), pk=index_id)
+        add_cache_dependencies(request, page_tag(index))
+        self.request = request
+        self.tag = request.GET.get("tag", "").strip()
+        return index
+
+    def title(self, index):
+        return f"{index.title}: {self.tag}" if self.tag else index.title
+
+    def link(self, index):
+        return index.get_url(request=self.request)
+
+    def description(self, index):
+        return self.title(index)
+
+    def items(self, index):
+        articles = NewsPage.objects.child_of(index).live().public()
+        if self.tag:
+            articles = articles.filter(
+                pk__in=NewsPageTag.objects.filter(tag__name=self.tag).values("content_object_id")
+            )
+        articles = articles.prefetch_related(
+            Prefetch("image", queryset=get_image_model().objects.prefetch_renditions(FEED_RENDITION))
+        ).only("title", "url_path", "first_published_at", "date", "intro", "image")
+        return paginate(articles, per_page=FEED_ITEMS).items
+
+    def item_title(self, article):
+        return article.title
+
+    def item_description(self, article):
+        return article.intro
+
+    def item_link(self, article):
+        return article.get_url(request=self.request)
+
+    def item_pubdate(self, article):
+        return datetime.combine(article.date, time.min, django_timezone.get_current_timezone())
+
+    def item_enclosures(self, article):
+        if article.image is None:
+            return []
+        rendition = article.image.get_rendition(FEED_RENDITION)
+        url = self.request.build_absolute_uri(rendition.url)
+        # Renditions do not store their size; 0 is the RSS convention for an
+        # unknown length and saves a storage lookup per item.
+        return [Enclosure(url, "0", "image/jpeg")]
+
+
+class NewsAtomFeed(NewsRssFeed):
+    feed_type = Atom1Feed
+    subtitle = NewsRssFeed.description
+
+
+def feed_view(feed_class):
+    """``feed_class`` as a view, cached per news version and answering conditional requests."""
+
+    @require_safe
+    @condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+    @cache_response(60 * 60, dependencies=[model_tag(NewsPage)], query_params=QUERY_PARAMS)
+    def view(request, index_id):
+        response = feed_class()(request, index_id=index_id)
+        # Validators come from the news version, not from the newest article date.
+        del response["Last-Modified"]
+        return response
+
+    return view
+
+
+news_rss_view = feed_view(NewsRssFeed)
+news_atom_view = feed_view(NewsAtomFeed)
@@ -0,0 +1,184 @@
+"""
+Image ingestion for ``import_news``.
+
+The ``<img>`` tags of new articles are downloaded by a bounded thread pool,
+which also hashes and verifies each file. The SHA-1 of the file is the one
+Wagtail keeps in ``Image.file_hash``, so a picture that is already in the
+library (or appears in several articles) is reused instead of uploaded
+again. Each ``<img>`` becomes a rich text image embed, the first image of an
+article becomes its ``NewsPage.image``, and the renditions the news
+templates and feeds ask for are generated here rather than on the first
+page view. Images that cannot be downloaded keep their original ``src``.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from urllib.parse import unquote, urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.files.images import ImageFile
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+from wagtail.images.formats import get_image_format
+from wagtail.utils.file import hash_filelike
+
+from .feeds import FEED_RENDITION
+from .models import CARD_RENDITION
+
+IMAGE_TIMEOUT = 30
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+RICHTEXT_IMAGE_FORMAT = "fullwidth"
+IMAGE_TITLE_LENGTH = 255
+
+
+@dataclass
+class Download:
+    url: str
+    content: bytes
+    file_hash: str
+    filename: str
+
+
+def image_renditions():
+    """Filter specs rendered for an imported image: cards, article pages, feeds and body."""
+    return [CARD_RENDITION, FEED_RENDITION, get_image_format(RICHTEXT_IMAGE_FORMAT).filter_spec]
+
+
+def image_urls(body, base_url):
+    """Absolute URLs of the images in ``body``, in order of appearance."""
+    urls = []
+    for img in BeautifulSoup(body, "html.parser").find_all("img"):
+        url = image_src(img, base_url)
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def image_src(img, base_url):
+    # Lazy-loading themes keep the real source in data-src.
+    src = (img.get("data-src") or img.get("src") or "").strip()
+    if not src or src.startswith("data:"):
+        return ""
+    url = urljoin(base_url, src)
+    return url if urlparse(url).scheme in ("http", "https") else ""
+
+
+def filename_of(url):
+    name = os.path.basename(unquote(urlparse(url).path)) or "image"
+    return name[-100:]
+
+
+def known_images(file_hashes):
+    """``{file hash: image}`` of library images with one of ``file_hashes``."""
+    Image = get_image_model()
+    # Images uploaded before Wagtail stored hashes are hashed on first use.
+    for image in Image.objects.filter(file_hash=""):
+        image.get_file_hash()
+    images = {}
+    for image in Image.objects.filter(file_hash__in=file_hashes).order_by("pk"):
+        images.setdefault(image.file_hash, image)
+    return images
+
+
+class ImageDownloader:
+    def __init__(self, session, workers):
+        self.session = session
+        self.workers = workers
+
+    def download(self, url) -> Download:
+        with self.session.get(url, timeout=IMAGE_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            if not response.headers.get("Content-Type", "").startswith("image/"):
+                raise ValueError("not an image")
+            buffer = BytesIO()
+            for chunk in response.iter_content(64 * 1024):
+                buffer.write(chunk)
+                if buffer.tell() > MAX_IMAGE_BYTES:
+                    raise ValueError("file too large")
+        content = buffer.getvalue()
+        with PILImage.open(BytesIO(content)) as picture:
+            width, height = picture.size
+            picture.verify()
+        if width * height > settings.WAGTAILIMAGES_MAX_IMAGE_PIXELS:
+            raise ValueError("image too large")
+        return Download(url, content, hash_filelike(BytesIO(content)), filename_of(url))
+
+    def download_all(self, urls):
+        """``{url: Download or exception}`` for ``urls``."""
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(url, pool.submit(self.download, url)) for url in urls]
+            results = {}
+            for url, future in futures:
+                try:
+                    results[url] = future.result()
+                except (requests.RequestException, OSError, ValueError) as error:
+                    results[url] = error
+            return results
+
+
+def create_image(download, title):
+    image = get_image_model()(title=title[:IMAGE_TITLE_LENGTH] or download.filename)
+    image.file = ImageFile(BytesIO(download.content), name=download.filename)
+    image.save()
+    return image
+
+
+def embed_images(body, base_url, images):
+    """``body`` with every downloaded ``<img>`` replaced by a rich text image embed."""
+    soup = BeautifulSoup(body, "html.parser")
+    for img in soup.find_all("img"):
+        image = images.get(image_src(img, base_url))
+        if image is None:
+            continue
+        embed = soup.new_tag(
+            "embed",
+            attrs={
+                "embedtype": "image",
+                "id": str(image.pk),
+                "format": RICHTEXT_IMAGE_FORMAT,
+                "alt": img.get("alt", ""),
+            },
+        )
+        img.replace_with(embed)
+    return str(soup)
+
+
+def ingest_images(articles, session, *, workers, errors):
+    """
+    Download the images of ``articles`` into the image library.
+
+    Sets each article's ``image`` and rewrites its ``body`` to embed the
+    library images; failed downloads are appended to ``errors``.
+    """
+    urls = {}
+    for article in articles:
+        for url in image_urls(article.body, article.source_url):
+            urls.setdefault(url, article)
+    downloads = {}
+    for url, download in ImageDownloader(session, workers).download_all(list(urls)).items():
+        if isinstance(download, Exception):
+            errors.append(f"{url}: {download}")
+        else:
+            downloads[url] = download
+
+    by_hash = known_images({download.file_hash for download in downloads.values()})
+    images = {}
+    for url, download in downloads.items():
+        image = by_hash.get(download.file_hash)
+        if image is None:
+            image = by_hash[download.file_hash] = create_image(download, urls[url].title)
+        images[url] = image
+    for image in by_hash.values():
+        image.get_renditions(*image_renditions())
+
+    for article in articles:
+        article_images = [images[url] for url in image_urls(article.body, article.source_url) if url in images]
+        if article_images:
+            article.image = article_images[0]
+            article.body = embed_images(article.body, article.source_url, images)
+    return images
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+# Keyset pagination of news listings (see ``news.pagination``) seeks on
+# ``(first_published_at, id)``, which live on Wagtail's page table.
+INDEX_NAME = "page_first_published_id_idx"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("news", "0006_alter_newspage_options"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f"CREATE INDEX {INDEX_NAME} ON wagtailcore_page (first_published_at, id)",
+            f"DROP INDEX {INDEX_NAME}",
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_page_first_published_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsSourceListing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Сторінка джерела новин',
+                'verbose_name_plural': 'Сторінки джерела новин',
+            },
+        ),
+        migrations.AddField(
+            model_name='newspage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='newspage',
+            name='source_url',
+            field=models.URLField(blank=True, db_index=True, editable=False, max_length=500, verbose_name='Джерело'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_import_sources'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='newsindexpage',
+            options={'verbose_name': 'Новини', 'verbose_name_plural': 'Новини'},
+        ),
+    ]
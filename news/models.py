@@ -1,15 +1,25 @@
 from django.db import models
+from django.db.models import Prefetch
 from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
-from taggit.models import Tag, TaggedItemBase
+from taggit.models import TaggedItemBase
 from wagtail.admin.panels import FieldPanel
 from wagtail.fields import RichTextField
+from wagtail.images import get_image_model
 from wagtail.models import Page
 from wagtail.search import index
 
+from core.cache import add_cache_dependencies, cache_response, lookup_param, page_tag
+from core.facets import tag_facets
+
+from .pagination import NEWS_PER_PAGE, cursor_param, is_listed_cursor, paginate
+
+# Rendition of the card image in ``news_index_page.html``.
+CARD_RENDITION = "width-800|format-webp"
+
 
 class NewsPageTag(TaggedItemBase):
     content_object = ParentalKey(
@@ -36,28 +46,59 @@ class NewsIndexPage(Page):
     parent_page_types = ["home.HomePage"]
     subpage_types = ["news.NewsPage"]
 
+    tag_facet_through = "news.NewsPageTag"
+
     class Meta:
         verbose_name = "Новини"
         verbose_name_plural = "Новини"
 
-    @method_decorator(cache_page(60 * 15))
     def serve(self, request, *args, **kwargs):
+        # Made-up cursors render uncached, so they cannot push real pages out.
+        articles = NewsPage.objects.child_of(self).live().public()
+        if not all(is_listed_cursor(articles, request.GET.get(name, "")) for name in ("after", "before")):
+            return super().serve(request, *args, **kwargs)
+        return self.serve_cached(request, *args, **kwargs)
+
+    @method_decorator(
+        cache_response(
+            60 * 15,
+            stale_while_revalidate=60 * 45,
+            query_params={
+                "tag": lookup_param(NewsPageTag, "tag__name"),
+                "after": cursor_param,
+                "before": cursor_param,
+            },
+        )
+    )
+    def serve_cached(self, request, *args, **kwargs):
         return super().serve(request, *args, **kwargs)
 
+    def cache_warm_queries(self):
+        """Tag filters for ``warm_cache``."""
+        return [{"tag": facet.name} for facet in tag_facets(self)]
+
     def __str__(self) -> str:
         return self.title
 
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
-        all_news_items = (
-            NewsPage.objects.child_of(self)
-            .live()
-            .public()
-            .select_related("owner")
-            .prefetch_related("tags")
+        add_cache_dependencies(request, page_tag(self))
+        tag_filter = request.GET.get("tag", "").strip()
+        news_items = NewsPage.objects.child_of(self).live().public()
+        if tag_filter:
+            news_items = news_items.filter(
+                pk__in=NewsPageTag.objects.filter(tag__name=tag_filter).values("content_object_id")
+            )
+        news_page = paginate(
+            news_items.select_related("owner")
+            .prefetch_related(
+                "tags",
+                Prefetch("image", queryset=get_image_model().objects.prefetch_renditions(CARD_RENDITION)),
+            )
             .only(
                 "title",
                 "slug",
+                "url_path",
                 "first_published_at",
                 "search_description",
                 "live",
@@ -65,25 +106,21 @@ class NewsIndexPage(Page):
                 "date",
                 "intro",
                 "image",
-            )
-            .order_by("-first_published_at")
+            ),
+            after=request.GET.get("after", ""),
+            before=request.GET.get("before", ""),
+            per_page=NEWS_PER_PAGE,
         )
 
-        tag_filter = request.GET.get("tag", "").strip()
-        news_items = all_news_items
-        if tag_filter:
-            news_items = news_items.filter(tags__name=tag_filter).distinct()
-
-        all_tags = sorted(
-            Tag.objects.filter(newspage__in=all_news_items.values_list("id", flat=True))
-            .values_list("name", flat=True)
-            .distinct(),
-            key=str.casefold,
-        )
-
-        context["news_items"] = news_items
-        context["all_tags"] = all_tags
+        context["news_items"] = news_page.items
+        context["news_page"] = news_page
+        context["all_tags"] = tag_facets(self)
         context["current_tag"] = tag_filter
+        tag_query = {"tag": tag_filter} if tag_filter else {}
+        if news_page.next_cursor:
+            context["next_query"] = urlencode({**tag_query, "after": news_page.next_cursor})
+        if news_page.previous_cursor:
+            context["previous_query"] = urlencode({**tag_query, "before": news_page.previous_cursor})
         return context
 
 
@@ -101,6 +138,9 @@ class NewsPage(Page):
         verbose_name="Головне зображення",
     )
     tags = ClusterTaggableManager(through=NewsPageTag, blank=True, verbose_name="Теги")
+    # Set by ``import_news`` to skip articles it has already imported.
+    source_url = models.URLField("Джерело", max_length=500, blank=True, db_index=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
 
     search_fields = Page.search_fields + [
         index.SearchField("title", boost=2),
@@ -126,3 +166,19 @@ class NewsPage(Page):
 
     def __str__(self) -> str:
         return self.title
+
+
+class NewsSourceListing(models.Model):
+    """Validators of a listing page crawled by ``import_news``, for conditional requests."""
+
+    url = models.URLField(max_length=500, unique=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    checked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Сторінка джерела новин"
+        verbose_name_plural = "Сторінки джерела новин"
+
+    def __str__(self) -> str:
+        return self.url
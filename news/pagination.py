@@ -0,0 +1,115 @@
+"""
+Keyset pagination of news listings.
+
+Articles are ordered newest first by ``(first_published_at, id)``. A page is
+the ``NEWS_PER_PAGE`` rows after (or before) the cursor of the last (or
+first) article of its neighbour, read straight off the
+``(first_published_at, id)`` index, so every page costs the same however
+large the archive grows. Unlike offsets, cursors stay stable while new
+articles are published.
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+NEWS_PER_PAGE = 12
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+CURSOR_RE = re.compile(r"^(-?\d{1,20})-(\d{1,20})$")
+
+
+def encode_cursor(page) -> str:
+    """``<microseconds since the epoch>-<id>`` of ``page``; empty if it was never published."""
+    if page.first_published_at is None:
+        return ""
+    return f"{(page.first_published_at - EPOCH) // timedelta(microseconds=1)}-{page.pk}"
+
+
+def decode_cursor(value):
+    """``(first_published_at, id)`` of a cursor, or ``None`` if it is malformed."""
+    match = CURSOR_RE.match(value or "")
+    if match is None:
+        return None
+    try:
+        published_at = EPOCH + timedelta(microseconds=int(match[1]))
+    except OverflowError:
+        return None
+    return published_at, int(match[2])
+
+
+def cursor_param(value):
+    """
+    Query parameter normaliser for cursors; malformed ones bypass the cache.
+
+    Well-formed cursors still have to belong to the listing (see
+    ``is_listed_cursor``) before they get a cache entry.
+    """
+    if not value:
+        return ""
+    return value if decode_cursor(value) is not None else None
+
+
+def is_listed_cursor(queryset, value) -> bool:
+    """Whether ``value`` is empty or exactly the cursor of a row of ``queryset``."""
+    if not value:
+        return True
+    cursor = decode_cursor(value)
+    if cursor is None:
+        return False
+    published_at, pk = cursor
+    row = queryset.filter(pk=pk, first_published_at=published_at).only("first_published_at").first()
+    return row is not None and encode_cursor(row) == value
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = ""
+    previous_cursor: str = ""
+
+    @property
+    def has_other_pages(self) -> bool:
+        return bool(self.next_cursor or self.previous_cursor)
+
+
+def paginate(queryset, after="", before="", per_page=NEWS_PER_PAGE) -> KeysetPage:
+    """
+    The page of ``queryset`` after the ``after`` cursor, or before ``before``.
+
+    Without a valid cursor this is the first page. Pages without a
+    ``first_published_at`` have no place in the order and are left out.
+    """
+    queryset = queryset.filter(first_published_at__isnull=False)
+    before_cursor = decode_cursor(before)
+    if before_cursor:
+        published_at, pk = before_cursor
+        rows = list(
+            queryset.filter(
+                Q(first_published_at__gt=published_at) | Q(first_published_at=published_at, id__gt=pk)
+            ).order_by("first_published_at", "id")[: per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_next = True
+    else:
+        queryset = queryset.order_by("-first_published_at", "-id")
+        cursor = decode_cursor(after)
+        if cursor:
+            published_at, pk = cursor
+            queryset = queryset.filter(
+                Q(first_published_at__lt=published_at) | Q(first_published_at=published_at, id__lt=pk)
+            )
+        rows = list(queryset[: per_page + 1])
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_previous = cursor is not None
+
+    if not items:
+        return KeysetPage(items)
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if has_next else "",
+        previous_cursor=encode_cursor(items[0]) if has_previous else "",
+    )
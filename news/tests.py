@@ -1,3 +1,371 @@
+import hashlib
+import io
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.test import TestCase
+from django.urls import reverse
+from unittest.mock import patch
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from core.cache import model_tag, page_tag
+from news.crawler import content_hash, import_news
+from news.feeds import FEED_RENDITION
+from news.images import image_renditions
+from news.models import NewsIndexPage, NewsPage
+from news.pagination import decode_cursor, encode_cursor, paginate
+
+
+class NewsPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = NewsIndexPage(title="Новини", slug="news-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=self.index)
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.posts = []
+        for number in range(7):
+            post = NewsPage(title=f"Новина {number}", intro="Опис")
+            self.index.add_child(instance=post)
+            if number % 2:
+                post.tags.add("Спорт")
+                post.save_revision().publish()
+            # Two articles share a timestamp, so the id breaks the tie.
+            published_at = start + timedelta(days=min(number, 5))
+            NewsPage.objects.filter(pk=post.pk).update(first_published_at=published_at)
+            post.first_published_at = published_at
+            self.posts.append(post)
+        self.newest_first = sorted(self.posts, key=lambda post: (post.first_published_at, post.pk), reverse=True)
+
+    def _walk(self, queryset, per_page):
+        pages = [paginate(queryset, per_page=per_page)]
+        while pages[-1].next_cursor:
+            pages.append(paginate(queryset, after=pages[-1].next_cursor, per_page=per_page))
+        return pages
+
+    def test_cursor_round_trip(self):
+        post = self.posts[0]
+        self.assertEqual(decode_cursor(encode_cursor(post)), (post.first_published_at, post.pk))
+        for bogus in ("", "abc", "1-", "99999999999999999999-1"):
+            self.assertIsNone(decode_cursor(bogus))
+
+    def test_forward_and_backward(self):
+        queryset = NewsPage.objects.child_of(self.index).live()
+        pages = self._walk(queryset, per_page=3)
+        self.assertEqual([post for page in pages for post in page.items], self.newest_first)
+        self.assertEqual([len(page.items) for page in pages], [3, 3, 1])
+        self.assertEqual(pages[0].previous_cursor, "")
+
+        back = paginate(queryset, before=pages[2].previous_cursor, per_page=3)
+        self.assertEqual(back.items, pages[1].items)
+        self.assertEqual((back.next_cursor, back.previous_cursor), (pages[1].next_cursor, pages[1].previous_cursor))
+        first = paginate(queryset, before=back.previous_cursor, per_page=3)
+        self.assertEqual((first.items, first.previous_cursor), (pages[0].items, ""))
+
+    def test_articles_without_publish_date_are_left_out(self):
+        NewsPage.objects.filter(pk=self.posts[0].pk).update(first_published_at=None)
+        self.assertEqual(encode_cursor(NewsPage.objects.get(pk=self.posts[0].pk)), "")
+        queryset = NewsPage.objects.child_of(self.index).live()
+        pages = self._walk(queryset, per_page=3)
+        self.assertEqual([post for page in pages for post in page.items], self.newest_first[:-1])
+        self.assertEqual(self.client.get(self.index.url).status_code, 200)
+
+    def test_index_page_filters_by_tag_across_pages(self):
+        tagged = [post.pk for post in self.newest_first if post.tags.exists()]
+        response = self.client.get(self.index.url, {"tag": "Спорт"})
+        self.assertEqual([post.pk for post in response.context["news_items"]], tagged)
+        self.assertNotIn("next_query", response.context)
+
+        cache.clear()
+        with patch("news.models.NEWS_PER_PAGE", 2):
+            response = self.client.get(self.index.url, {"tag": "Спорт"})
+            self.assertContains(response, "?tag=%D0%A1%D0%BF%D0%BE%D1%80%D1%82&amp;after=")
+            after = response.context["news_page"].next_cursor
+            response = self.client.get(self.index.url, {"tag": "Спорт", "after": after})
+        self.assertEqual([post.pk for post in response.context["news_items"]], tagged[2:])
+        self.assertIn("previous_query", response.context)
+        self.assertNotIn("next_query", response.context)
+
+    def test_malformed_cursor_shows_first_page(self):
+        response = self.client.get(self.index.url, {"after": "nonsense"})
+        self.assertEqual(len(response.context["news_items"]), 7)
+
+    def test_only_cursors_of_listed_articles_are_cached(self):
+        other_index = NewsIndexPage(title="Інші новини", slug="other-news-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=other_index)
+        other = NewsPage(title="Чужа", intro="Опис")
+        other_index.add_child(instance=other)
+        other.save_revision().publish()
+        other.refresh_from_db()
+        post = self.posts[3]
+        micros = encode_cursor(post).split("-")[0]
+        made_up = f"{int(micros) - 1}-{post.pk}"
+
+        with patch("core.cache.cache.set") as cache_set:
+            for cursor in (made_up, f"0{encode_cursor(post)}", encode_cursor(other)):
+                self.assertEqual(self.client.get(self.index.url, {"after": cursor}).status_code, 200)
+        self.assertFalse([call for call in cache_set.call_args_list if call.args[0].startswith("response:")])
+
+        with patch("core.cache.cache.set") as cache_set:
+            self.client.get(self.index.url, {"after": encode_cursor(post)})
+        self.assertTrue([call for call in cache_set.call_args_list if call.args[0].startswith("response:")])
+
+    def test_page_query_reads_index_in_order(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plan format is backend specific")
+        queryset = NewsPage.objects.order_by("-first_published_at", "-id")
+        plan = queryset.filter(first_published_at__lt=self.posts[3].first_published_at)[:13].explain()
+        self.assertIn("page_first_published_id_idx", plan)
+        # Only ties on first_published_at are sorted, never the whole archive.
+        self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)
+
+
+class NewsFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = NewsIndexPage(title="Новини", slug="news-feed-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=self.index)
+        self.article = self._publish("Перемога на олімпіаді", "Спорт")
+        self._publish("Батьківські збори")
+        self.rss_url = reverse("news_rss", args=[self.index.pk])
+
+    def _publish(self, title, *tags):
+        article = NewsPage(title=title, intro=f"{title}: подробиці", date=date(2025, 3, 1))
+        self.index.add_child(instance=article)
+        article.tags.add(*tags)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save_revision().publish()
+        return article
+
+    def test_rss_and_atom_feeds(self):
+        response = self.client.get(self.rss_url)
+        self.assertEqual(response["Content-Type"], "application/rss+xml; charset=utf-8")
+        self.assertContains(response, "<title>Перемога на олімпіаді</title>")
+        self.assertContains(response, "Батьківські збори: подробиці")
+        self.assertContains(response, "Sat, 01 Mar 2025")
+
+        response = self.client.get(reverse("news_atom", args=[self.index.pk]), {"tag": "Спорт"})
+        self.assertTrue(response["Content-Type"].startswith("application/atom+xml"))
+        self.assertContains(response, "Перемога на олімпіаді")
+        self.assertNotContains(response, "Батьківські збори")
+
+        self.assertEqual(self.client.get(self.rss_url, {"tag": "Невідомий"}).status_code, 200)
+        self.assertEqual(self.client.get(reverse("news_rss", args=[self.article.pk])).status_code, 404)
+
+    def test_image_rendition_enclosure(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            image = get_image_model().objects.create(title="Фото", file=get_test_image_file())
+            self.article.image = image
+            with self.captureOnCommitCallbacks(execute=True):
+                self.article.save_revision().publish()
+            response = self.client.get(self.rss_url)
+            self.assertContains(
+                response,
+                'length="0" type="image/jpeg" url="http://testserver/media/images/test.width-800.format-jpeg.jpg"',
+            )
+
+            # Renditions are prefetched: more images cost no extra queries.
+            cache.clear()
+            with CaptureQueriesContext(connection) as one_image:
+                self.client.get(self.rss_url)
+            article = self._publish("Екскурсія")
+            article.image = get_image_model().objects.create(title="Ще фото", file=get_test_image_file("b.png"))
+            with self.captureOnCommitCallbacks(execute=True):
+                article.save_revision().publish()
+            article.image.get_rendition(FEED_RENDITION)
+            cache.clear()
+            with CaptureQueriesContext(connection) as two_images:
+                self.assertContains(self.client.get(self.rss_url), "b.width-800.format-jpeg.jpg")
+        self.assertEqual(len(two_images), len(one_image))
+
+    def test_conditional_get_until_next_publish(self):
+        response = self.client.get(self.rss_url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.rss_url, headers={"if-none-match": etag})
+        self.assertEqual(not_modified.status_code, 304)
+        not_modified = self.client.get(self.rss_url, headers={"if-modified-since": last_modified})
+        self.assertEqual(not_modified.status_code, 304)
+
+        self._publish("Новий навчальний рік")
+        response = self.client.get(self.rss_url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Новий навчальний рік")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        content = self.server.pages.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        body = content if isinstance(content, bytes) else content.encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png" if isinstance(content, bytes) else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def listing(*articles, next_page=None):
+    items = "".join(
+        f'<article><h2><a href="/news/{slug}/">{title}</a></h2></article>' for slug, title in articles
+    )
+    pagination = f'<a class="page-numbers" href="{next_page}">2</a>' if next_page else ""
+    return f"<html><body>{items}{pagination}</body></html>"
+
+
+def article_page(title, text, published="2025-02-01", images=""):
+    return (
+        f'<html><body><article><h1>{title}</h1><time datetime="{published}T10:00:00+02:00"></time>'
+        f'<div class="entry-content"><p>{text}</p>{images}</div></article></body></html>'
+    )
+
+
+def png(colour):
+    return get_test_image_file(colour=colour, size=(40, 30)).file.getvalue()
+
+
+class ImportNewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = NewsIndexPage(title="Новини", slug="news-import-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=self.index)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.server.requests = []
+        self.server.pages = {
+            "/": listing(("first", "Перша"), ("copy", "Копія"), next_page="/page/2/"),
+            "/page/2/": listing(("second", "Друга")),
+            "/news/first/": article_page("Перша", "Текст першої"),
+            "/news/copy/": article_page("Вже є", "Стара новина"),
+            "/news/second/": article_page("Друга", "Текст другої", published="2025-01-15"),
+        }
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        # Added by hand earlier: same text, different markup.
+        existing = NewsPage(title="Вже є", intro="Стара", body="<p>Стара   новина</p>")
+        self.index.add_child(instance=existing)
+
+    def _import(self):
+        with patch("news.crawler.invalidate") as invalidate:
+            result = import_news(self.index, self.url, workers=3)
+        return result, invalidate
+
+    def test_incremental_import(self):
+        result, invalidate = self._import()
+        self.assertEqual([page.title for page in result.imported], ["Друга", "Перша"])
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.image_errors, [])
+        self.assertEqual(result.errors, [])
+        invalidate.assert_called_once_with(page_tag(self.index), model_tag(NewsPage))
+        first = NewsPage.objects.get(title="Перша")
+        self.assertTrue(first.live)
+        self.assertEqual(first.get_parent().pk, self.index.pk)
+        self.assertEqual((first.date, first.intro), (date(2025, 2, 1), "Текст першої"))
+        self.assertEqual(first.source_url, f"{self.url}news/first/")
+
+        # Nothing changed: one conditional request, answered with a 304.
+        self.server.requests.clear()
+        result, invalidate = self._import()
+        self.assertEqual((result.imported, result.listings_unchanged), ([], 1))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIsNotNone(self.server.requests[0][1])
+        invalidate.assert_not_called()
+
+        # A new article: known ones are skipped without fetching them.
+        self.server.pages["/"] = listing(("third", "Третя"), ("first", "Перша"), next_page="/page/2/")
+        self.server.pages["/news/third/"] = article_page("Третя", "Текст третьої")
+        self.server.requests.clear()
+        result, _ = self._import()
+        self.assertEqual([page.title for page in result.imported], ["Третя"])
+        fetched = {path for path, _ in self.server.requests}
+        self.assertNotIn("/news/first/", fetched)
+        self.assertEqual(NewsPage.objects.count(), 4)
+
+    def test_failed_article_is_retried(self):
+        del self.server.pages["/news/second/"]
+        result, _ = self._import()
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual([page.title for page in result.imported], ["Перша"])
+
+        self.server.pages["/news/second/"] = article_page("Друга", "Текст другої")
+        result, _ = self._import()
+        self.assertEqual([page.title for page in result.imported], ["Друга"])
+
+    def test_command(self):
+        out = io.StringIO()
+        with patch("news.crawler.invalidate"):
+            call_command("import_news", self.url, "--index", str(self.index.pk), stdout=out)
+        self.assertIn("Imported 2 articles, skipped 1 known ones", out.getvalue())
+
+    def test_images(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+        Image = get_image_model()
+        library_image = Image.objects.create(title="Вже є", file=get_test_image_file(colour="red"))
+        library_image.file.open()
+        self.server.pages.update(
+            {
+                "/img/red.png": library_image.file.read(),
+                "/img/blue.png": png("blue"),
+                "/img/blue-copy.png": png("blue"),
+                "/news/first/": article_page(
+                    "Перша",
+                    "Текст першої",
+                    images='<img src="/img/blue.png" alt="Синій"><img data-src="/img/red.png" src="data:,">'
+                    '<img src="/img/missing.png">',
+                ),
+                "/news/second/": article_page("Друга", "Текст другої", images='<img src="../../img/blue-copy.png">'),
+            }
+        )
+        library_image.file.close()
+
+        result, _ = self._import()
+        self.assertEqual(len(result.image_errors), 1)
+        self.assertIn("/img/missing.png", result.image_errors[0])
+        self.assertEqual(result.errors, [])
+        # Same files are stored once; the library image is reused.
+        self.assertEqual(Image.objects.count(), 2)
+        blue = Image.objects.exclude(pk=library_image.pk).get()
+        self.assertEqual(blue.title, "Перша")
+        first = NewsPage.objects.get(title="Перша")
+        second = NewsPage.objects.get(title="Друга")
+        self.assertEqual((first.image_id, second.image_id), (blue.pk, blue.pk))
+        self.assertIn(f'<embed alt="Синій" embedtype="image" format="fullwidth" id="{blue.pk}"/>', first.body)
+        self.assertIn(f'id="{library_image.pk}"', first.body)
+        self.assertIn("/img/missing.png", first.body)
+        self.assertEqual(first.content_hash, content_hash("Перша", "<p>Текст першої</p>"))
+        for image in (blue, library_image):
+            self.assertEqual(image.renditions.count(), len(image_renditions()))
+
+        response = self.client.get(first.url)
+        self.assertContains(response, 'class="richtext-image full-width"')
 
-# Create your tests here.
+    def test_skip_images(self):
+        self.server.pages["/news/first/"] = article_page("Перша", "Текст", images='<img src="/img/blue.png">')
+        self.server.pages["/img/blue.png"] = png("blue")
+        with patch("news.crawler.invalidate"):
+            result = import_news(self.index, self.url, images=False)
+        self.assertEqual(self.server.requests.count(("/img/blue.png", None)), 0)
+        self.assertIn('src="/img/blue.png"', result.imported[-1].body)
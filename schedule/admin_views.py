@@ -0,0 +1,122 @@
+from django import forms
+from django.contrib import messages
+from django.contrib.auth.decorators import permission_required
+from django.db.models import Count
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from .conflicts import detect_conflicts
+from .importer import TimetableImportError, import_timetable
+from .models import ScheduleVersion, Week
+from .versions import create_draft, discard_draft, publish
+
+
+class TimetableImportForm(forms.Form):
+    file = forms.FileField(
+        label="Файл розкладу",
+        help_text="CSV (UTF-8) або XLSX; тижні з файлу буде повністю замінено.",
+    )
+    dry_run = forms.BooleanField(label="Лише перевірити", required=False)
+    into_draft = forms.BooleanField(
+        label="У чернетку",
+        required=False,
+        help_text="Імпортувати в робочу чернетку замість опублікованого розкладу.",
+    )
+
+
+@permission_required("schedule.add_lesson", raise_exception=True)
+def import_timetable_view(request):
+    """Upload form for ``schedule.importer``."""
+    errors = []
+    if request.method == "POST":
+        form = TimetableImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            dry_run = form.cleaned_data["dry_run"]
+            into_draft = form.cleaned_data["into_draft"] and not dry_run
+            try:
+                result = import_timetable(upload, upload.name, dry_run=dry_run, into_draft=into_draft)
+            except TimetableImportError as exc:
+                errors = exc.errors
+            else:
+                weeks = ", ".join(map(str, result.weeks))
+                if dry_run:
+                    messages.success(
+                        request, f"Файл коректний: {result.created} уроків для тижнів {weeks}."
+                    )
+                else:
+                    messages.success(
+                        request,
+                        f"Імпортовано {result.created} уроків для тижнів {weeks}"
+                        + (" у чернетку." if into_draft else "."),
+                    )
+                return redirect(reverse("schedule_import"))
+    else:
+        form = TimetableImportForm()
+
+    return TemplateResponse(
+        request, "schedule/admin/import.html", {"form": form, "errors": errors}
+    )
+
+
+@permission_required("schedule.change_lesson", raise_exception=True)
+def conflicts_report_view(request):
+    """Double-booked cabinets and class groups, optionally for one week or the draft."""
+    week = request.GET.get("week", "")
+    filters = {"week": int(week)} if week in {str(value) for value in Week.values} else {}
+    draft = ScheduleVersion.draft()
+    show_draft = draft is not None and request.GET.get("draft") == "1"
+    return TemplateResponse(
+        request,
+        "schedule/admin/conflicts.html",
+        {
+            "conflicts": detect_conflicts(version_id=draft.pk if show_draft else None, **filters),
+            "weeks": Week.choices,
+            "current_week": filters.get("week"),
+            "draft": draft,
+            "show_draft": show_draft,
+        },
+    )
+
+
+@permission_required("schedule.change_lesson", raise_exception=True)
+def versions_view(request):
+    """Schedule versions, with the working copy's actions."""
+    return TemplateResponse(
+        request,
+        "schedule/admin/versions.html",
+        {
+            "versions": ScheduleVersion.objects.annotate(lesson_count=Count("lessons")),
+            "draft": ScheduleVersion.draft(),
+        },
+    )
+
+
+@require_POST
+@permission_required("schedule.change_lesson", raise_exception=True)
+def create_draft_view(request):
+    draft = create_draft(request.POST.get("name", "").strip())
+    messages.success(request, f"Робоча чернетка: {draft}.")
+    return redirect("schedule_versions")
+
+
+@require_POST
+@permission_required("schedule.change_lesson", raise_exception=True)
+def publish_version_view(request, version_id):
+    version = get_object_or_404(ScheduleVersion, pk=version_id)
+    if version.is_active:
+        messages.error(request, "Ця версія вже опублікована.")
+    else:
+        publish(version)
+        messages.success(request, f"Опубліковано: {version}.")
+    return redirect("schedule_versions")
+
+
+@require_POST
+@permission_required("schedule.change_lesson", raise_exception=True)
+def discard_draft_view(request):
+    if discard_draft():
+        messages.success(request, "Чернетку видалено.")
+    return redirect("schedule_versions")
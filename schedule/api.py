@@ -0,0 +1,112 @@
+"""
+Read-only JSON API of the timetable.
+
+``/api/v1/schedule/`` lists lessons, optionally narrowed by ``week``,
+``class_group`` (id) and ``day`` (1 is Monday), with the ``LESSON_TIMES``
+slots resolved to real start and end times.
+
+Responses carry a strong ETag built from the schedule version, so polling
+clients revalidate with ``If-None-Match`` and get a 304 after a single cache
+read. The ETag also names the content encoding the client will receive:
+responses are pre-compressed (see ``core.cache``) and a strong validator
+must differ between encodings.
+"""
+import hashlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from core.cache import cache_response, canonical_query, exact_choice_param, preferred_encoding
+
+from .grid import get_lesson_numbers
+from .live import get_now_and_next, patch_live_headers
+from .models import ClassGroup, Day, Lesson, Week
+from .views import SCHEDULE_DEPENDENCIES, schedule_version
+
+API_VERSION = "v1"
+
+
+def id_param(value):
+    if not value:
+        return ""
+    return value if value.isdigit() else None
+
+
+QUERY_PARAMS = {
+    "week": exact_choice_param({str(number) for number in Week.values}),
+    "day": exact_choice_param({str(number) for number in Day.values}),
+    "class_group": id_param,
+}
+
+
+def schedule_etag(request):
+    query = canonical_query(request, QUERY_PARAMS)
+    if query is None:
+        return None
+    parts = [API_VERSION, settings.RELEASE_ID, schedule_version(), query, preferred_encoding(request)]
+    digest = hashlib.sha1("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def serialize_lesson(lesson):
+    start, end = lesson.bounds
+    return {
+        "week": lesson.week,
+        "day": lesson.day,
+        "class_group": lesson.class_group_id,
+        "para_number": lesson.para_number,
+        "para_part": lesson.para_part,
+        "lesson_numbers": get_lesson_numbers(lesson.para_number, lesson.para_part),
+        "start": start.strftime("%H:%M"),
+        "end": end.strftime("%H:%M"),
+        "subject": lesson.subject.name,
+        "cabinet": lesson.cabinet,
+        "sub_group": lesson.sub_group,
+    }
+
+
+@require_safe
+@condition(etag_func=schedule_etag)
+@cache_response(60 * 5, dependencies=SCHEDULE_DEPENDENCIES, query_params=QUERY_PARAMS)
+def schedule_api(request):
+    """Lessons matching the ``week``, ``class_group`` and ``day`` filters."""
+    filters = {}
+    for name, normalize in QUERY_PARAMS.items():
+        value = normalize(request.GET.get(name))
+        if value is None:
+            return JsonResponse({"error": f"Invalid {name}"}, status=400)
+        if value:
+            filters[name] = int(value)
+
+    if "class_group" in filters and not ClassGroup.objects.filter(pk=filters["class_group"]).exists():
+        return JsonResponse({"error": "Unknown class_group"}, status=404)
+
+    lessons = list(
+        Lesson.objects.published()
+        .select_related("subject", "class_group")
+        .filter(**filters)
+        .order_by("week", "day", "para_number", "para_part", "class_group__name", "sub_group")
+    )
+    class_groups = sorted(
+        {lesson.class_group for lesson in lessons},
+        key=lambda class_group: (class_group.name, class_group.study_type),
+    )
+    payload = {
+        "api_version": API_VERSION,
+        "version": schedule_version(),
+        "class_groups": [
+            {"id": class_group.id, "name": class_group.name, "study_type": class_group.study_type}
+            for class_group in class_groups
+        ],
+        "lessons": [serialize_lesson(lesson) for lesson in lessons],
+    }
+    return JsonResponse(payload, json_dumps_params={"ensure_ascii": False})
+
+
+@require_safe
+def schedule_now_api(request):
+    """Current and next lesson of each class group, cacheable until the next lesson boundary."""
+    data, valid_until = get_now_and_next()
+    response = JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+    return patch_live_headers(response, valid_until)
@@ -0,0 +1,138 @@
+"""
+Double-booking detection.
+
+A para or one of its halves covers one or two of the day's lesson numbers
+(see ``get_lesson_numbers``), so two lessons overlap exactly when they share
+a ``(week, day, lesson number)`` slot. Lessons are loaded in one query and
+indexed by slot in memory. Within each slot they are grouped by cabinet, by
+class group and by teacher, so only lessons that can actually clash are
+compared.
+
+Two lessons clash when they are in the same cabinet, when they are for the
+same class group and their sub-groups overlap (a whole-class lesson overlaps
+both sub-groups), or when they have the same teacher. A teacher's two
+lessons in one cabinet are already reported as a cabinet clash.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db.models import Q
+
+from .grid import get_lesson_numbers
+from .models import Day, Lesson, ScheduleVersion, Week
+
+CABINET = "cabinet"
+CLASS_GROUP = "class_group"
+TEACHER = "teacher"
+
+
+@dataclass
+class Conflict:
+    kind: str
+    first: Lesson
+    second: Lesson
+    lesson_numbers: tuple
+
+    @property
+    def week(self):
+        return self.first.week
+
+    @property
+    def day(self):
+        return self.first.day
+
+    @property
+    def when(self) -> str:
+        numbers = self.lesson_numbers
+        lesson_range = str(numbers[0]) if len(numbers) == 1 else f"{numbers[0]}–{numbers[-1]}"
+        return f"{Week(self.week).label}, {Day(self.day).label}, урок {lesson_range}"
+
+    def __str__(self):
+        if self.kind == CABINET:
+            return (
+                f"Кабінет {self.first.cabinet} зайнятий двічі: {self.first.class_group} "
+                f"і {self.second.class_group} ({self.when})"
+            )
+        if self.kind == TEACHER:
+            return (
+                f"{self.first.teacher} веде два уроки одночасно: {self.first.class_group} "
+                f"і {self.second.class_group} ({self.when})"
+            )
+        return f"{self.first.class_group} має два уроки одночасно ({self.when})"
+
+
+def sub_groups_overlap(first, second) -> bool:
+    return 0 in (first.sub_group, second.sub_group) or first.sub_group == second.sub_group
+
+
+def same_cabinet(first, second) -> bool:
+    cabinet = first.cabinet.strip().casefold()
+    return bool(cabinet) and cabinet == second.cabinet.strip().casefold()
+
+
+def find_conflicts(lessons):
+    """Every clashing pair in ``lessons``, once each, in timetable order."""
+    slots = defaultdict(list)
+    for lesson in lessons:
+        for lesson_number in get_lesson_numbers(lesson.para_number, lesson.para_part):
+            slots[(lesson.week, lesson.day, lesson_number)].append(lesson)
+
+    found = {}
+    for (week, day, lesson_number), slot in sorted(slots.items()):
+        if len(slot) < 2:
+            continue
+        groups = defaultdict(list)
+        for lesson in slot:
+            cabinet = lesson.cabinet.strip().casefold()
+            if cabinet:
+                groups[(CABINET, cabinet)].append(lesson)
+            groups[(CLASS_GROUP, lesson.class_group_id)].append(lesson)
+            if lesson.teacher_id:
+                groups[(TEACHER, lesson.teacher_id)].append(lesson)
+
+        for (kind, _), group in groups.items():
+            for index, first in enumerate(group):
+                for second in group[index + 1 :]:
+                    if kind == CLASS_GROUP and not sub_groups_overlap(first, second):
+                        continue
+                    if kind == TEACHER and same_cabinet(first, second):
+                        continue
+                    key = (kind, id(first), id(second))
+                    if key in found:
+                        found[key].lesson_numbers += (lesson_number,)
+                    else:
+                        found[key] = Conflict(kind, first, second, (lesson_number,))
+    return list(found.values())
+
+
+def load_lessons(**filters):
+    return (
+        Lesson.objects.select_related("class_group", "subject", "teacher")
+        .filter(**filters)
+        .order_by("week", "day", "para_number", "para_part", "class_group__name", "sub_group")
+    )
+
+
+def detect_conflicts(version_id=None, **filters):
+    """Conflicts among the lessons of a version (the active one by default) matching ``filters``."""
+    return find_conflicts(
+        load_lessons(version_id=version_id or ScheduleVersion.active_id(), **filters)
+    )
+
+
+def conflicts_with_saved(lesson):
+    """Conflicts between ``lesson`` and the other saved lessons of its day."""
+    overlapping = Q(class_group_id=lesson.class_group_id)
+    if lesson.cabinet.strip():
+        overlapping |= Q(cabinet__iexact=lesson.cabinet.strip())
+    if lesson.teacher_id:
+        overlapping |= Q(teacher_id=lesson.teacher_id)
+    others = load_lessons(version_id=lesson.version_id, week=lesson.week, day=lesson.day)
+    others = others.filter(overlapping)
+    if lesson.pk:
+        others = others.exclude(pk=lesson.pk)
+    return [
+        conflict
+        for conflict in find_conflicts([lesson, *others])
+        if lesson in (conflict.first, conflict.second)
+    ]
@@ -0,0 +1,230 @@
+"""
+Materialized timetable grids.
+
+``build_schedule_data`` output for each week of the active schedule version
+is stored in ``ScheduleGrid`` as compact JSON, together with the class-group
+columns, so the schedule view does a single query and no grid building. ``schedule.signals`` rebuilds
+the affected weeks whenever lessons, class groups or subjects change.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from core.cache import invalidate, model_tag
+
+from .models import LESSON_TIMES, ClassGroup, Day, Lesson, ScheduleGrid, ScheduleVersion, Week
+
+GRID_TAG = model_tag(ScheduleGrid)
+
+PARA_BY_LESSON_NUMBER = {
+    1: "I",
+    2: "I",
+    3: "II",
+    4: "II",
+    5: "III",
+    6: "III",
+    7: "IV",
+    8: "IV",
+}
+
+# Fields of a lesson inside a cell, in their serialized order.
+LESSON_FIELDS = ("subject", "cabinet", "sub_group")
+
+
+def get_lesson_numbers(para_number, para_part):
+    first_lesson = para_number * 2 - 1
+    second_lesson = para_number * 2
+    if para_part == 0:
+        return [first_lesson, second_lesson]
+    if para_part == 1:
+        return [first_lesson]
+    return [second_lesson]
+
+
+def annotate_para_headers(rows):
+    para_rowspans = Counter(row["para"] for row in rows)
+    last_para = None
+    for row in rows:
+        is_new_para = row["para"] != last_para
+        row["show_para"] = is_new_para
+        if is_new_para:
+            row["para_rowspan"] = para_rowspans[row["para"]]
+            last_para = row["para"]
+
+
+def align_cells(lessons_by_class, class_group_ids):
+    """
+    One cell per class group, in column order, for a single table row.
+
+    Cells covered by the rowspan of a full para in the row above are left
+    out, so the template can emit the list as is.
+    """
+    cells = []
+    for class_group_id in class_group_ids:
+        class_lessons = lessons_by_class.get(class_group_id)
+        if not class_lessons:
+            cells.append({"class_group_id": class_group_id, "rowspan": 1, "lessons": []})
+        elif not class_lessons[0]["skip"]:
+            cells.append(
+                {
+                    "class_group_id": class_group_id,
+                    "rowspan": class_lessons[0]["rowspan"],
+                    "lessons": [
+                        {field: lesson[field] for field in LESSON_FIELDS}
+                        for lesson in class_lessons
+                    ],
+                }
+            )
+    return cells
+
+
+def build_schedule_data(lessons, class_groups):
+    """
+    Timetable of ``lessons`` with a column per entry of ``class_groups``.
+
+    Returns a list of days, each with its table rows (one per lesson
+    number); every row carries its cells already aligned by ``align_cells``.
+    """
+    class_group_ids = [class_group.id for class_group in class_groups]
+    lessons_by_day = {}
+    for lesson in lessons:
+        lessons_by_day.setdefault(lesson.day, []).append(lesson)
+
+    schedule_data = []
+    for day_number, day_name in Day.choices:
+        day_lessons = lessons_by_day.get(day_number, [])
+        if not day_lessons:
+            continue
+
+        lessons_by_number = {}
+        for lesson in day_lessons:
+            lesson_numbers = get_lesson_numbers(lesson.para_number, lesson.para_part)
+            for index, lesson_number in enumerate(lesson_numbers):
+                class_lessons = lessons_by_number.setdefault(lesson_number, {}).setdefault(
+                    lesson.class_group_id, []
+                )
+                class_lessons.append(
+                    {
+                        "subject": lesson.subject,
+                        "cabinet": lesson.cabinet,
+                        "sub_group": lesson.sub_group,
+                        "rowspan": 2 if lesson.para_part == 0 and index == 0 else 1,
+                        "skip": lesson.para_part == 0 and index == 1,
+                    }
+                )
+
+        rows = [
+            {
+                "number": lesson_number,
+                "time": LESSON_TIMES.get(lesson_number, ""),
+                "para": PARA_BY_LESSON_NUMBER.get(lesson_number, ""),
+                "cells": align_cells(lessons_by_class, class_group_ids),
+            }
+            for lesson_number, lessons_by_class in sorted(lessons_by_number.items())
+        ]
+        annotate_para_headers(rows)
+        schedule_data.append({"name": day_name, "rows": rows})
+
+    return schedule_data
+
+
+def serialize_grid(schedule_data, class_groups) -> dict:
+    """Turn ``build_schedule_data`` output into compact JSON of positional lists."""
+    days = []
+    for day in schedule_data:
+        rows = []
+        for row in day["rows"]:
+            cells = [
+                [
+                    cell["class_group_id"],
+                    cell["rowspan"],
+                    [
+                        [str(lesson["subject"]), lesson["cabinet"], lesson["sub_group"]]
+                        for lesson in cell["lessons"]
+                    ],
+                ]
+                for cell in row["cells"]
+            ]
+            rows.append(
+                [row["number"], row["time"], row["para"], row.get("para_rowspan", 0), cells]
+            )
+        days.append([day["name"], rows])
+    return {
+        "class_groups": [
+            [class_group.id, class_group.name, class_group.study_type]
+            for class_group in class_groups
+        ],
+        "days": days,
+    }
+
+
+def deserialize_grid(data):
+    """Inverse of ``serialize_grid``; returns ``(schedule_data, class_groups)``."""
+    schedule_data = []
+    for day_name, serialized_rows in data["days"]:
+        rows = []
+        for lesson_number, time, para, para_rowspan, cells in serialized_rows:
+            row = {
+                "number": lesson_number,
+                "time": time,
+                "para": para,
+                "cells": [
+                    {
+                        "class_group_id": class_group_id,
+                        "rowspan": rowspan,
+                        "lessons": [dict(zip(LESSON_FIELDS, lesson)) for lesson in lessons],
+                    }
+                    for class_group_id, rowspan, lessons in cells
+                ],
+                "show_para": bool(para_rowspan),
+            }
+            if para_rowspan:
+                row["para_rowspan"] = para_rowspan
+            rows.append(row)
+        schedule_data.append({"name": day_name, "rows": rows})
+    class_groups = [
+        {"id": class_group_id, "name": name, "study_type": study_type}
+        for class_group_id, name, study_type in data["class_groups"]
+    ]
+    return schedule_data, class_groups
+
+
+def build_grid(week, version_id=None) -> dict:
+    lessons = (
+        Lesson.objects.select_related("subject")
+        .filter(version_id=version_id or ScheduleVersion.active_id(), week=week)
+        .order_by("day", "para_number", "para_part", "class_group__name")
+    )
+    class_groups = list(ClassGroup.objects.order_by("name", "study_type"))
+    return serialize_grid(build_schedule_data(lessons, class_groups), class_groups)
+
+
+def store_grids(weeks=None, version_id=None):
+    """
+    Rebuild the stored grid of ``weeks`` (all weeks by default) from
+    ``version_id`` (the active version by default), leaving caches alone.
+    """
+    weeks = sorted(set(weeks)) if weeks is not None else Week.values
+    for week in weeks:
+        data = build_grid(week, version_id)
+        ScheduleGrid.objects.update_or_create(week=week, defaults={"data": data})
+
+
+def rebuild_grids(weeks=None):
+    """Rebuild the stored grid of ``weeks`` (all weeks by default)."""
+    store_grids(weeks)
+    # Responses cached while the old grid was still stored are dropped too.
+    invalidate(GRID_TAG)
+
+
+def rebuild_grids_on_commit(weeks=None):
+    transaction.on_commit(lambda: rebuild_grids(weeks))
+
+
+def get_grid(week):
+    """Stored grid of ``week``, building it on first use."""
+    data = ScheduleGrid.objects.filter(week=week).values_list("data", flat=True).first()
+    if data is None:
+        data = build_grid(week)
+        ScheduleGrid.objects.update_or_create(week=week, defaults={"data": data})
+    return deserialize_grid(data)
@@ -0,0 +1,199 @@
+"""
+iCalendar (RFC 5545) feeds of a class group's timetable.
+
+Each lesson becomes an event repeating every four weeks, the length of the
+``Week`` rotation, starting in its week of the rotation that begins on
+``SCHEDULE_ROTATION_START``.
+
+Feeds are written by a generator, so the response starts before the whole
+calendar is built. The finished body is cached under the schedule version
+and requests carry ETag/Last-Modified validators, so calendar apps polling
+an unchanged timetable get a 304 or a cached body without any queries.
+"""
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from core.cache import get_versions
+
+from .models import ClassGroup, Lesson, Week
+from .timeslots import rotation_start
+from .views import SCHEDULE_DEPENDENCIES, schedule_version
+
+ICAL_KEY_PREFIX = "schedule-ical"
+ICAL_CACHE_TIMEOUT = 60 * 60 * 24
+ICAL_CONTENT_TYPE = "text/calendar; charset=utf-8"
+SUB_GROUPS = ("1", "2")
+
+# Europe/Kyiv, for clients that do not know the zone by its IANA name.
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE",
+    "TZID:Europe/Kyiv",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0300",
+    "TZNAME:EEST",
+    "DTSTART:19700329T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0300",
+    "TZOFFSETTO:+0200",
+    "TZNAME:EET",
+    "DTSTART:19701025T040000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+)
+
+
+def first_lesson_date(lesson) -> date:
+    return rotation_start() + timedelta(weeks=lesson.week - 1, days=lesson.day - 1)
+
+
+def escape_text(value) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> bytes:
+    """Encode a content line, folded to 75 octets without splitting characters."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return encoded + b"\r\n"
+    parts = []
+    current = b""
+    limit = 75
+    for char in line:
+        char_bytes = char.encode()
+        if len(current) + len(char_bytes) > limit:
+            parts.append(current)
+            current = b""
+            # Continuation lines start with a space.
+            limit = 74
+        current += char_bytes
+    parts.append(current)
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def lesson_uid(lesson, host) -> str:
+    """
+    UID of ``lesson``'s event, built from its slot rather than its pk.
+
+    Publishing a schedule version copies every lesson into new rows, so a pk
+    would make calendar clients drop and re-add each event on every publish.
+    """
+    slot = (
+        lesson.week,
+        lesson.day,
+        lesson.para_number,
+        lesson.para_part,
+        lesson.class_group_id,
+        lesson.sub_group,
+        lesson.subject_id,
+    )
+    return f"lesson-{'-'.join(map(str, slot))}@{host}"
+
+
+def lesson_event(lesson, dtstamp, host):
+    start, end = lesson.bounds
+    first_date = first_lesson_date(lesson)
+    summary = lesson.subject.name
+    if lesson.sub_group:
+        summary += f" ({lesson.get_sub_group_display()})"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{lesson_uid(lesson, host)}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART;TZID=Europe/Kyiv:{datetime.combine(first_date, start):%Y%m%dT%H%M%S}",
+        f"DTEND;TZID=Europe/Kyiv:{datetime.combine(first_date, end):%Y%m%dT%H%M%S}",
+        f"RRULE:FREQ=WEEKLY;INTERVAL={len(Week.values)}",
+        f"SUMMARY:{escape_text(summary)}",
+    ]
+    if lesson.cabinet:
+        lines.append(f"LOCATION:{escape_text('Кабінет ' + lesson.cabinet)}")
+    lines.append("END:VEVENT")
+    return b"".join(fold(line) for line in lines)
+
+
+def generate_calendar(class_group, lessons, dtstamp, host):
+    """Yield the calendar of ``lessons`` one event at a time."""
+    yield b"".join(
+        fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//mcl_site//schedule//UK",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{escape_text('Розклад ' + str(class_group))}",
+            "X-WR-TIMEZONE:Europe/Kyiv",
+            *VTIMEZONE,
+        )
+    )
+    for lesson in lessons:
+        yield lesson_event(lesson, dtstamp, host)
+    yield fold("END:VCALENDAR")
+
+
+def cache_chunks(key, chunks):
+    """Pass ``chunks`` through, storing the whole body once they are exhausted."""
+    stored = []
+    for chunk in chunks:
+        stored.append(chunk)
+        yield chunk
+    cache.set(key, b"".join(stored), ICAL_CACHE_TIMEOUT)
+
+
+def normalize_sub_group(value):
+    return value if value in SUB_GROUPS else ""
+
+
+def schedule_last_modified():
+    return datetime.fromtimestamp(max(get_versions(SCHEDULE_DEPENDENCIES).values()), timezone.utc)
+
+
+def ical_key(request, class_group_id):
+    sub_group = normalize_sub_group(request.GET.get("sub_group"))
+    parts = [settings.RELEASE_ID, schedule_version(), str(class_group_id), sub_group, request.get_host()]
+    digest = hashlib.sha1("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return digest
+
+
+def ical_etag(request, class_group_id):
+    return f'"{ical_key(request, class_group_id)}"'
+
+
+def ical_last_modified(request, class_group_id):
+    return schedule_last_modified()
+
+
+@require_safe
+@condition(etag_func=ical_etag, last_modified_func=ical_last_modified)
+def class_calendar_view(request, class_group_id):
+    """Timetable of a class group, or of one of its sub-groups, as an iCalendar feed."""
+    key = f"{ICAL_KEY_PREFIX}:{ical_key(request, class_group_id)}"
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type=ICAL_CONTENT_TYPE)
+
+    class_group = get_object_or_404(ClassGroup, pk=class_group_id)
+    lessons = Lesson.objects.published().select_related("subject").filter(class_group=class_group)
+    sub_group = normalize_sub_group(request.GET.get("sub_group"))
+    if sub_group:
+        lessons = lessons.filter(sub_group__in=(0, int(sub_group)))
+    lessons = lessons.order_by("week", "day", "para_number", "para_part", "sub_group")
+
+    dtstamp = f"{schedule_last_modified():%Y%m%dT%H%M%SZ}"
+    chunks = generate_calendar(class_group, lessons.iterator(), dtstamp, request.get_host())
+    return StreamingHttpResponse(cache_chunks(key, chunks), content_type=ICAL_CONTENT_TYPE)
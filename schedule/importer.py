@@ -0,0 +1,291 @@
+"""
+Bulk timetable import from CSV or XLSX.
+
+The first row names the columns, in any order: ``week``, ``day``,
+``para_number``, ``class_group`` and ``subject`` are required;
+``para_part``, ``sub_group``, ``cabinet``, ``study_type`` and ``teacher``
+are optional. Choice columns take the number or the label shown in the admin
+(``2``, ``Вівторок``, ``II тиждень`` or just ``II``). ``teacher`` is the name
+of a staff page; where it is left out, a lesson keeps the teacher of the
+lesson it replaces in the same slot (week, day, pair, class, sub-group and
+subject), so re-importing a timetable without teachers does not clear them.
+
+The whole file is validated in memory, including double bookings of class
+groups, cabinets and teachers (see ``schedule.conflicts``), before anything is
+written. Every week present in the file is then replaced in one transaction.
+Imports into the active schedule version also rebuild its stored grids and
+invalidate the schedule cache once after the commit; imports into a draft
+wait for it to be published.
+"""
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+
+import openpyxl
+from django.db import transaction
+
+from core.signals import bulk_changes, invalidate_on_commit
+from staff.models import PersonPage
+
+from .conflicts import find_conflicts
+from .grid import store_grids
+from .models import ClassGroup, Lesson, ScheduleVersion, Subject
+from .versions import create_draft
+from .views import SCHEDULE_DEPENDENCIES
+
+REQUIRED_COLUMNS = ("week", "day", "para_number", "class_group", "subject")
+OPTIONAL_COLUMNS = ("para_part", "sub_group", "cabinet", "study_type", "teacher")
+CHOICE_COLUMNS = ("week", "day", "para_number", "para_part", "sub_group")
+BULK_CREATE_BATCH_SIZE = 500
+
+
+class TimetableImportError(Exception):
+    """The file was rejected; ``errors`` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+@dataclass
+class ImportResult:
+    weeks: list = field(default_factory=list)
+    created: int = 0
+    deleted: int = 0
+    new_subjects: list = field(default_factory=list)
+
+
+def read_csv(file):
+    try:
+        text = io.StringIO(file.read().decode("utf-8-sig"), newline="")
+    except UnicodeDecodeError:
+        raise TimetableImportError(["CSV має бути у кодуванні UTF-8"])
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text, dialect)
+    return list(reader)
+
+
+def read_xlsx(file):
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """Rows of ``file`` as dicts keyed by column, numbered as in the spreadsheet."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        rows = read_csv(file)
+    elif extension == ".xlsx":
+        rows = read_xlsx(file)
+    else:
+        raise TimetableImportError([f"Непідтримуваний формат файлу: {extension or filename}"])
+    if not rows:
+        raise TimetableImportError(["Файл порожній"])
+
+    header = [str(name or "").strip().lower() for name in rows[0]]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise TimetableImportError([f"Немає стовпців: {', '.join(missing)}"])
+    known = set(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+    return [
+        (
+            number,
+            {name: cell for name, cell in zip(header, row) if name in known},
+        )
+        for number, row in enumerate(rows[1:], start=2)
+        if any(cell not in (None, "") for cell in row)
+    ]
+
+
+def cell_text(value) -> str:
+    # XLSX numbers come back as floats.
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value).strip()
+
+
+def choice_lookup(choices) -> dict:
+    """Accepted spellings of each choice: the value, the label and its first word."""
+    lookup = {}
+    for value, label in choices:
+        for spelling in (str(value), str(label), str(label).split()[0]):
+            lookup.setdefault(spelling.casefold(), value)
+    return lookup
+
+
+def class_group_lookup(class_groups) -> dict:
+    lookup = {}
+    for class_group in class_groups:
+        for key in (
+            (class_group.name.casefold(), class_group.study_type.casefold()),
+            (str(class_group).casefold(), ""),
+        ):
+            lookup[key] = class_group
+        # Without a study type the bare name is only usable when unambiguous.
+        bare_key = (class_group.name.casefold(), "")
+        lookup[bare_key] = None if bare_key in lookup else class_group
+    return lookup
+
+
+def teacher_lookup(people) -> dict:
+    lookup = {}
+    for person in people:
+        key = person.title.casefold()
+        # Namesakes cannot be told apart by name.
+        lookup[key] = None if key in lookup else person
+    return lookup
+
+
+def slot_key(lesson):
+    return (
+        lesson.week,
+        lesson.day,
+        lesson.para_number,
+        lesson.para_part,
+        lesson.sub_group,
+        lesson.class_group_id,
+        lesson.subject_id,
+    )
+
+
+def carry_over_teachers(lessons, version_id):
+    """Give lessons without a teacher the one of the lesson they replace in ``version_id``."""
+    weeks = {lesson.week for lesson in lessons}
+    replaced = (
+        Lesson.objects.filter(version_id=version_id, week__in=weeks, teacher__isnull=False)
+        .select_related("teacher")
+    )
+    teachers = {slot_key(lesson): lesson.teacher for lesson in replaced}
+    for lesson in lessons:
+        if lesson.teacher_id is None and lesson.subject_id is not None:
+            lesson.teacher = teachers.get(slot_key(lesson))
+
+
+def parse_lessons(rows, version_id=None):
+    """
+    Validate ``rows`` from ``read_rows`` and build unsaved lessons.
+
+    Lessons without a teacher take the one of the lesson they replace in
+    ``version_id``, if given. Subjects not in the database yet are returned
+    by name and must be created before the lessons are saved. Raises
+    ``TimetableImportError``.
+    """
+    choices = {name: choice_lookup(Lesson._meta.get_field(name).choices) for name in CHOICE_COLUMNS}
+    class_groups = class_group_lookup(ClassGroup.objects.all())
+    subjects = {subject.name.casefold(): subject for subject in Subject.objects.all()}
+    teachers = teacher_lookup(PersonPage.objects.only("title"))
+    new_subjects = {}
+    errors = []
+    lessons = []
+
+    for number, row in rows:
+        values = {}
+        row_errors = []
+        for name in CHOICE_COLUMNS:
+            text = cell_text(row.get(name))
+            if not text and name in OPTIONAL_COLUMNS:
+                values[name] = 0
+            elif text.casefold() in choices[name]:
+                values[name] = choices[name][text.casefold()]
+            else:
+                row_errors.append(f"недійсне значення {name}: {text!r}")
+
+        class_group_name = cell_text(row.get("class_group"))
+        study_type = cell_text(row.get("study_type"))
+        class_group_key = (class_group_name.casefold(), study_type.casefold())
+        class_group = class_groups.get(class_group_key)
+        if class_group is None and class_group_key in class_groups:
+            row_errors.append(f"клас {class_group_name!r} є з різними типами навчання, вкажіть study_type")
+        elif class_group is None:
+            row_errors.append(f"невідомий клас {' '.join(filter(None, (class_group_name, study_type)))!r}")
+
+        subject_name = cell_text(row.get("subject"))
+        if not subject_name:
+            row_errors.append("не вказано предмет")
+        elif subject_name.casefold() not in subjects:
+            new_subjects.setdefault(subject_name.casefold(), subject_name)
+
+        teacher_name = cell_text(row.get("teacher"))
+        teacher = teachers.get(teacher_name.casefold()) if teacher_name else None
+        if teacher_name and teacher is None:
+            if teacher_name.casefold() in teachers:
+                row_errors.append(f"кілька працівників з іменем {teacher_name!r}")
+            else:
+                row_errors.append(f"невідомий вчитель {teacher_name!r}")
+
+        if row_errors:
+            errors.extend(f"Рядок {number}: {error}" for error in row_errors)
+            continue
+
+        lesson = Lesson(
+            class_group=class_group,
+            subject=subjects.get(subject_name.casefold()),
+            cabinet=cell_text(row.get("cabinet")),
+            teacher=teacher,
+            **values,
+        )
+        lesson._subject_name = subject_name.casefold()
+        lesson._row_number = number
+        lessons.append(lesson)
+
+    if version_id is not None:
+        carry_over_teachers(lessons, version_id)
+    for conflict in find_conflicts(lessons):
+        errors.append(
+            f"Рядки {conflict.first._row_number} і {conflict.second._row_number}: {conflict}"
+        )
+
+    if errors:
+        raise TimetableImportError(list(dict.fromkeys(errors)))
+    return lessons, list(new_subjects.values())
+
+
+def import_timetable(file, filename, dry_run=False, version_id=None, into_draft=False):
+    """
+    Replace the weeks in a CSV/XLSX timetable with its lessons, in the given
+    schedule version (the active one by default).
+
+    With ``into_draft`` the lessons go to the working copy, which is only
+    started once the file has passed validation.
+    """
+    active_id = ScheduleVersion.active_id()
+    if into_draft:
+        draft = ScheduleVersion.draft()
+        version_id = draft.pk if draft is not None else None
+    # A draft still to be started will be a copy of the active version.
+    version_id = version_id or active_id
+    lessons, new_subject_names = parse_lessons(read_rows(file, filename), version_id)
+    weeks = sorted({lesson.week for lesson in lessons})
+    result = ImportResult(weeks=weeks, created=len(lessons), new_subjects=new_subject_names)
+    if dry_run or not lessons:
+        return result
+    if version_id is None and not into_draft:
+        raise TimetableImportError(["Немає опублікованого розкладу: імпортуйте файл у чернетку."])
+
+    with bulk_changes(), transaction.atomic():
+        if into_draft:
+            version_id = create_draft().pk
+        created_subjects = Subject.objects.bulk_create(
+            [Subject(name=name) for name in new_subject_names]
+        )
+        subjects = {subject.name.casefold(): subject for subject in created_subjects}
+        for lesson in lessons:
+            lesson.version_id = version_id
+            if lesson.subject_id is None:
+                lesson.subject = subjects[lesson._subject_name]
+        result.deleted, _ = Lesson.objects.filter(version_id=version_id, week__in=weeks).delete()
+        Lesson.objects.bulk_create(lessons, batch_size=BULK_CREATE_BATCH_SIZE)
+        # A draft goes public with ``schedule.versions.publish``.
+        if version_id == active_id:
+            store_grids(weeks)
+            invalidate_on_commit(*SCHEDULE_DEPENDENCIES)
+    return result
@@ -0,0 +1,100 @@
+"""
+What each class has right now and next.
+
+The answer only changes at lesson boundaries (see ``schedule.timeslots``),
+so it is cached under the schedule version until the next boundary, and
+responses may be cached by browsers until then too, up to ``LIVE_MAX_AGE``.
+"""
+import math
+
+from django.core.cache import cache
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import patch_response_headers
+
+from .models import Day, Lesson
+from .timeslots import next_boundary, rotation_week
+from .views import schedule_version
+
+LIVE_KEY_PREFIX = "schedule-live"
+# Browsers recheck at least this often, so edits show up overnight as well.
+LIVE_MAX_AGE = 60 * 15
+
+
+def serialize_lesson(lesson):
+    start, end = lesson.bounds
+    return {
+        "subject": lesson.subject.name,
+        "cabinet": lesson.cabinet,
+        "sub_group": lesson.sub_group,
+        "start": start.strftime("%H:%M"),
+        "end": end.strftime("%H:%M"),
+    }
+
+
+def build_now_and_next(moment):
+    """Lessons under way at ``moment`` and the next ones that day, per class group."""
+    day = moment.isoweekday()
+    week = rotation_week(moment.date())
+    classes = []
+    if day not in Day.values:
+        return {"week": week, "day": None, "classes": classes}
+
+    now = moment.time().replace(tzinfo=None)
+    lessons = (
+        Lesson.objects.published()
+        .select_related("class_group", "subject")
+        .filter(week=week, day=day)
+        .order_by("class_group__name", "class_group__study_type", "para_number", "para_part", "sub_group")
+    )
+    by_class = {}
+    for lesson in lessons:
+        start, end = lesson.bounds
+        if end <= now:
+            continue
+        entry = by_class.setdefault(lesson.class_group, {"current": [], "upcoming": []})
+        entry["current" if start <= now else "upcoming"].append(lesson)
+
+    for class_group, entry in by_class.items():
+        upcoming = entry["upcoming"]
+        next_start = min((lesson.bounds[0] for lesson in upcoming), default=None)
+        classes.append(
+            {
+                "class_group": {
+                    "id": class_group.id,
+                    "name": class_group.name,
+                    "study_type": class_group.study_type,
+                },
+                "current": [serialize_lesson(lesson) for lesson in entry["current"]],
+                "next": [
+                    serialize_lesson(lesson) for lesson in upcoming if lesson.bounds[0] == next_start
+                ],
+            }
+        )
+    return {"week": week, "day": day, "classes": classes}
+
+
+def get_now_and_next(moment=None):
+    """``(data, valid_until)`` for ``moment`` (now by default)."""
+    moment = timezone.localtime(moment)
+    valid_until = next_boundary(moment)
+    key = f"{LIVE_KEY_PREFIX}:{schedule_version()}:{valid_until:%Y%m%d%H%M}"
+    data = cache.get(key)
+    if data is None:
+        data = build_now_and_next(moment)
+        data["valid_until"] = valid_until.isoformat()
+        cache.set(key, data, math.ceil((valid_until - moment).total_seconds()))
+    return data, valid_until
+
+
+def patch_live_headers(response, valid_until):
+    seconds = math.ceil((valid_until - timezone.now()).total_seconds())
+    patch_response_headers(response, max(1, min(seconds, LIVE_MAX_AGE)))
+    return response
+
+
+def schedule_now_view(request):
+    """"Now and next" block of the home page, which loads it by script."""
+    data, valid_until = get_now_and_next()
+    response = render(request, "schedule/now_block.html", {"live": data})
+    return patch_live_headers(response, valid_until)
@@ -0,0 +1,62 @@
+"""
+Django management command to time building and rendering a large timetable.
+"""
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from schedule.grid import build_schedule_data
+from schedule.models import Day
+
+
+class Command(BaseCommand):
+    help = "Times build_schedule_data and the schedule template on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--class-groups", type=int, default=45, help="Number of columns")
+        parser.add_argument("--repeat", type=int, default=10, help="Runs to average")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        class_groups = [
+            SimpleNamespace(id=number, name=f"{number}-А", study_type="ОЧНЕ")
+            for number in range(1, options["class_groups"] + 1)
+        ]
+        # Four paras a day; mostly full paras with some split halves.
+        lessons = [
+            SimpleNamespace(
+                day=day,
+                para_number=para_number,
+                para_part=rng.choice((0, 0, 0, 1, 2)),
+                class_group_id=class_group.id,
+                subject=f"Предмет {para_number}",
+                cabinet=str(100 + para_number),
+                sub_group=0,
+            )
+            for class_group in class_groups
+            for day in Day.values
+            for para_number in range(1, 5)
+        ]
+        repeat = options["repeat"]
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            schedule_data = build_schedule_data(lessons, class_groups)
+        build_ms = (time.perf_counter() - started) / repeat * 1000
+
+        template = get_template("schedule/schedule_page.html")
+        request = RequestFactory().get("/schedule/")
+        context = {"schedule_data": schedule_data, "class_groups": class_groups, "current_week": "1"}
+        template.render(context, request)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            template.render(context, request)
+        render_ms = (time.perf_counter() - started) / repeat * 1000
+
+        self.stdout.write(f"{len(class_groups)} class groups, {len(lessons)} lessons")
+        self.stdout.write(f"build_schedule_data: {build_ms:.1f} ms")
+        self.stdout.write(f"template render: {render_ms:.1f} ms")
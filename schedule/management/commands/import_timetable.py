@@ -0,0 +1,49 @@
+"""
+Django management command to replace timetable weeks from a CSV or XLSX file.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.importer import TimetableImportError, import_timetable
+
+
+class Command(BaseCommand):
+    help = "Imports lessons from a CSV/XLSX timetable, replacing every week it contains"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only validate the file"
+        )
+        parser.add_argument(
+            "--draft",
+            action="store_true",
+            help="Import into the schedule draft (started if needed) instead of the published schedule",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        into_draft = options["draft"] and not options["dry_run"]
+        try:
+            with open(path, "rb") as file:
+                result = import_timetable(
+                    file, os.path.basename(path), dry_run=options["dry_run"], into_draft=into_draft
+                )
+        except OSError as exc:
+            raise CommandError(exc)
+        except TimetableImportError as exc:
+            raise CommandError(f"Timetable rejected:\n{exc}")
+
+        weeks = ", ".join(map(str, result.weeks)) or "none"
+        if result.new_subjects:
+            self.stdout.write(f"New subjects: {', '.join(result.new_subjects)}")
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Valid: {result.created} lessons for weeks {weeks}"))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Imported {result.created} lessons for weeks {weeks} "
+                    f"(replaced {result.deleted})" + (" into the draft" if into_draft else "")
+                )
+            )
@@ -0,0 +1,28 @@
+"""
+Django management command to list double-booked cabinets and class groups.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.conflicts import detect_conflicts
+from schedule.models import Week
+
+
+class Command(BaseCommand):
+    help = "Lists lessons that book the same cabinet or class group at the same time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--week", type=int, choices=Week.values, help="Only check this week of the rotation"
+        )
+        parser.add_argument(
+            "--schedule-version", type=int, help="Schedule version id (defaults to the published one)"
+        )
+
+    def handle(self, *args, **options):
+        filters = {"week": options["week"]} if options["week"] else {}
+        conflicts = detect_conflicts(version_id=options["schedule_version"], **filters)
+        for conflict in conflicts:
+            self.stdout.write(str(conflict))
+        if conflicts:
+            raise CommandError(f"{len(conflicts)} conflicts found")
+        self.stdout.write(self.style.SUCCESS("No conflicts."))
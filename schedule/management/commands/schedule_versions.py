@@ -0,0 +1,42 @@
+"""
+Django management command to start, publish or discard schedule versions.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.models import ScheduleVersion
+from schedule.versions import create_draft, discard_draft, publish
+
+
+class Command(BaseCommand):
+    help = "Lists schedule versions, starts or discards the draft, or publishes a version"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action", nargs="?", default="list", choices=("list", "draft", "publish", "discard")
+        )
+        parser.add_argument("--name", default="", help="Name of a new draft")
+        parser.add_argument(
+            "--schedule-version", type=int, help="Version to publish (defaults to the draft)"
+        )
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "draft":
+            self.stdout.write(self.style.SUCCESS(f"Draft: {create_draft(options['name'])}"))
+        elif action == "publish":
+            if options["schedule_version"]:
+                version = ScheduleVersion.objects.filter(pk=options["schedule_version"]).first()
+            else:
+                version = ScheduleVersion.draft()
+            if version is None:
+                raise CommandError("No such version")
+            if version.is_active:
+                raise CommandError(f"{version} is already published")
+            self.stdout.write(self.style.SUCCESS(f"Published: {publish(version)}"))
+        elif action == "discard":
+            if not discard_draft():
+                raise CommandError("There is no draft")
+            self.stdout.write(self.style.SUCCESS("Draft discarded."))
+        else:
+            for version in ScheduleVersion.objects.all():
+                self.stdout.write(f"{version.pk}: {version}")
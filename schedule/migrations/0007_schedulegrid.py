@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule', '0006_alter_lesson_week'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleGrid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(choices=[(1, 'I тиждень'), (2, 'II тиждень'), (3, 'III тиждень'), (4, 'IV тиждень')], unique=True, verbose_name='Тиждень (I-IV)')),
+                ('data', models.JSONField(verbose_name='Сітка розкладу')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Сітка розкладу',
+                'verbose_name_plural': 'Сітки розкладу',
+            },
+        ),
+    ]
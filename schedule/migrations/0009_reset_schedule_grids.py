@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def delete_grids(apps, schema_editor):
+    # Grids are rebuilt on first use in the new cell-aligned format.
+    apps.get_model("schedule", "ScheduleGrid").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0008_lesson_week_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_grids, migrations.RunPython.noop),
+    ]
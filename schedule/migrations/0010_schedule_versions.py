@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_initial_version(apps, schema_editor):
+    ScheduleVersion = apps.get_model("schedule", "ScheduleVersion")
+    Lesson = apps.get_model("schedule", "Lesson")
+    version = ScheduleVersion.objects.create(name="Розклад", is_active=True, published_at=timezone.now())
+    Lesson.objects.update(version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0009_reset_schedule_grids"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleVersion",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(blank=True, max_length=100, verbose_name="Назва")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="Створено")),
+                ("published_at", models.DateTimeField(blank=True, null=True, verbose_name="Опубліковано")),
+                ("is_active", models.BooleanField(default=False, editable=False, verbose_name="Активна")),
+            ],
+            options={
+                "verbose_name": "Версія розкладу",
+                "verbose_name_plural": "Версії розкладу",
+                "ordering": ["-created_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("is_active", True)),
+                        fields=("is_active",),
+                        name="schedule_single_active_version",
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="version",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lessons",
+                to="schedule.scheduleversion",
+                verbose_name="Версія розкладу",
+            ),
+        ),
+        migrations.RunPython(create_initial_version, migrations.RunPython.noop),
+    ]
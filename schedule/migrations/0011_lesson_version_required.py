@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Kept apart from 0010: on PostgreSQL the deferred FK checks of the lessons
+# updated there make ALTER TABLE fail in the same transaction ("pending
+# trigger events").
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0010_schedule_versions"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lesson",
+            name="version",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Порожнє — робоча чернетка, якщо її створено, інакше активна версія.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lessons",
+                to="schedule.scheduleversion",
+                verbose_name="Версія розкладу",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="lesson",
+            name="lesson_week_class_group_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="lesson",
+            name="lesson_week_cabinet_idx",
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["version", "week", "class_group"], name="lesson_version_week_class_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["version", "week", "cabinet"], name="lesson_version_week_cab_idx"),
+        ),
+    ]
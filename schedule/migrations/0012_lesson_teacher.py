@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0011_lesson_version_required"),
+        ("staff", "0010_alter_personpage_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lesson",
+            name="teacher",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="lessons",
+                to="staff.personpage",
+                verbose_name="Вчитель",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["teacher", "week", "day"], name="lesson_teacher_week_day_idx"),
+        ),
+    ]
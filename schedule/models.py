@@ -1,3 +1,7 @@
+from datetime import time
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.db import models
 from wagtail.snippets.models import register_snippet
 from wagtail.snippets.views.snippets import SnippetViewSet
@@ -53,7 +57,101 @@ LESSON_TIMES = {
     8: "15:15 – 16:00",
 }
 
+
+def parse_time_slot(slot):
+    start, end = slot.split(" – ")
+    return time.fromisoformat(start), time.fromisoformat(end)
+
+
+# LESSON_TIMES as ``(start, end)`` pairs of ``datetime.time``
+LESSON_SLOTS = {number: parse_time_slot(slot) for number, slot in LESSON_TIMES.items()}
+
+ACTIVE_VERSION_KEY = "schedule-active-version"
+
+
+class ScheduleVersion(models.Model):
+    """
+    A complete timetable. Exactly one version is active (published); the
+    newest unpublished one is the working copy editors change.
+    """
+
+    name = models.CharField("Назва", max_length=100, blank=True)
+    created_at = models.DateTimeField("Створено", auto_now_add=True)
+    published_at = models.DateTimeField("Опубліковано", null=True, blank=True)
+    is_active = models.BooleanField("Активна", default=False, editable=False)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_active"],
+                condition=models.Q(is_active=True),
+                name="schedule_single_active_version",
+            ),
+        ]
+        verbose_name = "Версія розкладу"
+        verbose_name_plural = "Версії розкладу"
+
+    def __str__(self):
+        label = self.name or (f"{self.created_at:%d.%m.%Y %H:%M}" if self.created_at else "—")
+        return f"{label} ({self.status})"
+
+    @property
+    def status(self):
+        if self.is_active:
+            return "активна"
+        return "архів" if self.published_at else "чернетка"
+
+    @classmethod
+    def active_id(cls):
+        """
+        Id of the published version, read from the cache on every public
+        request; None until one is published.
+        """
+        version_id = cache.get(ACTIVE_VERSION_KEY)
+        if version_id is None:
+            version_id = cls.objects.filter(is_active=True).values_list("pk", flat=True).first()
+            if version_id is not None:
+                cache.set(ACTIVE_VERSION_KEY, version_id, None)
+        return version_id
+
+    @classmethod
+    def draft(cls):
+        """The working copy, if one was started."""
+        return cls.objects.filter(is_active=False, published_at__isnull=True).first()
+
+    @classmethod
+    def editing_id(cls):
+        """
+        Version new lessons go to: the working copy, or the published version
+        without one. With neither, a working copy is started.
+        """
+        draft = cls.draft()
+        if draft is not None:
+            return draft.pk
+        active_id = cls.active_id()
+        if active_id is not None:
+            return active_id
+        # Imported here: schedule.versions builds on this module.
+        from .versions import create_draft
+
+        return create_draft().pk
+
+
+class LessonQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(version_id=ScheduleVersion.active_id())
+
+
 class Lesson(models.Model):
+    version = models.ForeignKey(
+        ScheduleVersion,
+        on_delete=models.CASCADE,
+        related_name="lessons",
+        blank=True,
+        verbose_name="Версія розкладу",
+        help_text="Порожнє — робоча чернетка, якщо її створено, інакше активна версія.",
+    )
     class_group = models.ForeignKey(ClassGroup, on_delete=models.CASCADE, verbose_name="Клас")
     day = models.IntegerField(choices=Day.choices, verbose_name="День тижня")
     para_number = models.IntegerField("Номер пари", default=1, choices=[(1, "I пара"), (2, "II пара"), (3, "III пара"), (4, "IV пара")])
@@ -62,8 +160,19 @@ class Lesson(models.Model):
     cabinet = models.CharField("Кабінет", max_length=20, blank=True, default="")
     week = models.IntegerField(choices=Week.choices, default=1, verbose_name="Тиждень (I-IV)")
     sub_group = models.IntegerField("Підгрупа", default=0, choices=[(0, "Весь клас"), (1, "1 підгрупа"), (2, "2 підгрупа")])
+    teacher = models.ForeignKey(
+        "staff.PersonPage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="lessons",
+        verbose_name="Вчитель",
+    )
+
+    objects = LessonQuerySet.as_manager()
 
     panels = [
+        FieldPanel('version'),
         FieldPanel('class_group'),
         FieldPanel('week'),
         FieldPanel('day'),
@@ -72,10 +181,16 @@ class Lesson(models.Model):
         FieldPanel('subject'),
         FieldPanel('cabinet'),
         FieldPanel('sub_group'),
+        FieldPanel('teacher'),
     ]
 
     class Meta:
         ordering = ['week', 'day', 'para_number', 'para_part', 'class_group']
+        indexes = [
+            models.Index(fields=['version', 'week', 'class_group'], name='lesson_version_week_class_idx'),
+            models.Index(fields=['version', 'week', 'cabinet'], name='lesson_version_week_cab_idx'),
+            models.Index(fields=['teacher', 'week', 'day'], name='lesson_teacher_week_day_idx'),
+        ]
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
 
@@ -83,22 +198,59 @@ class Lesson(models.Model):
         part_display = self.get_para_part_display()
         return f"{self.class_group} - {self.get_day_display()} - {self.get_para_number_display()} ({part_display}) - {self.subject}"
     
+    @property
+    def is_published(self):
+        return self.version_id == ScheduleVersion.active_id()
+
+    def clean(self):
+        super().clean()
+        if self.version_id is None:
+            self.version_id = ScheduleVersion.editing_id()
+        if self.class_group_id is None or self.week is None or self.day is None:
+            return
+        # Imported here: schedule.conflicts builds on this module.
+        from .conflicts import conflicts_with_saved
+
+        conflicts = conflicts_with_saved(self)
+        if conflicts:
+            raise ValidationError([str(conflict) for conflict in conflicts])
+
+    def save(self, *args, **kwargs):
+        if self.version_id is None:
+            self.version_id = ScheduleVersion.editing_id()
+        super().save(*args, **kwargs)
+
     @property
     def time(self):
-        if self.para_part == 0: # Full
-            start = LESSON_TIMES.get(self.para_number * 2 - 1).split(' – ')[0]
-            end = LESSON_TIMES.get(self.para_number * 2).split(' – ')[1]
-            return f"{start} – {end}"
-        elif self.para_part == 1: # 1st half
-            return LESSON_TIMES.get(self.para_number * 2 - 1, "")
-        else: # 2nd half
-            return LESSON_TIMES.get(self.para_number * 2, "")
+        start, end = self.bounds
+        return f"{start:%H:%M} – {end:%H:%M}"
+
+    @property
+    def bounds(self):
+        """Start and end of the lesson as ``datetime.time``."""
+        first = self.para_number * 2 - (0 if self.para_part == 2 else 1)
+        last = self.para_number * 2 - (1 if self.para_part == 1 else 0)
+        return LESSON_SLOTS[first][0], LESSON_SLOTS[last][1]
+
+class ScheduleGrid(models.Model):
+    """Pre-built timetable of one week, kept current by schedule.signals."""
+
+    week = models.IntegerField(choices=Week.choices, unique=True, verbose_name="Тиждень (I-IV)")
+    data = models.JSONField("Сітка розкладу")
+    built_at = models.DateTimeField("Оновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Сітка розкладу"
+        verbose_name_plural = "Сітки розкладу"
+
+    def __str__(self):
+        return self.get_week_display()
 
 class LessonViewSet(SnippetViewSet):
     model = Lesson
     icon = "table"
-    list_display = ("week", "day", "para_number", "class_group", "subject", "cabinet")
-    list_filter = ("week", "day", "class_group")
+    list_display = ("week", "day", "para_number", "class_group", "subject", "cabinet", "teacher", "version")
+    list_filter = ("version", "week", "day", "class_group", "teacher")
     search_fields = ("subject__name", "cabinet")
 
 register_snippet(LessonViewSet)
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.signals import in_bulk_changes
+
+from .grid import rebuild_grids_on_commit
+from .models import ClassGroup, Lesson, ScheduleVersion, Subject
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_previous_placement(sender, instance, **kwargs):
+    instance._previous = (
+        Lesson.objects.filter(pk=instance.pk).values_list("week", "version_id").first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def rebuild_saved_lesson_week(sender, instance, **kwargs):
+    if in_bulk_changes():
+        return
+    # Lessons of a draft (or moved between drafts) are not public yet.
+    active_id = ScheduleVersion.active_id()
+    weeks = set()
+    if instance.version_id == active_id:
+        weeks.add(instance.week)
+    previous = getattr(instance, "_previous", None)
+    if previous and previous[1] == active_id:
+        weeks.add(previous[0])
+    if weeks:
+        rebuild_grids_on_commit(weeks)
+
+
+@receiver(post_delete, sender=Lesson)
+def rebuild_deleted_lesson_week(sender, instance, origin=None, **kwargs):
+    # Lessons deleted along with their class group or subject are covered
+    # by a single rebuild of every week below.
+    if in_bulk_changes() or isinstance(origin, (ClassGroup, Subject)) or not instance.is_published:
+        return
+    rebuild_grids_on_commit({instance.week})
+
+
+@receiver(post_save, sender=ClassGroup)
+@receiver(post_delete, sender=ClassGroup)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def rebuild_all_weeks(sender, instance, **kwargs):
+    if in_bulk_changes():
+        return
+    # Class groups are the grid's columns and subject names are stored in
+    # it, so any week may be affected.
+    rebuild_grids_on_commit()
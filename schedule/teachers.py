@@ -0,0 +1,37 @@
+"""
+Timetable of one teacher.
+
+A teacher's lessons in the active version are read with one query, served
+by the ``(teacher, week, day)`` index, and grouped by week and day in
+memory. The same list is then checked for clashes, so a teacher booked for
+two lessons at once is found without another query.
+"""
+from itertools import groupby
+
+from .conflicts import find_conflicts
+from .models import Day, Lesson, Week
+
+
+def teacher_lessons(teacher):
+    return list(
+        Lesson.objects.published()
+        .select_related("class_group", "subject")
+        .filter(teacher=teacher)
+        .order_by("week", "day", "para_number", "para_part", "class_group__name", "sub_group")
+    )
+
+
+def teacher_schedule(teacher):
+    """``(weeks, conflicts)``: the teacher's lessons by week and day, and their clashes."""
+    lessons = teacher_lessons(teacher)
+    weeks = [
+        {
+            "week": Week(week).label,
+            "days": [
+                {"day": Day(day).label, "lessons": list(day_lessons)}
+                for day, day_lessons in groupby(week_lessons, key=lambda lesson: lesson.day)
+            ],
+        }
+        for week, week_lessons in groupby(lessons, key=lambda lesson: lesson.week)
+    ]
+    return weeks, find_conflicts(lessons)
@@ -1,9 +1,40 @@
+import csv
+import io
+import os
+import tempfile
 from dataclasses import dataclass
+from datetime import date, datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
 
-from django.test import SimpleTestCase
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from wagtail.models import Site
 
-from .models import Day
-from .views import build_schedule_data, get_lesson_numbers, normalize_week_filter
+from staff.models import PersonPage, StaffIndexPage
+
+from .conflicts import detect_conflicts
+from .grid import (
+    build_schedule_data,
+    deserialize_grid,
+    get_grid,
+    get_lesson_numbers,
+    serialize_grid,
+)
+from .importer import TimetableImportError, import_timetable
+from .live import get_now_and_next
+from .models import ClassGroup, Day, Lesson, ScheduleGrid, ScheduleVersion, Subject
+from .teachers import teacher_schedule
+from .timeslots import next_boundary, rotation_week
+from .versions import create_draft, discard_draft, publish
+from .views import normalize_week_filter, schedule_version
 
 
 @dataclass
@@ -17,6 +48,16 @@ class FakeLesson:
     sub_group: int = 0
 
 
+@dataclass
+class FakeClassGroup:
+    id: int
+    name: str
+    study_type: str = "ОЧНЕ"
+
+
+CLASS_GROUPS = [FakeClassGroup(1, "10-А"), FakeClassGroup(2, "11-Б")]
+
+
 class ScheduleViewHelpersTests(SimpleTestCase):
     def test_normalize_week_filter(self):
         self.assertEqual(normalize_week_filter("1"), "1")
@@ -50,27 +91,642 @@ class ScheduleViewHelpersTests(SimpleTestCase):
                     subject="Chemistry",
                     cabinet="202",
                 ),
-            ]
+            ],
+            CLASS_GROUPS,
         )
 
-        self.assertIn(monday_name, schedule_data)
-        monday_rows = schedule_data[monday_name]
-        self.assertEqual(list(monday_rows.keys()), [1, 2, 3])
+        self.assertEqual([day["name"] for day in schedule_data], [monday_name])
+        monday_rows = schedule_data[0]["rows"]
+        self.assertEqual([row["number"] for row in monday_rows], [1, 2, 3])
 
-        first_row = monday_rows[1]
-        second_row = monday_rows[2]
-        third_row = monday_rows[3]
+        first_row, second_row, third_row = monday_rows
 
         self.assertEqual(first_row["para"], "I")
         self.assertTrue(first_row["show_para"])
         self.assertEqual(first_row["para_rowspan"], 2)
-        self.assertEqual(first_row["lessons"][1][0]["rowspan"], 2)
-        self.assertFalse(first_row["lessons"][1][0]["skip"])
+        self.assertEqual([cell["class_group_id"] for cell in first_row["cells"]], [1, 2])
+        self.assertEqual(first_row["cells"][0]["rowspan"], 2)
+        self.assertEqual(first_row["cells"][0]["lessons"][0]["subject"], "Math")
+        self.assertEqual(first_row["cells"][1]["lessons"], [])
 
+        # Class 1 is covered by the full para above; only class 2's empty cell remains.
         self.assertFalse(second_row["show_para"])
-        self.assertTrue(second_row["lessons"][1][0]["skip"])
+        self.assertEqual([cell["class_group_id"] for cell in second_row["cells"]], [2])
 
         self.assertEqual(third_row["para"], "II")
         self.assertTrue(third_row["show_para"])
         self.assertEqual(third_row["para_rowspan"], 1)
-        self.assertEqual(third_row["lessons"][2][0]["subject"], "Chemistry")
+        self.assertEqual(third_row["cells"][1]["lessons"][0]["subject"], "Chemistry")
+
+    def test_lesson_bounds(self):
+        self.assertEqual(
+            [
+                tuple(t.strftime("%H:%M") for t in Lesson(para_number=2, para_part=part).bounds)
+                for part in (0, 1, 2)
+            ],
+            [("10:45", "12:20"), ("10:45", "11:30"), ("11:35", "12:20")],
+        )
+
+    def test_serialized_grid_round_trips(self):
+        schedule_data = build_schedule_data(
+            [
+                FakeLesson(day=Day.MONDAY, para_number=1, para_part=0, class_group_id=1, subject="Math"),
+                FakeLesson(day=Day.TUESDAY, para_number=2, para_part=2, class_group_id=2, subject="Art"),
+            ],
+            CLASS_GROUPS,
+        )
+        data = serialize_grid(schedule_data, CLASS_GROUPS)
+        deserialized, class_groups = deserialize_grid(data)
+        self.assertEqual(deserialized, schedule_data)
+        self.assertEqual([class_group["id"] for class_group in class_groups], [1, 2])
+
+
+class ScheduleGridTests(TestCase):
+    def setUp(self):
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        self.subject = Subject.objects.create(name="Математика")
+
+    def _create_lesson(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lesson.objects.create(
+                class_group=self.class_group, subject=self.subject, day=Day.MONDAY, **kwargs
+            )
+
+    def _subjects(self, week):
+        schedule_data, _ = get_grid(week)
+        return [
+            lesson["subject"]
+            for day in schedule_data
+            for row in day["rows"]
+            for cell in row["cells"]
+            for lesson in cell["lessons"]
+        ]
+
+    def test_lesson_changes_rebuild_their_weeks(self):
+        lesson = self._create_lesson(week=1, para_number=1, para_part=1)
+        self.assertEqual(self._subjects(1), ["Математика"])
+
+        lesson.week = 2
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        self.assertEqual(self._subjects(1), [])
+        self.assertEqual(self._subjects(2), ["Математика"])
+
+    def test_subject_rename_rebuilds_grid(self):
+        self._create_lesson(week=3, para_number=2, para_part=1)
+        self.subject.name = "Алгебра"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subject.save()
+        self.assertEqual(self._subjects(3), ["Алгебра"])
+
+    def test_view_reads_stored_grid(self):
+        self._create_lesson(week=1, para_number=1, para_part=0)
+        with self.assertNumQueries(1):
+            schedule_data, class_groups = get_grid(1)
+        self.assertEqual(class_groups[0]["name"], "10-А")
+        self.assertTrue(ScheduleGrid.objects.filter(week=1).exists())
+
+
+class ScheduleSliceViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_a = ClassGroup.objects.create(name="10-А")
+        self.class_b = ClassGroup.objects.create(name="11-Б")
+        for class_group, subject_name in ((self.class_a, "Фізика"), (self.class_b, "Хімія")):
+            Lesson.objects.create(
+                class_group=class_group,
+                subject=Subject.objects.create(name=subject_name),
+                day=Day.MONDAY,
+                para_number=1 if class_group == self.class_a else 2,
+                cabinet="204",
+                week=1,
+            )
+
+    def test_class_page_renders_only_its_column(self):
+        response = self.client.get(reverse("schedule_class", args=[self.class_a.pk]), {"week": "1"})
+        self.assertContains(response, "Фізика")
+        self.assertNotContains(response, "Хімія")
+
+    def test_cabinet_page_lists_classes_using_it(self):
+        response = self.client.get(reverse("schedule_cabinet", args=["204"]), {"week": "1"})
+        self.assertContains(response, "Фізика")
+        self.assertContains(response, "Хімія")
+        self.assertEqual(
+            self.client.get(reverse("schedule_cabinet", args=["999"])).status_code, 404
+        )
+
+    def test_cabinet_query_uses_version_week_cabinet_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plan format is backend specific")
+        plan = Lesson.objects.published().filter(week=1, cabinet="204").explain()
+        self.assertIn("lesson_version_week_cab_idx", plan)
+
+
+class ScheduleApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        self.subject = Subject.objects.create(name="Фізика")
+        self.lesson = Lesson.objects.create(
+            class_group=self.class_group,
+            subject=self.subject,
+            day=Day.TUESDAY,
+            para_number=1,
+            para_part=0,
+            cabinet="204",
+            week=2,
+        )
+        self.url = reverse("schedule_api")
+
+    def test_lessons_with_resolved_times(self):
+        response = self.client.get(self.url, {"week": "2", "class_group": self.class_group.pk, "day": "2"})
+        data = response.json()
+        self.assertEqual(data["class_groups"], [{"id": self.class_group.pk, "name": "10-А", "study_type": "ОЧНЕ"}])
+        [lesson] = data["lessons"]
+        self.assertEqual((lesson["start"], lesson["end"]), ("08:55", "10:35"))
+        self.assertEqual(lesson["lesson_numbers"], [1, 2])
+        self.assertEqual(lesson["subject"], "Фізика")
+        self.assertEqual(self.client.get(self.url, {"week": "1"}).json()["lessons"], [])
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.get(self.url, {"week": "9"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"class_group": "999"}).status_code, 404)
+
+    def test_conditional_requests_use_strong_etag(self):
+        response = self.client.get(self.url, {"week": "2"}, headers={"accept-encoding": "gzip"})
+        etag = response["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                self.url, {"week": "2"}, headers={"accept-encoding": "gzip", "if-none-match": etag}
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        # Another encoding is another representation.
+        identity = self.client.get(self.url, {"week": "2"}, headers={"if-none-match": etag})
+        self.assertEqual(identity.status_code, 200)
+        self.assertNotEqual(identity["ETag"], etag)
+
+        self.lesson.cabinet = "301"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+        changed = self.client.get(
+            self.url, {"week": "2"}, headers={"accept-encoding": "gzip", "if-none-match": etag}
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+
+@override_settings(SCHEDULE_ROTATION_START="2025-09-03")
+class ScheduleCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        subject = Subject.objects.create(name="Фізика, лабораторна")
+        for sub_group in (1, 2):
+            Lesson.objects.create(
+                class_group=self.class_group,
+                subject=subject,
+                day=Day.TUESDAY,
+                para_number=2,
+                para_part=sub_group,
+                cabinet="204",
+                week=2,
+                sub_group=sub_group,
+            )
+        self.url = reverse("schedule_class_ical", args=[self.class_group.pk])
+
+    def _content(self, response):
+        return b"".join(response.streaming_content if response.streaming else [response.content]).decode()
+
+    def test_lessons_become_four_weekly_events(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        content = self._content(response)
+        self.assertEqual(content.count("BEGIN:VEVENT"), 2)
+        # Week II of a rotation starting on Monday 2025-09-01.
+        self.assertIn("DTSTART;TZID=Europe/Kyiv:20250909T104500\r\n", content)
+        self.assertIn("DTEND;TZID=Europe/Kyiv:20250909T122000\r\n", content)
+        self.assertIn("RRULE:FREQ=WEEKLY;INTERVAL=4\r\n", content)
+        self.assertIn("SUMMARY:Фізика\\, лабораторна (1 підгрупа)", content)
+
+    def test_uids_survive_publishing_a_version(self):
+        # The active version id is cached and would outlive the test's rows.
+        self.addCleanup(cache.clear)
+        uids = [line for line in self._content(self.client.get(self.url)).splitlines() if line.startswith("UID:")]
+        self.assertEqual(len(set(uids)), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(create_draft())
+        content = self._content(self.client.get(self.url))
+        self.assertEqual([line for line in content.splitlines() if line.startswith("UID:")], uids)
+
+    def test_sub_group_feed(self):
+        content = self._content(self.client.get(self.url, {"sub_group": "2"}))
+        self.assertEqual(content.count("BEGIN:VEVENT"), 1)
+        self.assertIn("2 підгрупа", content)
+
+    def test_cached_per_version_with_conditional_get(self):
+        first = self._content(self.client.get(self.url))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(self._content(response), first)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lesson.objects.filter(sub_group=2).delete()
+        response = self.client.get(self.url, headers={"if-none-match": not_modified["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._content(response).count("BEGIN:VEVENT"), 1)
+
+
+class TimetableImportTests(TestCase):
+    CSV = (
+        "week;day;para_number;para_part;class_group;subject;cabinet;sub_group\n"
+        "2;Понеділок;I;;10-А;Фізика;204;\n"
+        "II;2;2;1-ша половина;10-А;Астрономія;301;1\n"
+        "2;2;2;1;10-А;Хімія;302;2\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        self.physics = Subject.objects.create(name="Фізика")
+        self.old_lesson = Lesson.objects.create(
+            class_group=self.class_group, subject=self.physics, day=Day.FRIDAY, week=2
+        )
+        self.kept_lesson = Lesson.objects.create(
+            class_group=self.class_group, subject=self.physics, day=Day.FRIDAY, week=3
+        )
+
+    def _import(self, content, filename="timetable.csv", **kwargs):
+        return import_timetable(io.BytesIO(content.encode()), filename, **kwargs)
+
+    def test_replaces_weeks_in_file(self):
+        with patch("schedule.importer.invalidate_on_commit") as invalidate_on_commit:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = self._import(self.CSV)
+        invalidate_on_commit.assert_called_once()
+
+        self.assertEqual((result.weeks, result.created, result.deleted), ([2], 3, 1))
+        self.assertEqual(result.new_subjects, ["Астрономія", "Хімія"])
+        self.assertFalse(Lesson.objects.filter(pk=self.old_lesson.pk).exists())
+        self.assertTrue(Lesson.objects.filter(pk=self.kept_lesson.pk).exists())
+        self.assertEqual(
+            list(Lesson.objects.filter(week=2).values_list("subject__name", "sub_group", "para_part")),
+            [("Фізика", 0, 0), ("Астрономія", 1, 1), ("Хімія", 2, 1)],
+        )
+        schedule_data, _ = get_grid(2)
+        self.assertEqual(len(schedule_data), 2)
+
+    def test_rejects_whole_file_on_errors(self):
+        content = self.CSV + "2;Понеділок;1;;10-А;Алгебра;;\n5;1;1;;11-Б;Фізика;;\n"
+        with self.assertRaises(TimetableImportError) as raised:
+            self._import(content)
+        self.assertEqual(
+            raised.exception.errors,
+            [
+                "Рядок 6: недійсне значення week: '5'",
+                "Рядок 6: невідомий клас '11-Б'",
+                "Рядки 2 і 5: 10-А (ОЧНЕ) має два уроки одночасно (II тиждень, Понеділок, урок 1–2)",
+            ],
+        )
+        self.assertTrue(Lesson.objects.filter(pk=self.old_lesson.pk).exists())
+        self.assertFalse(Subject.objects.filter(name="Хімія").exists())
+
+    def test_xlsx_and_command(self):
+        workbook = openpyxl.Workbook()
+        for row in csv.reader(io.StringIO(self.CSV), delimiter=";"):
+            workbook.active.append([int(cell) if cell.isdigit() else cell for cell in row])
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), "timetable.xlsx")
+        workbook.save(path)
+
+        out = io.StringIO()
+        call_command("import_timetable", path, stdout=out)
+        self.assertIn("Imported 3 lessons for weeks 2", out.getvalue())
+        self.assertEqual(Lesson.objects.filter(week=2).count(), 3)
+
+    def test_admin_upload(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        upload = SimpleUploadedFile("timetable.csv", self.CSV.encode())
+        response = self.client.post(reverse("schedule_import"), {"file": upload, "dry_run": "on"})
+        self.assertRedirects(response, reverse("schedule_import"))
+        self.assertEqual(Lesson.objects.filter(week=2).count(), 1)
+
+        upload = SimpleUploadedFile("timetable.csv", b"week;day\n1;1\n")
+        response = self.client.post(reverse("schedule_import"), {"file": upload})
+        self.assertContains(response, "Немає стовпців: para_number, class_group, subject")
+
+    def test_rejected_draft_upload_starts_no_draft(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        upload = SimpleUploadedFile("timetable.csv", b"week;day\n1;1\n")
+        response = self.client.post(reverse("schedule_import"), {"file": upload, "into_draft": "on"})
+        self.assertContains(response, "Немає стовпців")
+        self.assertIsNone(ScheduleVersion.draft())
+
+        upload = SimpleUploadedFile("timetable.csv", self.CSV.encode())
+        self.client.post(reverse("schedule_import"), {"file": upload, "into_draft": "on"})
+        draft = ScheduleVersion.draft()
+        self.assertIsNotNone(draft)
+        self.assertEqual(Lesson.objects.filter(version=draft, week=2).count(), 3)
+
+
+class ScheduleConflictTests(TestCase):
+    def setUp(self):
+        self.class_a = ClassGroup.objects.create(name="10-А")
+        self.class_b = ClassGroup.objects.create(name="11-Б")
+        self.subject = Subject.objects.create(name="Фізика")
+
+    def _lesson(self, class_group, save=True, **kwargs):
+        kwargs = {"day": Day.MONDAY, "week": 1, **kwargs}
+        lesson = Lesson(class_group=class_group, subject=self.subject, **kwargs)
+        if save:
+            lesson.save()
+        return lesson
+
+    def test_detects_cabinet_and_class_clashes(self):
+        full = self._lesson(self.class_a, para_number=1, para_part=0, cabinet="204")
+        half = self._lesson(self.class_b, para_number=1, para_part=2, cabinet=" 204 ")
+        self._lesson(self.class_a, para_number=1, para_part=2, sub_group=1)
+        # Different sub-groups and different weeks do not clash.
+        self._lesson(self.class_b, para_number=1, para_part=1, sub_group=1, cabinet="301")
+        self._lesson(self.class_b, para_number=1, para_part=1, sub_group=2, cabinet="302")
+        self._lesson(self.class_a, para_number=1, week=2, cabinet="204")
+
+        with self.assertNumQueries(1):
+            conflicts = detect_conflicts()
+        self.assertEqual(
+            [(conflict.kind, conflict.lesson_numbers) for conflict in conflicts],
+            [("cabinet", (2,)), ("class_group", (2,))],
+        )
+        self.assertEqual((conflicts[0].first, conflicts[0].second), (full, half))
+        self.assertEqual(
+            str(conflicts[0]),
+            "Кабінет 204 зайнятий двічі: 10-А (ОЧНЕ) і 11-Б (ОЧНЕ) (I тиждень, Понеділок, урок 2)",
+        )
+        self.assertEqual(len(detect_conflicts(week=2)), 0)
+
+    def test_full_para_clash_reported_once(self):
+        self._lesson(self.class_a, para_number=2, cabinet="204")
+        self._lesson(self.class_b, para_number=2, cabinet="204")
+        [conflict] = detect_conflicts()
+        self.assertEqual(conflict.lesson_numbers, (3, 4))
+        self.assertIn("урок 3–4", str(conflict))
+
+    def test_save_time_validation(self):
+        self._lesson(self.class_a, para_number=1, cabinet="204")
+        with self.assertRaises(ValidationError) as raised:
+            self._lesson(self.class_b, save=False, para_number=1, para_part=1, cabinet="204").full_clean()
+        self.assertIn("Кабінет 204", raised.exception.messages[0])
+        self._lesson(self.class_b, save=False, para_number=2, cabinet="204").full_clean()
+
+    def test_command_and_admin_report(self):
+        self._lesson(self.class_a, para_number=1, cabinet="204")
+        self._lesson(self.class_b, para_number=1, cabinet="204")
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "1 conflicts found"):
+            call_command("schedule_conflicts", stdout=out)
+        self.assertIn("Кабінет 204", out.getvalue())
+        call_command("schedule_conflicts", "--week", "2", stdout=out)
+
+        self.client.force_login(
+            get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        self.assertContains(self.client.get(reverse("schedule_conflicts")), "Кабінет 204")
+        self.assertContains(
+            self.client.get(reverse("schedule_conflicts"), {"week": "2"}), "Конфліктів не знайдено"
+        )
+
+
+@override_settings(SCHEDULE_ROTATION_START="2025-09-03")
+class LiveScheduleTests(TestCase):
+    # Tuesday of week II of a rotation starting on Monday 2025-09-01.
+    MOMENT = datetime(2025, 9, 9, 10, 0, tzinfo=ZoneInfo("Europe/Kyiv"))
+
+    def setUp(self):
+        cache.clear()
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        for para_number, para_part, name in ((1, 0, "Фізика"), (2, 1, "Хімія"), (2, 2, "Біологія")):
+            Lesson.objects.create(
+                class_group=self.class_group,
+                subject=Subject.objects.create(name=name),
+                day=Day.TUESDAY,
+                para_number=para_number,
+                para_part=para_part,
+                week=2,
+            )
+
+    def test_time_index(self):
+        self.assertEqual(rotation_week(date(2025, 9, 9)), 2)
+        self.assertEqual(rotation_week(date(2025, 9, 29)), 1)
+        self.assertEqual(next_boundary(self.MOMENT), self.MOMENT.replace(hour=10, minute=35))
+        self.assertEqual(
+            next_boundary(self.MOMENT.replace(hour=16, minute=30)),
+            datetime(2025, 9, 10, tzinfo=ZoneInfo("Europe/Kyiv")),
+        )
+        self.assertEqual(Lesson(para_number=4, para_part=0).time, "14:25 – 16:00")
+
+    def test_current_and_next_lesson(self):
+        data, valid_until = get_now_and_next(self.MOMENT)
+        [entry] = data["classes"]
+        self.assertEqual([lesson["subject"] for lesson in entry["current"]], ["Фізика"])
+        self.assertEqual([lesson["subject"] for lesson in entry["next"]], ["Хімія"])
+        self.assertEqual(entry["next"][0]["start"], "10:45")
+        self.assertEqual(data["valid_until"], valid_until.isoformat())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_now_and_next(self.MOMENT.replace(minute=30))[0], data)
+
+        weekend, _ = get_now_and_next(self.MOMENT.replace(day=13))
+        self.assertEqual(weekend["classes"], [])
+
+    def test_endpoints_cacheable_until_boundary(self):
+        with patch("django.utils.timezone.now", return_value=self.MOMENT.replace(minute=30)):
+            response = self.client.get(reverse("schedule_now_api"))
+            self.assertEqual(response.json()["classes"][0]["current"][0]["end"], "10:35")
+            self.assertIn("max-age=300", response["Cache-Control"])
+
+            fragment = self.client.get(reverse("schedule_now"))
+        self.assertContains(fragment, "Зараз")
+        self.assertContains(fragment, "Хімія")
+
+
+class ScheduleVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.class_group = ClassGroup.objects.create(name="10-А")
+        self.lesson = Lesson.objects.create(
+            class_group=self.class_group,
+            subject=Subject.objects.create(name="Фізика"),
+            day=Day.MONDAY,
+            para_number=1,
+            week=1,
+        )
+        self.url = reverse("schedule_api")
+
+    def _subjects(self):
+        return [lesson["subject"] for lesson in self.client.get(self.url).json()["lessons"]]
+
+    def test_draft_edits_stay_private_until_publish(self):
+        active = ScheduleVersion.objects.get(is_active=True)
+        self.assertEqual(self.lesson.version, active)
+        draft = create_draft("Весна")
+        self.assertEqual(create_draft(), draft)
+        draft_lesson = draft.lessons.get()
+
+        chemistry = Subject.objects.create(name="Хімія")
+        etag = self.client.get(self.url)["ETag"]
+        version_before = schedule_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            draft_lesson.subject = chemistry
+            draft_lesson.save()
+            # New lessons go to the working copy.
+            Lesson.objects.create(
+                class_group=self.class_group, subject=chemistry, day=Day.FRIDAY, week=1
+            )
+        self.assertEqual(schedule_version(), version_before)
+        self.assertEqual(self._subjects(), ["Фізика"])
+        self.assertEqual(self.client.get(self.url, headers={"if-none-match": etag}).status_code, 304)
+        self.assertEqual(draft.lessons.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(draft)
+        self.assertNotEqual(schedule_version(), version_before)
+        self.assertEqual(self._subjects(), ["Хімія", "Хімія"])
+        self.assertEqual(self.client.get(self.url, headers={"if-none-match": etag}).status_code, 200)
+        schedule_data, _ = get_grid(1)
+        self.assertEqual(len(schedule_data), 2)
+
+        active.refresh_from_db()
+        self.assertEqual((active.is_active, active.status), (False, "архів"))
+        self.assertIsNone(ScheduleVersion.draft())
+
+        # Rolling back is publishing the archived version again.
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(active)
+        self.assertEqual(self._subjects(), ["Фізика"])
+
+    def test_discard_draft(self):
+        create_draft()
+        self.assertTrue(discard_draft())
+        self.assertFalse(discard_draft())
+        self.assertEqual(Lesson.objects.count(), 1)
+
+    def test_public_reads_never_create_a_version(self):
+        ScheduleVersion.objects.filter(is_active=True).update(is_active=False)
+        cache.clear()
+        versions = ScheduleVersion.objects.count()
+        self.assertIsNone(ScheduleVersion.active_id())
+        self.assertEqual(self.client.get(self.url).json()["lessons"], [])
+        self.assertEqual(ScheduleVersion.objects.count(), versions)
+
+        # Editors get a working copy to fill in and publish.
+        lesson = Lesson.objects.create(
+            class_group=self.class_group, subject=self.lesson.subject, day=Day.FRIDAY, week=1
+        )
+        self.assertEqual(lesson.version, ScheduleVersion.draft())
+
+    def test_admin_versions_and_command(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        )
+        self.client.post(reverse("schedule_create_draft"), {"name": "Весна"})
+        draft = ScheduleVersion.draft()
+        self.assertContains(self.client.get(reverse("schedule_versions")), "Весна (чернетка)")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("schedule_publish_version", args=[draft.pk]))
+        self.assertRedirects(response, reverse("schedule_versions"))
+        self.assertEqual(ScheduleVersion.active_id(), draft.pk)
+
+        out = io.StringIO()
+        call_command("schedule_versions", stdout=out)
+        self.assertIn("Весна (активна)", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "No such version"):
+            call_command("schedule_versions", "publish", stdout=out)
+
+
+class TeacherScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        staff_index = StaffIndexPage(title="Колектив", slug="staff-schedule-test")
+        Site.objects.get(is_default_site=True).root_page.add_child(instance=staff_index)
+        self.teacher = PersonPage(title="Оксана Столяр", position="Вчитель")
+        staff_index.add_child(instance=self.teacher)
+        self.class_a = ClassGroup.objects.create(name="10-А")
+        self.class_b = ClassGroup.objects.create(name="11-Б")
+        self.subject = Subject.objects.create(name="Фізика")
+
+    def _lesson(self, class_group, **kwargs):
+        kwargs = {"day": Day.MONDAY, "week": 1, "teacher": self.teacher, **kwargs}
+        return Lesson.objects.create(class_group=class_group, subject=self.subject, **kwargs)
+
+    def test_schedule_and_clashes_in_one_query(self):
+        self._lesson(self.class_a, para_number=1, cabinet="204")
+        self._lesson(self.class_b, para_number=1, para_part=2, cabinet="301")
+        self._lesson(self.class_b, para_number=2, week=2, day=Day.FRIDAY)
+        self._lesson(self.class_b, para_number=3, teacher=None)
+
+        with self.assertNumQueries(1):
+            weeks, conflicts = teacher_schedule(self.teacher)
+        self.assertEqual([week["week"] for week in weeks], ["I тиждень", "II тиждень"])
+        self.assertEqual(len(weeks[0]["days"][0]["lessons"]), 2)
+        self.assertEqual([conflict.kind for conflict in conflicts], ["teacher"])
+        self.assertEqual(
+            str(conflicts[0]),
+            "Оксана Столяр веде два уроки одночасно: 10-А (ОЧНЕ) і 11-Б (ОЧНЕ) (I тиждень, Понеділок, урок 2)",
+        )
+
+    def test_shared_cabinet_reported_once(self):
+        self._lesson(self.class_a, para_number=1, cabinet="204")
+        self._lesson(self.class_b, para_number=1, cabinet="204")
+        self.assertEqual([conflict.kind for conflict in detect_conflicts()], ["cabinet"])
+
+    def test_clean_rejects_teacher_clash(self):
+        self._lesson(self.class_a, para_number=1)
+        lesson = Lesson(class_group=self.class_b, subject=self.subject, day=Day.MONDAY, teacher=self.teacher)
+        with self.assertRaisesMessage(ValidationError, "веде два уроки одночасно"):
+            lesson.full_clean()
+
+    def test_reimport_keeps_or_sets_teachers(self):
+        physics = self._lesson(self.class_a, para_number=1)
+        self._lesson(self.class_b, para_number=2, week=2)
+        other = PersonPage(title="Іван Коваль", position="Вчитель")
+        self.teacher.get_parent().add_child(instance=other)
+        csv_content = (
+            "week;day;para_number;class_group;subject;teacher\n"
+            "1;1;1;10-А;Фізика;\n"
+            "1;1;2;11-Б;Фізика;іван коваль\n"
+            "1;1;3;11-Б;Хімія;\n"
+        )
+        import_timetable(io.BytesIO(csv_content.encode()), "timetable.csv")
+
+        self.assertFalse(Lesson.objects.filter(pk=physics.pk).exists())
+        self.assertEqual(
+            list(Lesson.objects.filter(week=1).order_by("para_number").values_list("para_number", "teacher_id")),
+            [(1, self.teacher.pk), (2, other.pk), (3, None)],
+        )
+        self.assertEqual(Lesson.objects.get(week=2).teacher_id, self.teacher.pk)
+
+        with self.assertRaisesMessage(TimetableImportError, "невідомий вчитель 'Петро'"):
+            import_timetable(io.BytesIO(csv_content.replace("іван коваль", "Петро").encode()), "timetable.csv")
+
+    def test_person_page_shows_timetable(self):
+        self._lesson(self.class_a, para_number=1, cabinet="204")
+        response = self.client.get(self.teacher.url)
+        self.assertContains(response, "Розклад уроків")
+        self.assertContains(response, reverse("schedule_class", args=[self.class_a.pk]) + "?week=1")
+        self.assertNotContains(response, "веде два уроки")
+
+    def test_teacher_query_uses_teacher_week_day_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plan format is backend specific")
+        plan = Lesson.objects.published().filter(teacher=self.teacher, week=1, day=Day.MONDAY).explain()
+        self.assertIn("lesson_teacher_week_day_idx", plan)
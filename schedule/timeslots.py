@@ -0,0 +1,36 @@
+"""
+Lesson times and the rotation calendar.
+
+``LESSON_SLOTS`` (``LESSON_TIMES`` parsed once at import) is indexed here by
+boundary, so the lesson under way at any moment, and the next moment that
+answer can change, are found with a bisect instead of re-parsing strings.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+
+from .models import LESSON_SLOTS, Week
+
+# Every start and end of a lesson, in order.
+SLOT_BOUNDARIES = sorted({moment for slot in LESSON_SLOTS.values() for moment in slot})
+
+
+def rotation_start() -> date:
+    """Monday of the first ``Week.WEEK_1`` of the rotation."""
+    start = date.fromisoformat(settings.SCHEDULE_ROTATION_START)
+    return start - timedelta(days=start.weekday())
+
+
+def rotation_week(day: date) -> int:
+    """Week of the rotation (``Week`` value) that ``day`` falls in."""
+    weeks = (day - rotation_start()).days // 7
+    return weeks % len(Week.values) + 1
+
+
+def next_boundary(moment: datetime) -> datetime:
+    """First lesson start or end after ``moment``, or the following midnight."""
+    index = bisect_right(SLOT_BOUNDARIES, moment.time().replace(tzinfo=None))
+    if index < len(SLOT_BOUNDARIES):
+        return datetime.combine(moment.date(), SLOT_BOUNDARIES[index], moment.tzinfo)
+    return datetime.combine(moment.date() + timedelta(days=1), datetime.min.time(), moment.tzinfo)
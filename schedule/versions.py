@@ -0,0 +1,77 @@
+"""
+Versioned schedule publishing.
+
+Visitors only ever see the active ``ScheduleVersion``. Editors start a
+working copy of it with ``create_draft`` and change its lessons without
+touching anything public: draft edits invalidate nothing. ``publish`` then
+switches the active version in one transaction, rebuilds the stored grids
+from it and invalidates the schedule cache once, so every cached page, JSON
+response and calendar feed turns over exactly once per publish.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import invalidate
+from core.signals import bulk_changes
+
+from .grid import store_grids
+from .models import ACTIVE_VERSION_KEY, Lesson, ScheduleVersion
+from .views import SCHEDULE_DEPENDENCIES
+
+COPIED_FIELDS = (
+    "class_group_id",
+    "subject_id",
+    "day",
+    "para_number",
+    "para_part",
+    "cabinet",
+    "week",
+    "sub_group",
+    "teacher_id",
+)
+BULK_CREATE_BATCH_SIZE = 500
+
+
+def create_draft(name=""):
+    """The working copy, copied from the active version unless one exists."""
+    with transaction.atomic():
+        draft = ScheduleVersion.draft()
+        if draft is not None:
+            return draft
+        active_id = ScheduleVersion.active_id()
+        draft = ScheduleVersion.objects.create(name=name)
+        lessons = Lesson.objects.filter(version_id=active_id).values(*COPIED_FIELDS)
+        Lesson.objects.bulk_create(
+            (Lesson(version=draft, **fields) for fields in lessons.iterator()),
+            batch_size=BULK_CREATE_BATCH_SIZE,
+        )
+    return draft
+
+
+def publish(version):
+    """Make ``version`` the active one; the previous active version is archived."""
+    with transaction.atomic():
+        # Serialises concurrent publishes on the current active row.
+        list(ScheduleVersion.objects.select_for_update().filter(is_active=True))
+        ScheduleVersion.objects.filter(is_active=True).update(is_active=False)
+        ScheduleVersion.objects.filter(pk=version.pk).update(is_active=True, published_at=timezone.now())
+        store_grids(version_id=version.pk)
+        transaction.on_commit(lambda: activate(version.pk))
+    version.refresh_from_db()
+    return version
+
+
+def activate(version_id):
+    cache.set(ACTIVE_VERSION_KEY, version_id, None)
+    invalidate(*SCHEDULE_DEPENDENCIES)
+
+
+def discard_draft():
+    """Delete the working copy and its lessons, if there is one."""
+    draft = ScheduleVersion.draft()
+    if draft is None:
+        return False
+    with bulk_changes(), transaction.atomic():
+        draft.delete()
+    return True
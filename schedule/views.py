@@ -1,20 +1,13 @@
-from collections import Counter
+import hashlib
 
-from django.shortcuts import render
-from django.views.decorators.cache import cache_page
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 
-from .models import LESSON_TIMES, ClassGroup, Day, Lesson, Week
+from core.cache import cache_response, get_versions, model_tag
 
-PARA_BY_LESSON_NUMBER = {
-    1: "I",
-    2: "I",
-    3: "II",
-    4: "II",
-    5: "III",
-    6: "III",
-    7: "IV",
-    8: "IV",
-}
+from .grid import GRID_TAG, build_schedule_data, get_grid
+from .models import ClassGroup, Lesson, ScheduleVersion, Week
 
 
 def normalize_week_filter(value):
@@ -24,83 +17,98 @@ def normalize_week_filter(value):
     return "1"
 
 
-def get_lesson_numbers(para_number, para_part):
-    first_lesson = para_number * 2 - 1
-    second_lesson = para_number * 2
-    if para_part == 0:
-        return [first_lesson, second_lesson]
-    if para_part == 1:
-        return [first_lesson]
-    return [second_lesson]
-
-
-def annotate_para_headers(sorted_rows):
-    para_rowspans = Counter(row["para"] for row in sorted_rows.values())
-    last_para = None
-    for row in sorted_rows.values():
-        is_new_para = row["para"] != last_para
-        row["show_para"] = is_new_para
-        if is_new_para:
-            row["para_rowspan"] = para_rowspans[row["para"]]
-            last_para = row["para"]
-
-
-def build_schedule_data(lessons):
-    lessons_by_day = {}
-    for lesson in lessons:
-        lessons_by_day.setdefault(lesson.day, []).append(lesson)
-
-    schedule_data = {}
-    for day_number, day_name in Day.choices:
-        day_lessons = lessons_by_day.get(day_number, [])
-        if not day_lessons:
-            continue
-
-        lessons_by_number = {}
-        for lesson in day_lessons:
-            lesson_numbers = get_lesson_numbers(lesson.para_number, lesson.para_part)
-            for index, lesson_number in enumerate(lesson_numbers):
-                row = lessons_by_number.setdefault(
-                    lesson_number,
-                    {
-                        "time": LESSON_TIMES.get(lesson_number, ""),
-                        "para": PARA_BY_LESSON_NUMBER.get(lesson_number, ""),
-                        "lessons": {},
-                    },
-                )
-
-                class_lessons = row["lessons"].setdefault(lesson.class_group_id, [])
-                class_lessons.append(
-                    {
-                        "subject": lesson.subject,
-                        "cabinet": lesson.cabinet,
-                        "sub_group": lesson.sub_group,
-                        "rowspan": 2 if lesson.para_part == 0 and index == 0 else 1,
-                        "skip": lesson.para_part == 0 and index == 1,
-                    }
-                )
-
-        sorted_rows = dict(sorted(lessons_by_number.items()))
-        annotate_para_headers(sorted_rows)
-        schedule_data[day_name] = sorted_rows
-
-    return schedule_data
-
-
-@cache_page(60 * 15)
+SCHEDULE_DEPENDENCIES = (
+    model_tag("schedule.Lesson"),
+    model_tag("schedule.ClassGroup"),
+    model_tag("schedule.Subject"),
+    GRID_TAG,
+)
+
+
+def schedule_version() -> str:
+    """Changes on every publish, and whenever a published lesson, class group or subject does."""
+    versions = get_versions(SCHEDULE_DEPENDENCIES)
+    parts = [str(ScheduleVersion.active_id())]
+    parts += [f"{tag}={versions[tag]!r}" for tag in sorted(versions)]
+    return hashlib.sha1("|".join(parts).encode(), usedforsecurity=False).hexdigest()[:16]
+
+
+@cache_response(
+    60 * 15,
+    dependencies=SCHEDULE_DEPENDENCIES,
+    stale_while_revalidate=60 * 45,
+    query_params={"week": normalize_week_filter},
+)
 def schedule_view(request):
     """Display the schedule/timetable page."""
     week_filter = normalize_week_filter(request.GET.get("week"))
-    class_groups = ClassGroup.objects.order_by("name", "study_type")
-    lessons = list(
-        Lesson.objects.select_related("subject", "class_group")
-        .filter(week=int(week_filter))
-        .order_by("day", "para_number", "para_part", "class_group__name")
-    )
+    schedule_data, class_groups = get_grid(int(week_filter))
 
     context = {
-        "schedule_data": build_schedule_data(lessons),
+        "schedule_data": schedule_data,
         "class_groups": class_groups,
         "current_week": week_filter,
     }
     return render(request, "schedule/schedule_page.html", context)
+
+
+def render_schedule_slice(request, lessons, class_groups, slice_title, week_filter, ical_url=None):
+    context = {
+        "schedule_data": build_schedule_data(lessons, class_groups),
+        "class_groups": class_groups,
+        "current_week": week_filter,
+        "slice_title": slice_title,
+        "ical_url": ical_url,
+    }
+    return render(request, "schedule/schedule_slice.html", context)
+
+
+@cache_response(
+    60 * 15,
+    dependencies=SCHEDULE_DEPENDENCIES,
+    stale_while_revalidate=60 * 45,
+    query_params={"week": normalize_week_filter},
+)
+def class_schedule_view(request, class_group_id):
+    """One class group's column of the timetable."""
+    week_filter = normalize_week_filter(request.GET.get("week"))
+    class_group = get_object_or_404(ClassGroup, pk=class_group_id)
+    lessons = (
+        Lesson.objects.published()
+        .select_related("subject")
+        .filter(week=int(week_filter), class_group=class_group)
+        .order_by("day", "para_number", "para_part")
+    )
+    return render_schedule_slice(
+        request,
+        lessons,
+        [class_group],
+        str(class_group),
+        week_filter,
+        ical_url=reverse("schedule_class_ical", args=[class_group.pk]),
+    )
+
+
+@cache_response(
+    60 * 15,
+    dependencies=SCHEDULE_DEPENDENCIES,
+    stale_while_revalidate=60 * 45,
+    query_params={"week": normalize_week_filter},
+)
+def cabinet_schedule_view(request, cabinet):
+    """Lessons held in one cabinet, with a column per class group taught there."""
+    if not Lesson.objects.published().filter(cabinet=cabinet).exists():
+        raise Http404("Кабінет не знайдено")
+    week_filter = normalize_week_filter(request.GET.get("week"))
+    lessons = list(
+        Lesson.objects.published()
+        .select_related("subject", "class_group")
+        .filter(week=int(week_filter), cabinet=cabinet)
+        .order_by("day", "para_number", "para_part", "class_group__name")
+    )
+    class_groups = sorted(
+        {lesson.class_group for lesson in lessons},
+        key=lambda class_group: (class_group.name, class_group.study_type),
+    )
+    return render_schedule_slice(request, lessons, class_groups, f"кабінет {cabinet}", week_filter)
+
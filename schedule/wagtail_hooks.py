@@ -1,8 +1,64 @@
-from django.urls import reverse
+from django.urls import path, reverse
 from wagtail import hooks
 from wagtail.admin.menu import MenuItem
 
+from .admin_views import (
+    conflicts_report_view,
+    create_draft_view,
+    discard_draft_view,
+    import_timetable_view,
+    publish_version_view,
+    versions_view,
+)
+
 
 @hooks.register("register_admin_menu_item")
 def register_schedule_menu_item() -> MenuItem:
     return MenuItem("Розклад", reverse("wagtailsnippets:index"), icon_name="date", order=270)
+
+
+@hooks.register("register_admin_urls")
+def register_schedule_admin_urls():
+    return [
+        path("schedule/import/", import_timetable_view, name="schedule_import"),
+        path("schedule/conflicts/", conflicts_report_view, name="schedule_conflicts"),
+        path("schedule/versions/", versions_view, name="schedule_versions"),
+        path("schedule/versions/draft/", create_draft_view, name="schedule_create_draft"),
+        path("schedule/versions/draft/discard/", discard_draft_view, name="schedule_discard_draft"),
+        path(
+            "schedule/versions/<int:version_id>/publish/",
+            publish_version_view,
+            name="schedule_publish_version",
+        ),
+    ]
+
+
+class ScheduleImportMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.has_perm("schedule.add_lesson")
+
+
+class ScheduleEditorMenuItem(MenuItem):
+    def is_shown(self, request):
+        return request.user.has_perm("schedule.change_lesson")
+
+
+@hooks.register("register_admin_menu_item")
+def register_schedule_import_menu_item() -> MenuItem:
+    return ScheduleImportMenuItem(
+        "Імпорт розкладу", reverse("schedule_import"), icon_name="upload", order=271
+    )
+
+
+@hooks.register("register_admin_menu_item")
+def register_schedule_conflicts_menu_item() -> MenuItem:
+    return ScheduleEditorMenuItem(
+        "Конфлікти розкладу", reverse("schedule_conflicts"), icon_name="warning", order=272
+    )
+
+
+@hooks.register("register_admin_menu_item")
+def register_schedule_versions_menu_item() -> MenuItem:
+    return ScheduleEditorMenuItem(
+        "Версії розкладу", reverse("schedule_versions"), icon_name="history", order=273
+    )
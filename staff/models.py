@@ -1,10 +1,13 @@
 from django.db import models
+from django.utils.decorators import method_decorator
 from modelcluster.fields import ParentalKey
 from wagtail.admin.panels import FieldPanel, InlinePanel
 from wagtail.fields import RichTextField
 from wagtail.models import Orderable, Page
 from wagtail.search import index
 
+from core.cache import add_cache_dependencies, cache_response, lookup_param, model_tag, page_tag
+
 
 class StaffIndexPage(Page):
 
@@ -23,8 +26,32 @@ class StaffIndexPage(Page):
         verbose_name = "Колектив"
         verbose_name_plural = "Колектив"
 
+    @method_decorator(
+        cache_response(
+            60 * 15,
+            stale_while_revalidate=60 * 45,
+            query_params={"department": lookup_param("staff.PersonPage", "department")},
+        )
+    )
+    def serve(self, request, *args, **kwargs):
+        return super().serve(request, *args, **kwargs)
+
+    def cache_warm_queries(self):
+        """Department filters for ``warm_cache``."""
+        departments = (
+            PersonPage.objects.child_of(self)
+            .live()
+            .public()
+            .exclude(department="")
+            .order_by()
+            .values_list("department", flat=True)
+            .distinct()
+        )
+        return [{"department": department} for department in departments]
+
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
+        add_cache_dependencies(request, page_tag(self))
         base_queryset = (
             PersonPage.objects.child_of(self)
             .live()
@@ -116,6 +143,13 @@ class PersonPage(Page):
     parent_page_types = ["staff.StaffIndexPage"]
     subpage_types = []
 
+    # The teacher's timetable is rendered on the page.
+    cache_dependencies = (
+        model_tag("schedule.Lesson"),
+        model_tag("schedule.ClassGroup"),
+        model_tag("schedule.Subject"),
+    )
+
     search_fields = Page.search_fields + [
         index.SearchField("title", boost=2),
         index.SearchField("position", boost=2),
@@ -131,6 +165,12 @@ class PersonPage(Page):
         verbose_name_plural = "Співробітники"
         ordering = ["-first_published_at"]
 
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        from schedule.teachers import teacher_schedule
+        context["schedule_weeks"], context["schedule_conflicts"] = teacher_schedule(self)
+        return context
+
     def __str__(self) -> str:
         return self.title
 
@@ -16,6 +16,16 @@ python manage.py collectstatic --noinput 2>/dev/null || true
 echo "Creating cache table..."
 python manage.py createcachetable 2>/dev/null || true
 
+# Pre-render public pages while Gunicorn boots: into static files when
+# BAKE_DIR is set, otherwise into the shared response cache
+if [ -n "$BAKE_DIR" ]; then
+    echo "Baking public site in background..."
+    python manage.py bake_site --concurrency 2 &
+else
+    echo "Warming response cache in background..."
+    python manage.py warm_cache --concurrency 2 --budget 120 &
+fi
+
 # Start Gunicorn
 echo "Starting Gunicorn on port ${PORT:-8000}..."
 exec gunicorn mcl_site.wsgi:application \